@@ -0,0 +1,300 @@
+import os
+import math
+import asyncio
+import time
+from quart import Quart, Response, g, request, jsonify
+from jamaibase import JamAIAsync
+from typing import Dict, Optional
+
+import metrics
+from cache import TTLCache
+from conversations import Conversation
+from diet_plans import DietPlanStore
+from flows import run_async
+from resilience import UpstreamUnavailableError
+from uploads import upload_file_bytes_async
+from services import (
+    PROJECT_ID,
+    API_KEY,
+    ALLOWED_PHOTO_EXTENSIONS,
+    ALLOWED_DOCUMENT_EXTENSIONS,
+    DIET_PLAN_FRESHNESS_SECONDS,
+    DIET_PLAN_CACHE_SIZE,
+    DIET_PROFILE_FIELDS,
+    DIET_PLAN_STORE,
+    REPORT_CHUNK_CONCURRENCY,
+    diet_plan_store,
+    conversation_store,
+    guarded_call_async,
+    jamai_http_timeout,
+    conversation_key,
+    upload_scope,
+    analyze_upload_flow,
+    get_user_data,
+    requested_fields,
+    user_guide_cache,
+    Chatbot,
+    PhotoProcessor,
+    DocumentProcessor,
+    DietRecommendationProcessor,
+)
+
+# Async serving mode for the merge2.py routes.
+# Every JamAI call is awaited on a JamAIAsync client, so a single process keeps
+# many LLM calls in flight instead of pinning one worker per request.
+# Run with an ASGI server, e.g.: hypercorn asgi_app:app --bind 0.0.0.0:5000
+#
+# The processors run the same flows as merge2.py (services.py), with run_async() awaiting each step:
+# the same table guard (deadlines, retries, circuit breakers), per-user conversation tables, report
+# map-reduce, stored upload analyses and diet plan store.
+# Served here: /api/get-user-data, the four chat routes, /api/process-photo, /api/process-document,
+# /api/get-diet-recommendations, /api/health and /metrics. Everything else (streaming, batch chat, jobs,
+# vitals, bulk profiles and the stats endpoints) is only served by merge2.py.
+
+app = Quart(__name__)
+
+
+# Chatbot on a JamAIAsync client: same table, request, conversations and cleaning
+class AsyncChatbot(Chatbot):
+    call_table = staticmethod(guarded_call_async)
+
+    def __init__(self, project_id: str, api_key: str, table_id: str, cache: Optional[TTLCache] = None):
+        self.table_id = table_id
+        self.cache = cache
+        try:
+            self.client = JamAIAsync(project_id=project_id, api_key=api_key, timeout=jamai_http_timeout("chat"))
+            print(f"Successfully connected to JamAI Base (async) for {table_id}.")
+        except Exception as e:
+            print(f"Failed to initialize async JamAI client for {table_id}: {str(e)}")
+            raise
+
+    async def acquire_turn(self, conversation_key: str) -> Conversation:
+        return await conversation_store.acquire_async(self.table_id, conversation_key)
+
+    async def chat(self, user_message: str, conversation_key: Optional[str] = None):
+        return await run_async(self.chat_flow(user_message, conversation_key))
+
+
+class AsyncPhotoProcessor(PhotoProcessor):
+    call_table = staticmethod(guarded_call_async)
+
+    def __init__(self, project_id: str, pat: str):
+        self.client = JamAIAsync(
+            project_id=project_id,
+            token=pat,
+            timeout=jamai_http_timeout("action"),
+            file_upload_timeout=jamai_http_timeout("file"),
+        )
+
+    async def upload(self, data: bytes, filename: str):
+        return await guarded_call_async("file_upload", upload_file_bytes_async, self.client, data, filename)
+
+    async def process_photo_bytes(self, data: bytes, filename: str) -> Optional[Dict[str, str]]:
+        return await run_async(self.photo_flow(data, filename))
+
+
+# Long reports keep at most REPORT_CHUNK_CONCURRENCY table calls in flight
+class AsyncDocumentProcessor(DocumentProcessor):
+    call_table = staticmethod(guarded_call_async)
+
+    def __init__(self, project_id: str, pat: str):
+        self.client = JamAIAsync(project_id=project_id, token=pat, timeout=jamai_http_timeout("action"))
+        self._merge_table_ready = False
+        self._merge_table_lock = asyncio.Lock()
+
+    async def process_document_bytes(self, data: bytes, filename: str) -> Optional[Dict[str, str]]:
+        return await run_async(self.document_flow(data, filename), REPORT_CHUNK_CONCURRENCY)
+
+    async def analyze_chunked(self, pages) -> Optional[Dict[str, str]]:
+        return await run_async(self.analyze_chunked_flow(pages), REPORT_CHUNK_CONCURRENCY)
+
+    async def merge_table_available(self) -> bool:
+        async with self._merge_table_lock:
+            return await run_async(self.merge_table_flow())
+
+
+# Plan store lookups are Firestore calls, so run_async() runs them in a thread
+class AsyncDietRecommendationProcessor(DietRecommendationProcessor):
+    call_table = staticmethod(guarded_call_async)
+
+    def __init__(self, project_id: str, api_key: str, plan_store: Optional[DietPlanStore] = None):
+        self.plan_cache = TTLCache(max_size=DIET_PLAN_CACHE_SIZE, ttl=DIET_PLAN_FRESHNESS_SECONDS)
+        self.plan_store = plan_store
+        try:
+            self.jamai = JamAIAsync(api_key=api_key, project_id=project_id, timeout=jamai_http_timeout("action"))
+            print("Successfully initialized async JamAI for Diet Recommendation.")
+        except Exception as e:
+            print(f"Failed to initialize async JamAI for Diet Recommendation: {str(e)}")
+            self.jamai = None
+
+    async def get_recommendations(self, formatted_data, regenerate: bool = False):
+        return await run_async(self.recommendations_flow(formatted_data, regenerate))
+
+
+# Initialize processors
+emotional_support_chatbot = AsyncChatbot(project_id=PROJECT_ID, api_key=API_KEY, table_id="EmotionalSupport")
+check_symptoms_chatbot = AsyncChatbot(project_id=PROJECT_ID, api_key=API_KEY, table_id="CheckSymptoms")
+medicine_recommendation_chatbot = AsyncChatbot(project_id=PROJECT_ID, api_key=API_KEY, table_id="MedicineRecommendation")
+user_guide_chatbot = AsyncChatbot(project_id=PROJECT_ID, api_key=API_KEY, table_id="UserGuide", cache=user_guide_cache)
+photo_processor = AsyncPhotoProcessor(PROJECT_ID, API_KEY)
+document_processor = AsyncDocumentProcessor(PROJECT_ID, API_KEY)
+diet_processor = AsyncDietRecommendationProcessor(
+    PROJECT_ID, API_KEY, plan_store=diet_plan_store if DIET_PLAN_STORE else None
+)
+
+# Same stored-result lookup as services.analyze_upload, on the async processors
+async def analyze_upload(kind: str, data: bytes, filename: str, scope: Optional[str]):
+    flow = analyze_upload_flow(photo_processor, document_processor, kind, data, filename, scope)
+    return await run_async(flow, REPORT_CHUNK_CONCURRENCY)
+
+# Request rate and latency per route for /metrics, as in merge2.py
+@app.before_request
+async def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+async def record_request_metrics(response):
+    start = g.pop('request_start', None)
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    if start is not None and route != '/metrics':
+        metrics.http_request_duration_seconds.observe(time.perf_counter() - start, route=route, method=request.method)
+        metrics.http_requests_total.inc(route=route, method=request.method, status=str(response.status_code))
+    return response
+
+@app.teardown_request
+async def record_unhandled_error(exc):
+    if exc is not None:
+        metrics.errors_total.inc(stage="request", type=type(exc).__name__)
+
+@app.route('/metrics', methods=['GET'])
+async def metrics_endpoint():
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+# Enable CORS
+@app.after_request
+async def after_request(response):
+    response.headers.add("Access-Control-Allow-Origin", "*")
+    response.headers.add("Access-Control-Allow-Headers", "Content-Type,Authorization")
+    response.headers.add("Access-Control-Allow-Methods", "GET,POST,OPTIONS")
+    return response
+
+# Same degraded 503 as merge2.py when a table is unhealthy or too slow
+@app.errorhandler(UpstreamUnavailableError)
+async def upstream_unavailable(e):
+    metrics.errors_total.inc(stage="request", type=type(e).__name__)
+    response = jsonify({"error": str(e), "degraded": True, "table": e.table_id})
+    response.status_code = 503
+    if e.retry_after:
+        response.headers["Retry-After"] = str(math.ceil(e.retry_after))
+    return response
+
+
+async def chat_endpoint(chatbot: AsyncChatbot):
+    data = await request.get_json()
+    if not isinstance(data, dict) or 'message' not in data:
+        return jsonify({"error": "Missing 'message' in request body"}), 400
+    if not isinstance(data['message'], str):
+        return jsonify({"error": "'message' must be a string"}), 400
+    # Verifying the ID token may fetch Google's signing keys
+    key = await asyncio.to_thread(conversation_key, data, request.headers)
+    ai_response = await chatbot.chat(data['message'], key)
+    return jsonify({"response": ai_response})
+
+
+async def upload_endpoint(kind: str, allowed_extensions):
+    files = await request.files
+    if 'file' not in files:
+        return jsonify({"error": "No file part in the request"}), 400
+    file = files['file']
+    if file.filename == '':
+        return jsonify({"error": "No file selected"}), 400
+    if not os.path.splitext(file.filename)[1].lower() in allowed_extensions:
+        return jsonify({"error": f"Unsupported file format. Use: {list(allowed_extensions)}"}), 400
+    try:
+        form = await request.form
+        result = await analyze_upload(kind, file.read(), file.filename, upload_scope(form, request.headers))
+        if result is None:
+            return jsonify({"error": f"Failed to process the {kind}"}), 500
+        return jsonify(result), 200
+    except UpstreamUnavailableError:
+        raise
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Endpoints
+@app.route('/api/get-user-data', methods=['POST'])
+async def get_user_data_endpoint():
+    try:
+        data = await request.get_json()
+        user_email = data.get('email')
+        if not user_email:
+            return jsonify({"error": "Email is required"}), 400
+        try:
+            fields = requested_fields(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        user_data = await asyncio.to_thread(get_user_data, user_email, fields)
+        if not user_data:
+            return jsonify({"error": "User not found"}), 404
+        return jsonify(user_data), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/emotional-support', methods=['POST'])
+async def emotional_support():
+    return await chat_endpoint(emotional_support_chatbot)
+
+@app.route('/api/check-symptoms', methods=['POST'])
+async def check_symptoms():
+    return await chat_endpoint(check_symptoms_chatbot)
+
+@app.route('/api/medicine-recommendation', methods=['POST'])
+async def medicine_recommendation():
+    return await chat_endpoint(medicine_recommendation_chatbot)
+
+@app.route('/api/user-guide', methods=['POST'])
+async def user_guide():
+    return await chat_endpoint(user_guide_chatbot)
+
+@app.route('/api/process-photo', methods=['POST'])
+async def process_photo():
+    return await upload_endpoint("photo", ALLOWED_PHOTO_EXTENSIONS)
+
+@app.route('/api/process-document', methods=['POST'])
+async def process_document():
+    return await upload_endpoint("document", ALLOWED_DOCUMENT_EXTENSIONS)
+
+@app.route('/api/get-diet-recommendations', methods=['POST'])
+async def get_diet_recommendations():
+    try:
+        data = await request.get_json()
+        user_email = data.get('email')
+        if not user_email:
+            return jsonify({"error": "Email is required"}), 400
+        user_data = await asyncio.to_thread(get_user_data, user_email, DIET_PROFILE_FIELDS)
+        if not user_data:
+            return jsonify({"error": "User not found"}), 404
+        formatted_data = diet_processor.format_for_diet_recommendation(user_data)
+        if not formatted_data:
+            return jsonify({"error": "Failed to format data"}), 500
+        regenerate = bool(data.get('regenerate')) or request.args.get('regenerate') == '1'
+        recommendations = await diet_processor.get_recommendations(formatted_data, regenerate=regenerate)
+        if not recommendations:
+            return jsonify({"error": "Failed to generate recommendations"}), 500
+        response = {
+            "user_data": user_data,
+            "recommendations": recommendations
+        }
+        return jsonify(response), 200
+    except UpstreamUnavailableError:
+        raise
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/health', methods=['GET'])
+async def health():
+    return jsonify({"status": "API is running"}), 200
+
+if __name__ == "__main__":
+    app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,107 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Cold-start benchmark for merge2.py: time to import the app and answer the first /api/health
+# in a fresh interpreter, plus the slowest modules from -X importtime.
+# Use --record to append a result line to a history file and track cold start across releases.
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must stay unloaded until first use; importing merge2 must not pull them in
+DEFERRED_MODULES = ("jamaibase", "jamaibase.protocol", "PIL", "pdfplumber", "firebase_admin", "google.cloud.firestore_v1")
+
+PROBE = """
+import sys
+import time
+start = time.perf_counter()
+import merge2
+imported = time.perf_counter()
+loaded = [name for name in DEFERRED_MODULES if name in sys.modules]
+assert not loaded, f"import merge2 loaded deferred modules: {loaded}"
+response = merge2.app.test_client().get('/api/health')
+assert response.status_code == 200
+served = time.perf_counter()
+print(f"{imported - start} {served - start}")
+"""
+
+
+def run_probe():
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", f"DEFERRED_MODULES = {DEFERRED_MODULES!r}\n{PROBE}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if output.returncode != 0:
+        sys.exit(f"cold-start probe failed:\n{output.stderr.strip().splitlines()[-1]}")
+    output = output.stdout
+    process_s = time.perf_counter() - start
+    import_s, first_health_s = (float(value) for value in output.strip().splitlines()[-1].split())
+    return import_s, first_health_s, process_s
+
+
+def slowest_imports(limit):
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import merge2"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stderr
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|", 2)
+        # Nested imports are indented; keep only top-level ones so nothing is counted twice
+        name = name[1:]
+        if not name.startswith(" "):
+            entries.append((int(cumulative_us), name.strip()))
+    return sorted(entries, reverse=True)[:limit]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure merge2.py cold-start time.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--record", help="append the result as a JSON line to this file")
+    args = parser.parse_args()
+
+    samples = [run_probe() for _ in range(args.runs)]
+    imports = [sample[0] for sample in samples]
+    first_health = [sample[1] for sample in samples]
+    processes = [sample[2] for sample in samples]
+
+    result = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import_ms_median": statistics.median(imports) * 1000,
+        "first_health_ms_median": statistics.median(first_health) * 1000,
+        "process_ms_median": statistics.median(processes) * 1000,
+    }
+    print(f"import merge2:            {result['import_ms_median']:.0f}ms (median of {args.runs})")
+    print(f"import + first /api/health: {result['first_health_ms_median']:.0f}ms")
+    print(f"whole interpreter run:    {result['process_ms_median']:.0f}ms")
+    print("slowest top-level imports:")
+    for cumulative_us, name in slowest_imports(args.top):
+        print(f"  {cumulative_us / 1000:8.1f}ms  {name}")
+
+    if args.record:
+        with open(args.record, "a") as f:
+            f.write(json.dumps(result) + "\n")
+        print(f"recorded to {args.record}")
+
+
+if __name__ == "__main__":
+    main()
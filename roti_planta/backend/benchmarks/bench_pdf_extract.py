@@ -0,0 +1,105 @@
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdfplumber
+import pdf_extract
+
+# Sequential pdfplumber loop (previous DocumentProcessor.extract_text_from_pdf) vs the page-parallel extractor.
+# Uses the PDFs given on the command line, or generates text-heavy multi-page fixtures.
+
+LINE = "Patient presented with elevated fasting glucose 7.8 mmol/L; HbA1c 7.1%; BP 142/91 mmHg."
+
+
+def build_pdf(page_count: int, lines_per_page: int = 45) -> bytes:
+    objects = []
+    page_ids = []
+    font_id = 3
+    next_id = 4
+    contents = []
+    for page_number in range(page_count):
+        text_ops = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+        for line_number in range(lines_per_page):
+            text = f"Page {page_number + 1} line {line_number + 1}: {LINE}"
+            text_ops.append(f"({text}) Tj T*")
+        text_ops.append("ET")
+        stream = "\n".join(text_ops).encode("latin-1")
+        page_id, content_id = next_id, next_id + 1
+        next_id += 2
+        page_ids.append(page_id)
+        contents.append((page_id, content_id, stream))
+
+    objects.append((1, b"<< /Type /Catalog /Pages 2 0 R >>"))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects.append((2, f"<< /Type /Pages /Kids [{kids}] /Count {page_count} >>".encode()))
+    objects.append((font_id, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"))
+    for page_id, content_id, stream in contents:
+        objects.append((page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode()))
+        objects.append((content_id, f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream"))
+
+    objects.sort()
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = {}
+    for object_id, body in objects:
+        offsets[object_id] = out.tell()
+        out.write(f"{object_id} 0 obj\n".encode() + body + b"\nendobj\n")
+    xref_offset = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for object_id in range(1, len(objects) + 1):
+        out.write(f"{offsets[object_id]:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+    return out.getvalue()
+
+
+def sequential_extract(data: bytes) -> str:
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        return "".join(page.extract_text() or "" for page in pdf.pages).strip()
+
+
+def best_of(fn, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sequential vs page-parallel PDF extraction.")
+    parser.add_argument("pdfs", nargs="*", help="PDF fixtures; generated when omitted")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 40])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.pdfs:
+        fixtures = []
+        for path in args.pdfs:
+            with open(path, "rb") as f:
+                fixtures.append((os.path.basename(path), f.read()))
+    else:
+        fixtures = [(f"generated-{pages}p", build_pdf(pages)) for pages in args.pages]
+
+    # Start the pool before timing so worker start-up is not counted
+    pdf_extract.warmup()
+
+    print(f"workers={pdf_extract.PDF_EXTRACT_WORKERS} pages_per_task={pdf_extract.PDF_PAGES_PER_TASK}")
+    for name, data in fixtures:
+        sequential_s, expected = best_of(lambda: sequential_extract(data), args.repeat)
+        parallel_s, actual = best_of(lambda: pdf_extract.extract_text(data, max_pages=10**6, timeout=600), args.repeat)
+        same = "same output" if expected == actual else "OUTPUT DIFFERS"
+        print(f"{name:>20}: sequential {sequential_s * 1000:8.1f}ms  parallel {parallel_s * 1000:8.1f}ms  "
+              f"speedup {sequential_s / parallel_s:5.2f}x  ({same})")
+
+
+if __name__ == "__main__":
+    main()
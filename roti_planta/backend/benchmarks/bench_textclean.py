@@ -0,0 +1,127 @@
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import textclean
+
+# Micro-benchmark of textclean.py against the per-class cleaners it replaced,
+# on generated multi-KB LLM outputs. Also checks that both produce identical output.
+
+
+# Previous implementations, copied verbatim from merge2.py
+def legacy_chat(text):
+    cleaned = text.replace("", "").replace("*", "")
+    return cleaned
+
+
+def legacy_report(text):
+    return text.replace("", "").replace("---", "")
+
+
+def legacy_photo(text):
+    cleaned = text.replace("", "").replace("---", "")
+    lines = cleaned.split('\n')
+    formatted_lines = []
+    in_interpretation = False
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if "What Happened in the Image" in line and not line.endswith(":"):
+            line = "What Happened in the Image:"
+        elif "Interpretation" in line and not line.endswith(":"):
+            line = "Interpretation:"
+            in_interpretation = True
+        if in_interpretation and line.startswith("-"):
+            line = line.replace("- ", "• ")
+        formatted_lines.append(line)
+
+    return '\n\n'.join(formatted_lines)
+
+
+def legacy_meal_plan(meal_plan):
+    if meal_plan == "Not available":
+        return meal_plan
+    cleaned = meal_plan.replace("", "").replace("#", "").replace("##", "").replace("###", "").replace("####", "")
+    phrases_to_remove = [
+        "Breakfast Meal Plan",
+        "Lunch Meal Plan",
+        "Dinner Meal Plan",
+        "Fiber-Rich, Low-GI Foods and Lean Proteins"
+    ]
+    for phrase in phrases_to_remove:
+        cleaned = cleaned.replace(phrase, "")
+    lines = cleaned.split('\n')
+    formatted_lines = []
+    for line in lines:
+        line = line.strip()
+        if line:
+            line = line.replace("Carbs:", "Carbs: ").replace("Protein:", "Protein: ").replace("Fat:", "Fat: ").replace("Fiber:", "Fiber: ").replace("Calories:", "Total Calories: ")
+            if not line.startswith("1.") and not line.startswith("2.") and not line.startswith("3.") and not line.startswith("-") and not line.startswith("Total "):
+                continue
+            formatted_lines.append(line)
+    return '\n'.join(formatted_lines)
+
+
+FOODS = ["Oatmeal with chia seeds", "Grilled chicken breast", "Brown rice", "Steamed broccoli", "Greek yogurt",
+         "Lentil soup", "Baked salmon", "Quinoa salad", "Boiled egg", "Tempeh stir-fry"]
+
+
+def make_meal_plan(rng, meals):
+    lines = ["### Breakfast Meal Plan", "**Fiber-Rich, Low-GI Foods and Lean Proteins**", ""]
+    for number in range(meals):
+        lines.append(f"{number % 3 + 1}. **{rng.choice(FOODS)}** ({rng.randint(80, 250)}g)")
+        lines.append(f"   - Carbs:{rng.randint(5, 60)}g Protein:{rng.randint(2, 40)}g Fat:{rng.randint(1, 20)}g Fiber:{rng.randint(1, 12)}g")
+        lines.append(f"   - Calories:{rng.randint(90, 600)} kcal")
+        lines.append("Some explanatory sentence the model added that should be dropped.")
+        lines.append("")
+    lines.append(f"#### Total Calories: {rng.randint(900, 2200)} kcal")
+    return "\n".join(lines)
+
+
+def make_photo_result(rng, bullets):
+    lines = ["**What Happened in the Image**", "The photo shows a reddish rash on the forearm.", "---",
+             "**Interpretation**"]
+    for _ in range(bullets):
+        lines.append(f"- Possible {rng.choice(['contact dermatitis', 'insect bite', 'eczema flare'])}; "
+                     f"monitor for {rng.randint(2, 7)} days.")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def make_chat_reply(rng, paragraphs):
+    return "\n\n".join(
+        f"**Point {i}:** Drink water, rest, and *monitor* your temperature. --- Seek care if it exceeds {rng.randint(38, 40)}C."
+        for i in range(paragraphs)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark shared text post-processing against the old cleaners.")
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    cases = [
+        ("meal plan", legacy_meal_plan, textclean.clean_meal_plan, make_meal_plan(rng, 30)),
+        ("photo", legacy_photo, textclean.clean_photo_text, make_photo_result(rng, 40)),
+        ("report", legacy_report, textclean.clean_report_text, make_chat_reply(rng, 40)),
+        ("chat", legacy_chat, textclean.clean_chat_text, make_chat_reply(rng, 40)),
+    ]
+    for name, legacy, shared, sample in cases:
+        if legacy(sample) != shared(sample):
+            raise SystemExit(f"{name}: output differs from the previous implementation")
+        legacy_s = min(timeit.repeat(lambda: legacy(sample), number=args.number, repeat=3))
+        shared_s = min(timeit.repeat(lambda: shared(sample), number=args.number, repeat=3))
+        print(f"{name:>10} ({len(sample) / 1024:4.1f} KB): legacy {legacy_s / args.number * 1e6:7.1f}us  "
+              f"shared {shared_s / args.number * 1e6:7.1f}us  speedup {legacy_s / shared_s:4.2f}x  (same output)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import http_compression
+import textclean
+from bench_textclean import make_meal_plan
+
+# Bytes on the wire for the heavy JSON responses: uncompressed vs gzip vs brotli (when installed),
+# and for repeated fetches of an unchanged payload with and without If-None-Match revalidation.
+# Payloads are serialized the way Flask's jsonify does outside debug mode (sorted keys, compact).
+
+# Approximate size of the response status line and headers, which 304s still pay
+HEADER_BYTES = 250
+
+
+def make_profile(rng, history_entries):
+    return {
+        "email": "patient@example.com",
+        "name": "Siti Aminah",
+        "age": rng.randint(55, 90),
+        "gender": "female",
+        "weight": rng.randint(45, 90),
+        "height": rng.randint(145, 180),
+        "activityLevel": "Lightly active",
+        "dietaryPreferences": ["Low sugar", "Halal"],
+        "favouriteCuisines": ["Malay", "Chinese", "Indian"],
+        "foodAllergies": ["Peanuts"],
+        "carePoints": rng.randint(0, 5000),
+        "emergencyContacts": [{"name": f"Contact {index}", "phone": f"+60 12-{rng.randint(1000000, 9999999)}"} for index in range(3)],
+        "vitalsHistory": [
+            {"heartRate": rng.randint(55, 110), "steps": rng.randint(0, 12000), "spo2": rng.randint(92, 100),
+             "timestamp": f"2026-10-{index % 28 + 1:02d}T{index % 24:02d}:00:00Z"}
+            for index in range(history_entries)
+        ],
+    }
+
+
+def payloads(rng, history_entries):
+    profile = make_profile(rng, history_entries)
+    recommendations = {meal: textclean.clean_meal_plan(make_meal_plan(rng, 9)) for meal in ("Breakfast", "Lunch", "Dinner")}
+    return {
+        "get-user-data": profile,
+        "get-diet-recommendations": {"user_data": profile, "recommendations": recommendations},
+    }
+
+
+def encode(payload) -> bytes:
+    return (json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--history", type=int, default=50, help="vitals history entries in the profile")
+    parser.add_argument("--fetches", type=int, default=20, help="repeated fetches of an unchanged payload")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    encodings = ["gzip"] + (["br"] if http_compression.BROTLI_AVAILABLE else [])
+    if not http_compression.BROTLI_AVAILABLE:
+        print("brotli not installed, measuring gzip only")
+
+    for name, payload in payloads(rng, args.history).items():
+        body = encode(payload)
+        print(f"{name}: {len(body)} bytes uncompressed")
+        sizes = {"identity": len(body)}
+        for encoding in encodings:
+            sizes[encoding] = len(http_compression.compress(body, encoding))
+            print(f"  {encoding:>8}: {sizes[encoding]:>7} bytes ({sizes[encoding] / len(body):.1%})")
+        best = min(sizes.values())
+        before = args.fetches * (len(body) + HEADER_BYTES)
+        after = (best + HEADER_BYTES) + (args.fetches - 1) * HEADER_BYTES
+        print(f"  {args.fetches} fetches: {before} bytes before, {after} bytes with compression + 304s "
+              f"({after / before:.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+# Load comparison between the sync Flask app (merge2.py) and the async app (asgi_app.py).
+# Start both servers first, e.g.:
+#   python merge2.py                                    (port 5000)
+#   hypercorn asgi_app:app --bind 0.0.0.0:5001
+# then run:
+#   python benchmarks/compare_sync_async.py --sync http://localhost:5000 --async http://localhost:5001
+
+DEFAULT_ROUTE = "/api/check-symptoms"
+DEFAULT_BODY = {"message": "I have had a mild headache since this morning."}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_load(base_url, route, body, total, concurrency, timeout):
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def one_request():
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(route, json=body)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one_request() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def print_report(name, stats):
+    print(f"{name:>6}: {stats['requests']} requests, {stats['errors']} errors, "
+          f"{stats['elapsed_s']:.2f}s, {stats['throughput_rps']:.1f} req/s, "
+          f"p50 {stats['p50_ms']:.0f}ms, p95 {stats['p95_ms']:.0f}ms, p99 {stats['p99_ms']:.0f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare sync (Flask) and async (ASGI) serving modes under load.")
+    parser.add_argument("--sync", dest="sync_url", default="http://localhost:5000")
+    parser.add_argument("--async", dest="async_url", default="http://localhost:5001")
+    parser.add_argument("--route", default=DEFAULT_ROUTE)
+    parser.add_argument("--message", default=DEFAULT_BODY["message"])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    body = {"message": args.message}
+    results = {}
+    for name, url in (("sync", args.sync_url), ("async", args.async_url)):
+        results[name] = await run_load(url, args.route, body, args.requests, args.concurrency, args.timeout)
+        print_report(name, results[name])
+
+    if results["sync"]["throughput_rps"]:
+        speedup = results["async"]["throughput_rps"] / results["sync"]["throughput_rps"]
+        print(f"async/sync throughput: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,254 @@
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import os
+import random
+import statistics
+import struct
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import standins
+from bench_pdf_extract import build_pdf
+
+# Load test for merge2.py against local JamAI and Firestore stand-ins.
+# Starts the Flask app on a local port, drives the selected routes at the given concurrency and
+# reports throughput and p50/p95/p99 latency per route. Threshold flags make it exit non-zero,
+# so it can gate CI runs:
+#   python benchmarks/loadtest.py --requests 2000 --concurrency 32 --jamai-latency-ms 300 --max-p95-ms 1500
+
+CHAT_ROUTES = {
+    "emotional-support": "/api/emotional-support",
+    "check-symptoms": "/api/check-symptoms",
+    "medicine-recommendation": "/api/medicine-recommendation",
+    "user-guide": "/api/user-guide",
+}
+FAQ = ["How do I redeem vouchers?", "Where is the health board?", "How do I add an emergency contact?"]
+ALL_ROUTES = ["health", "user-data", "bulk-user-data", *CHAT_ROUTES, "chat-batch", "process-photo", "process-document", "diet", "vitals"]
+
+
+def make_png(seed: int, size: int = 64) -> bytes:
+    rng = random.Random(seed)
+    rows = b"".join(b"\x00" + bytes(rng.randrange(256) for _ in range(size * 3)) for _ in range(size))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b"")
+
+
+def multipart(fields, filename, content, content_type):
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, value in fields.items():
+        body.write(f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n{value}\r\n".encode())
+    body.write(f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+               f"Content-Type: {content_type}\r\n\r\n".encode())
+    body.write(content)
+    body.write(f"\r\n--{boundary}--\r\n".encode())
+    return body.getvalue(), f"multipart/form-data; boundary={boundary}"
+
+
+class RequestFactory:
+    def __init__(self, emails, seed: int):
+        self.emails = emails
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.pdf = build_pdf(3)
+
+    def _json(self, path, payload, headers=None):
+        return "POST", path, json.dumps(payload).encode(), "application/json", headers or {}
+
+    def build(self, route: str):
+        with self.lock:
+            email = self.rng.choice(self.emails)
+            bulk_emails = self.rng.sample(self.emails, min(20, len(self.emails)))
+            nonce = self.rng.randrange(10**9)
+            faq = self.rng.choice(FAQ)
+        if route == "health":
+            return "GET", "/api/health", None, None, {}
+        if route == "user-data":
+            return self._json("/api/get-user-data", {"email": email})
+        if route == "bulk-user-data":
+            # As the seeded caregiver, who may read every other profile
+            caregiver = standins.StandInAuth.token(self.emails[0])
+            return self._json("/api/get-users-data", {"emails": bulk_emails}, {"Authorization": f"Bearer {caregiver}"})
+        if route == "vitals":
+            start = time.time() - 60
+            samples = [
+                {"timestamp": start + second * 0.6, "heartRate": 60 + (nonce + second) % 40, "steps": second % 3, "spo2": 95 + second % 5}
+                for second in range(100)
+            ]
+            return self._json("/api/vitals", {"email": email, "samples": samples})
+        if route == "diet":
+            return self._json("/api/get-diet-recommendations", {"email": email})
+        if route == "user-guide":
+            # Anonymous, so repeated FAQs exercise the response cache
+            return self._json(CHAT_ROUTES[route], {"message": faq})
+        if route in CHAT_ROUTES:
+            # With an email the turn goes to the user's conversation table
+            return self._json(CHAT_ROUTES[route], {"email": email, "message": f"I have had a headache for {nonce % 7 + 1} days ({nonce})"})
+        if route == "chat-batch":
+            return self._json("/api/chat/batch", {"items": [
+                {"table": "CheckSymptoms", "message": f"Sore throat and fever ({nonce})"},
+                {"table": "MedicineRecommendation", "message": f"What can I take for a fever? ({nonce})"},
+                {"table": "UserGuide", "message": faq},
+            ]})
+        if route == "process-photo":
+            body, content_type = multipart({"email": email}, "photo.png", make_png(nonce % 50), "image/png")
+            return "POST", "/api/process-photo", body, content_type, {}
+        if route == "process-document":
+            # Bytes after %%EOF are ignored by PDF readers but give each upload its own hash
+            body, content_type = multipart({"email": email}, "report.pdf", self.pdf + f"% {nonce}\n".encode(), "application/pdf")
+            return "POST", "/api/process-document", body, content_type, {}
+        raise ValueError(f"Unknown route: {route}")
+
+
+def send(port: int, method: str, path: str, body, content_type, headers, timeout: float):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    headers = dict(headers, **{"Content-Type": content_type}) if content_type else headers
+    start = time.perf_counter()
+    try:
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        status = response.status
+    except OSError:
+        status = 0
+    finally:
+        connection.close()
+    return status, time.perf_counter() - start
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(samples, elapsed):
+    latencies = [latency for _, latency in samples]
+    errors = sum(1 for status, _ in samples if status == 0 or status >= 500)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": errors / len(samples) if samples else 0.0,
+        "throughput_rps": len(samples) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def start_app(app):
+    from werkzeug.serving import make_server
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test merge2.py against local JamAI/Firestore stand-ins.")
+    parser.add_argument("--routes", default=",".join(ALL_ROUTES), help=f"comma-separated subset of {ALL_ROUTES}")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--jamai-latency-ms", type=float, default=200.0)
+    parser.add_argument("--jamai-sigma", type=float, default=0.4)
+    parser.add_argument("--jamai-error-rate", type=float, default=0.0)
+    parser.add_argument("--upload-latency-ms", type=float, default=50.0)
+    parser.add_argument("--firestore-latency-ms", type=float, default=30.0)
+    parser.add_argument("--firestore-sigma", type=float, default=0.3)
+    parser.add_argument("--firestore-error-rate", type=float, default=0.0)
+    parser.add_argument("--max-p95-ms", type=float, help="fail if any route's p95 exceeds this")
+    parser.add_argument("--max-error-rate", type=float, help="fail if the overall error rate exceeds this")
+    parser.add_argument("--min-throughput", type=float, help="fail if overall requests/s falls below this")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's console output")
+    args = parser.parse_args()
+
+    routes = [route.strip() for route in args.routes.split(",") if route.strip()]
+    unknown = set(routes) - set(ALL_ROUTES)
+    if unknown:
+        parser.error(f"unknown routes: {sorted(unknown)}")
+
+    work_dir = tempfile.mkdtemp(prefix="vcare-loadtest-")
+    os.environ["RESULT_STORE_PATH"] = os.path.join(work_dir, "results.db")
+    os.environ["CHAT_CONVERSATION_STORE_PATH"] = os.path.join(work_dir, "conversations.db")
+    os.environ.setdefault("PROFILE_CACHE_LISTENER", "0")
+    import merge2
+    import services
+
+    jamai_models = {
+        "table": standins.LatencyModel(args.jamai_latency_ms, args.jamai_sigma, args.jamai_error_rate, seed=args.seed),
+        "file": standins.LatencyModel(args.upload_latency_ms, args.jamai_sigma, args.jamai_error_rate, seed=args.seed + 1),
+    }
+    firestore_model = standins.LatencyModel(args.firestore_latency_ms, args.firestore_sigma, args.firestore_error_rate, seed=args.seed + 2)
+    _, emails = standins.install(services, merge2, jamai_models, firestore_model, args.users)
+
+    server = start_app(merge2.app)
+    factory = RequestFactory(emails, args.seed)
+    plan = [routes[index % len(routes)] for index in range(args.requests)]
+    samples = {route: [] for route in routes}
+    samples_lock = threading.Lock()
+
+    def run(route):
+        method, path, body, content_type, headers = factory.build(route)
+        result = send(server.server_port, method, path, body, content_type, headers, args.timeout)
+        with samples_lock:
+            samples[route].append(result)
+
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    with quiet:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            list(executor.map(run, plan))
+        elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    report = {route: summarize(route_samples, elapsed) for route, route_samples in samples.items()}
+    report["overall"] = summarize([sample for route_samples in samples.values() for sample in route_samples], elapsed)
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, "
+          f"JamAI median {args.jamai_latency_ms:.0f}ms, Firestore median {args.firestore_latency_ms:.0f}ms")
+    print(f"{'route':>24} {'reqs':>6} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, stats in report.items():
+        print(f"{route:>24} {stats['requests']:>6} {stats['errors']:>5} {stats['throughput_rps']:>8.1f} "
+              f"{stats['p50_ms']:>8.0f} {stats['p95_ms']:>8.0f} {stats['p99_ms']:>8.0f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failures = []
+    if args.max_p95_ms is not None:
+        failures += [f"{route} p95 {stats['p95_ms']:.0f}ms > {args.max_p95_ms:.0f}ms"
+                     for route, stats in report.items() if route != "overall" and stats["p95_ms"] > args.max_p95_ms]
+    if args.max_error_rate is not None and report["overall"]["error_rate"] > args.max_error_rate:
+        failures.append(f"error rate {report['overall']['error_rate']:.3f} > {args.max_error_rate}")
+    if args.min_throughput is not None and report["overall"]["throughput_rps"] < args.min_throughput:
+        failures.append(f"throughput {report['overall']['throughput_rps']:.1f} < {args.min_throughput} req/s")
+    if failures:
+        print("FAILED: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
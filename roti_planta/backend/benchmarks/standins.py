@@ -0,0 +1,298 @@
+import itertools
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Optional
+
+from jamaibase import protocol as p
+
+# Local stand-ins for the JamAI table/file API and the Firestore users collection.
+# They implement just the client surface services.py and merge2.py use, with configurable latency and error rates,
+# so the app can be load-tested without touching the real JamAI project or Firestore.
+# JamAI responses are real jamaibase.protocol models, so the app parses exactly what the SDK returns.
+
+
+class StandInError(RuntimeError):
+    pass
+
+
+# Log-normal latency around a median, plus an independent error probability
+class LatencyModel:
+    def __init__(self, median_ms: float = 0.0, sigma: float = 0.0, error_rate: float = 0.0, seed: int = None):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def wait(self, label: str):
+        with self._lock:
+            delay_ms = self.median_ms * math.exp(self._random.gauss(0, self.sigma)) if self.median_ms else 0.0
+            fail = self._random.random() < self.error_rate
+        if delay_ms:
+            time.sleep(delay_ms / 1000)
+        if fail:
+            raise StandInError(f"stand-in failure injected for {label}")
+
+
+OUTPUT_COLUMNS = {
+    "Photo_Analysis": ("Result",),
+    "Report": ("Analysis",),
+    "Diet_Recommendation": ("Breakfast", "Lunch", "Dinner"),
+}
+
+SAMPLE_OUTPUTS = {
+    "AI": "**Thank you for sharing.** Rest, stay hydrated and *monitor* your symptoms. See a doctor if they persist.",
+    "Result": "**What Happened in the Image**\nA mild rash on the forearm.\n---\n**Interpretation**\n- Likely contact dermatitis\n- Keep the area clean",
+    "Analysis": "**Summary**\nFasting glucose slightly elevated.\n---\nRecommend follow-up HbA1c in 3 months.",
+    "Breakfast": "### Breakfast Meal Plan\n1. Oatmeal with chia seeds\n- Carbs:40g Protein:10g Fat:6g Fiber:8g\nCalories:310 kcal",
+    "Lunch": "### Lunch Meal Plan\n1. Grilled chicken with brown rice\n- Carbs:55g Protein:35g Fat:9g Fiber:5g\nCalories:520 kcal",
+    "Dinner": "### Dinner Meal Plan\n1. Baked salmon with broccoli\n- Carbs:20g Protein:32g Fat:18g Fiber:6g\nCalories:450 kcal",
+}
+
+
+def completion(column: str) -> p.ChatCompletionChunk:
+    return p.ChatCompletionChunk(
+        id=f"chatcmpl-{uuid.uuid4().hex}",
+        created=int(time.time()),
+        model="stand-in",
+        usage=p.CompletionUsage(),
+        choices=[p.ChatCompletionChoice(message=p.ChatEntry.assistant(SAMPLE_OUTPUTS[column]), index=0, finish_reason="stop")],
+    )
+
+
+class StandInTableClient:
+    def __init__(self, models):
+        self.models = models
+
+    def add_table_rows(self, table_type, request):
+        table_id = request.table_id
+        self.models["table"].wait(table_id)
+        columns = OUTPUT_COLUMNS.get(table_id, ("AI",))
+        rows = [
+            p.GenTableChatCompletionChunks(row_id=uuid.uuid4().hex, columns={column: completion(column) for column in columns})
+            for _ in request.data
+        ]
+        return p.GenTableRowsChatCompletionChunks(rows=rows)
+
+    def duplicate_table(self, table_type, table_id_src, table_id_dst=None, include_data=True, create_as_child=False):
+        self.models["table"].wait(table_id_src)
+        return p.TableMeta(id=table_id_dst or f"{table_id_src}_copy", cols=[], parent_id=table_id_src if create_as_child else None)
+
+    def get_table(self, table_type, table_id):
+        self.models["table"].wait(table_id)
+        cols = [p.ColumnSchema(id=column, dtype="str", gen_config=p.LLMGenConfig()) for column in OUTPUT_COLUMNS.get(table_id, ("AI",))]
+        return p.TableMetaResponse(
+            id=table_id, cols=cols, parent_id=None, title="", updated_at="",
+            indexed_at_fts=None, indexed_at_vec=None, indexed_at_sca=None, num_rows=0,
+        )
+
+    def update_gen_config(self, table_type, request):
+        self.models["table"].wait(request.table_id)
+        return self.get_table(table_type, request.table_id)
+
+    def delete_table(self, table_type, table_id, missing_ok=True):
+        self.models["table"].wait(table_id)
+        return p.OkResponse()
+
+
+class StandInFileClient:
+    def __init__(self, models):
+        self.models = models
+        self._ids = itertools.count()
+
+    def upload_file(self, file_path: str) -> p.FileUploadResponse:
+        self.models["file"].wait("file_upload")
+        with open(file_path, "rb") as f:
+            f.read()
+        return p.FileUploadResponse(uri=f"s3://stand-in/{next(self._ids)}/{os.path.basename(file_path)}")
+
+
+class StandInJamAI:
+    def __init__(self, models):
+        self.table = StandInTableClient(models)
+        self.file = StandInFileClient(models)
+
+
+# ---- Firestore ----
+
+class StandInDocument:
+    def __init__(self, doc_id: str, data):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class StandInQuery:
+    def __init__(self, collection, filters=(), limit_count=None, fields=None):
+        self._collection = collection
+        self._filters = tuple(filters)
+        self._limit = limit_count
+        self._fields = fields
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return StandInQuery(self._collection, self._filters + ((field_path, op_string, value),), self._limit, self._fields)
+
+    def limit(self, count: int):
+        return StandInQuery(self._collection, self._filters, count, self._fields)
+
+    def select(self, field_paths):
+        return StandInQuery(self._collection, self._filters, self._limit, tuple(field_paths))
+
+    def _matches(self, data):
+        for field_path, op_string, value in self._filters:
+            if op_string == "==" and data.get(field_path) != value:
+                return False
+            if op_string == "in" and data.get(field_path) not in value:
+                return False
+        return True
+
+    def get(self):
+        self._collection.model.wait("firestore_query")
+        results = []
+        for doc_id, data in self._collection.snapshot():
+            if self._matches(data):
+                if self._fields is not None:
+                    data = {field: data[field] for field in self._fields if field in data}
+                results.append(StandInDocument(doc_id, data))
+                if self._limit is not None and len(results) >= self._limit:
+                    break
+        return results
+
+    def stream(self):
+        return iter(self.get())
+
+
+class StandInDocumentReference:
+    def __init__(self, collection, doc_id: str):
+        self._collection = collection
+        self.id = doc_id
+
+    def get(self):
+        self._collection.model.wait("firestore_get")
+        return self._collection.read(self.id)
+
+    def set(self, data):
+        self._collection.model.wait("firestore_set")
+        self._collection.add(self.id, data)
+
+
+class StandInBatch:
+    def __init__(self, model):
+        self.model = model
+        self._writes = []
+
+    def set(self, reference, data):
+        self._writes.append((reference, data))
+
+    def commit(self):
+        self.model.wait("firestore_commit")
+        for reference, data in self._writes:
+            reference._collection.add(reference.id, data)
+
+
+class StandInWatch:
+    def unsubscribe(self):
+        pass
+
+
+class StandInCollection(StandInQuery):
+    def __init__(self, model):
+        super().__init__(self)
+        self.model = model
+        self.documents = {}
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.documents.items())
+
+    def add(self, doc_id: str, data):
+        with self._lock:
+            self.documents[doc_id] = dict(data)
+
+    def read(self, doc_id: str) -> StandInDocument:
+        with self._lock:
+            return StandInDocument(doc_id, self.documents.get(doc_id))
+
+    def document(self, doc_id: Optional[str] = None) -> StandInDocumentReference:
+        return StandInDocumentReference(self, doc_id or uuid.uuid4().hex)
+
+    def on_snapshot(self, callback):
+        return StandInWatch()
+
+
+class StandInFirestore:
+    def __init__(self, model: LatencyModel):
+        self.model = model
+        self.collections = {}
+
+    def collection(self, name: str) -> StandInCollection:
+        if name not in self.collections:
+            self.collections[name] = StandInCollection(self.model)
+        return self.collections[name]
+
+    def get_all(self, references):
+        self.model.wait("firestore_get_all")
+        return [reference._collection.read(reference.id) for reference in references]
+
+    def batch(self) -> StandInBatch:
+        return StandInBatch(self.model)
+
+
+# Firebase Auth: "stand-in:<email>" is a valid ID token for <email>
+class StandInAuth:
+    @staticmethod
+    def token(email: str) -> str:
+        return f"stand-in:{email}"
+
+    def verify_id_token(self, token: str):
+        if not token.startswith("stand-in:"):
+            raise ValueError("invalid stand-in ID token")
+        return {"email": token[len("stand-in:"):]}
+
+
+# The first user is a caregiver for all the others
+def seed_users(db: StandInFirestore, count: int):
+    users = db.collection("users")
+    emails = []
+    for index in range(count):
+        email = f"user{index}@loadtest.local"
+        users.add(f"user-{index}", {
+            "email": email,
+            "age": 30 + index % 40,
+            "gender": "female" if index % 2 else "male",
+            "weight": 55 + index % 30,
+            "height": 155 + index % 30,
+            "activityLevel": "Moderate",
+            "dietaryPreferences": ["Low sugar"],
+            "favouriteCuisines": ["Malay", "Chinese"],
+            "foodAllergies": ["Peanuts"] if index % 5 == 0 else [],
+        })
+        emails.append(email)
+    if emails:
+        users.add("user-0", dict(users.read("user-0").to_dict(), patients=emails[1:]))
+    return emails
+
+
+# Points freshly imported services and merge2 modules at the stand-ins
+def install(services, merge2, jamai_models, firestore_model: LatencyModel, user_count: int):
+    # Long reports are merged on a separate, configurable table with the same output column as "Report"
+    OUTPUT_COLUMNS[services.REPORT_MERGE_TABLE_ID] = ("Analysis",)
+    for pool in services.jamai_clients.pools.values():
+        pool.factory = lambda: StandInJamAI(jamai_models)
+    db = StandInFirestore(firestore_model)
+    emails = seed_users(db, user_count)
+    services.initialize_firebase = lambda: db
+    services.firebase_auth = StandInAuth()
+    services.diet_plan_store.client_factory = lambda: db
+    merge2.vitals_buffer.client_factory = lambda: db
+    return db, emails
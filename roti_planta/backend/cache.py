@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+# Thread-safe LRU cache with a per-entry time-to-live.
+# Entries are evicted when they expire or when the cache is over max_size (least recently used first).
+# on_evict(key, value), if given, is called outside the lock for every evicted entry (not for invalidate/pop).
+class TTLCache:
+    def __init__(self, max_size: int = 256, ttl: float = 3600.0, on_evict=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _evicted(self, entries):
+        if self.on_evict is not None:
+            for key, value in entries:
+                self.on_evict(key, value)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+            self.evictions += 1
+            self.misses += 1
+        self._evicted([(key, value)])
+        return default
+
+    def set(self, key, value, ttl: float = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        evicted = []
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                evicted_key, (evicted_value, _) = self._data.popitem(last=False)
+                evicted.append((evicted_key, evicted_value))
+                self.evictions += 1
+        self._evicted(evicted)
+
+    # Evicts every expired entry; entries otherwise only expire when they are looked up
+    def sweep(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            expired = [(key, value) for key, (value, expires_at) in self._data.items() if expires_at <= now]
+            for key, _ in expired:
+                del self._data[key]
+            self.evictions += len(expired)
+        self._evicted(expired)
+        return len(expired)
+
+    def invalidate(self, key) -> bool:
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    # Removes and returns the entry's value without calling on_evict
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._data)
+            self._data.clear()
+            return count
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,344 @@
+import asyncio
+import hashlib
+import queue
+import secrets
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional
+
+from cache import TTLCache
+
+
+# One user's conversation with one chat agent.
+# JamAI feeds every earlier row of a chat table back into the prompt, so each conversation gets
+# its own empty copy of the agent table, and rolls over to a fresh one after max_turns rows.
+# The last few turns are carried into the new table as a short recap, so the prompt stays bounded.
+class Conversation:
+    def __init__(self, agent_id: str, key: str, recap_turns: int, recap_chars: int):
+        self.agent_id = agent_id
+        self.key = key
+        self.digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+        self.table_id: Optional[str] = None
+        self.generation = 0
+        self.turns = 0
+        self.recent = deque(maxlen=recap_turns)
+        self.recap_chars = recap_chars
+        # Set once the conversation left the store and its table is being deleted
+        self.retired = False
+        # Turns of one conversation are sent one at a time so rows land in order
+        self.lock = threading.Lock()
+
+    # Unique even when two workers roll the same conversation over at once
+    def next_table_id(self) -> str:
+        return f"{self.agent_id}_{self.digest}_{int(time.time())}_{self.generation}_{secrets.token_hex(3)}"
+
+    def start(self, table_id: str):
+        self.table_id = table_id
+        self.generation += 1
+        self.turns = 0
+
+    def _clip(self, text: str) -> str:
+        text = " ".join(text.split())
+        return text if len(text) <= self.recap_chars else text[:self.recap_chars].rstrip() + "..."
+
+    # Message for the next row: the first row of a rolled-over table is prefixed with the recap
+    def prepare(self, user_message: str) -> str:
+        if self.turns or not self.recent:
+            return user_message
+        lines = ["Earlier in this conversation:"]
+        for user_text, ai_text in self.recent:
+            lines.append(f"User: {self._clip(user_text)}")
+            lines.append(f"You: {self._clip(ai_text)}")
+        return "\n".join(lines) + "\n\nUser now says: " + user_message
+
+    def record(self, user_message: str, ai_response: str):
+        self.turns += 1
+        self.recent.append((user_message, ai_response))
+
+
+# Which table each conversation uses, in SQLite, so a restarted process or another worker on the same
+# host carries on with the conversation instead of orphaning its table. path None keeps the records
+# in memory (one process only). Writes that start a table are compare-and-set on the table they replace.
+class ConversationRecords:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = None
+
+    # The database is opened on first use; callers hold self._lock
+    @property
+    def _conn(self):
+        if self._db is None:
+            self._db = self._open()
+        return self._db
+
+    def _open(self):
+        conn = sqlite3.connect(self.path or ":memory:", check_same_thread=False, timeout=10)
+        if self.path:
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            " agent_id TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " table_id TEXT NOT NULL,"
+            " generation INTEGER NOT NULL,"
+            " turns INTEGER NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (agent_id, key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS conversations_last_used ON conversations (last_used)")
+        conn.commit()
+        return conn
+
+    # (table_id, generation, turns), or None when the conversation has no table
+    def load(self, agent_id: str, key: str):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT table_id, generation, turns FROM conversations WHERE agent_id = ? AND key = ?",
+                (agent_id, key),
+            ).fetchone()
+
+    # Records table_id as the conversation's table if its table is still previous_table_id.
+    # False when another worker started or reset the conversation in the meantime.
+    def start(self, agent_id: str, key: str, table_id: str, generation: int, previous_table_id: Optional[str]) -> bool:
+        now = time.time()
+        with self._lock:
+            if previous_table_id is None:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO conversations (agent_id, key, table_id, generation, turns, last_used)"
+                    " VALUES (?, ?, ?, ?, 0, ?)",
+                    (agent_id, key, table_id, generation, now),
+                )
+            else:
+                cursor = self._conn.execute(
+                    "UPDATE conversations SET table_id = ?, generation = ?, turns = 0, last_used = ?"
+                    " WHERE agent_id = ? AND key = ? AND table_id = ?",
+                    (table_id, generation, now, agent_id, key, previous_table_id),
+                )
+            self._conn.commit()
+            return cursor.rowcount == 1
+
+    def record_turn(self, agent_id: str, key: str, table_id: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE conversations SET turns = turns + 1, last_used = ? WHERE agent_id = ? AND key = ? AND table_id = ?",
+                (time.time(), agent_id, key, table_id),
+            )
+            self._conn.commit()
+
+    # Forgets the conversation and returns its table id
+    def remove(self, agent_id: str, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT table_id FROM conversations WHERE agent_id = ? AND key = ?", (agent_id, key)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "DELETE FROM conversations WHERE agent_id = ? AND key = ? AND table_id = ?", (agent_id, key, row[0])
+            )
+            self._conn.commit()
+            return row[0]
+
+    # Forgets conversations idle since before cutoff (epoch seconds) and returns their table ids
+    def remove_idle(self, cutoff: float):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT agent_id, key, table_id FROM conversations WHERE last_used < ?", (cutoff,)
+            ).fetchall()
+            removed = []
+            for agent_id, key, table_id in rows:
+                cursor = self._conn.execute(
+                    "DELETE FROM conversations WHERE agent_id = ? AND key = ? AND table_id = ? AND last_used < ?",
+                    (agent_id, key, table_id, cutoff),
+                )
+                if cursor.rowcount:
+                    removed.append(table_id)
+            self._conn.commit()
+            return removed
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+
+# Conversations by (agent table, user/session key). Which table a conversation uses is kept in
+# ConversationRecords and re-read at the start of every turn; the in-memory Conversation holds the
+# turn lock and the recap, and is only dropped from memory when evicted or idle.
+# Tables of rolled-over, reset and idle (ttl) conversations are deleted by a background thread through
+# delete_table(table_id), which also sweeps idle conversations every sweep_interval.
+class ConversationStore:
+    def __init__(self, max_turns: int = 20, recap_turns: int = 3, recap_chars: int = 400,
+                 ttl: float = 21600.0, max_conversations: int = 10000, delete_table=None,
+                 sweep_interval: float = 60.0, path: Optional[str] = None):
+        self.max_turns = max_turns
+        self.recap_turns = recap_turns
+        self.recap_chars = recap_chars
+        self.ttl = ttl
+        self.delete_table = delete_table
+        self.sweep_interval = sweep_interval
+        self.records = ConversationRecords(path)
+        self._conversations = TTLCache(max_size=max_conversations, ttl=ttl)
+        self._lock = threading.Lock()
+        self._retired = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self.rollovers = 0
+        self.tables_deleted = 0
+        self.delete_errors = 0
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="conversation-cleanup", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                item = self._retired.get(timeout=self.sweep_interval)
+            except queue.Empty:
+                self.sweep()
+                continue
+            self._delete(item)
+
+    # Deletes the tables of conversations idle for longer than ttl, in this process or any other
+    def sweep(self) -> int:
+        self._conversations.sweep()
+        table_ids = self.records.remove_idle(time.time() - self.ttl)
+        for table_id in table_ids:
+            self._delete(table_id)
+        return len(table_ids)
+
+    # item is a table id, or (conversation, table id) for a reset conversation: a turn still in flight
+    # on it finishes before its table goes
+    def _delete(self, item):
+        if isinstance(item, tuple):
+            conversation, table_id = item
+            with conversation.lock:
+                conversation.retired = True
+        else:
+            table_id = item
+        if table_id is None or self.delete_table is None:
+            return
+        try:
+            self.delete_table(table_id)
+        except Exception as e:
+            print(f"Error deleting conversation table {table_id}: {str(e)}")
+            with self._lock:
+                self.delete_errors += 1
+            return
+        with self._lock:
+            self.tables_deleted += 1
+
+    def get(self, agent_id: str, key: str) -> Conversation:
+        self._start()
+        cache_key = (agent_id, key)
+        with self._lock:
+            conversation = self._conversations.get(cache_key)
+            if conversation is None:
+                conversation = Conversation(agent_id, key, self.recap_turns, self.recap_chars)
+            # Re-set on every use so the idle timer restarts
+            self._conversations.set(cache_key, conversation)
+            return conversation
+
+    # Brings the conversation's table and turn count up to date with the records;
+    # another worker may have rolled it over, or it may have been reset or swept
+    def _load(self, conversation: Conversation):
+        record = self.records.load(conversation.agent_id, conversation.key)
+        if record is None:
+            conversation.table_id, conversation.turns = None, 0
+        else:
+            conversation.table_id, conversation.generation, conversation.turns = record
+
+    # The conversation, locked for one turn (release() unlocks it). A conversation retired between get()
+    # and the lock is replaced by a fresh one, so no table is ever created for a retired conversation.
+    def acquire(self, agent_id: str, key: str) -> Conversation:
+        while True:
+            conversation = self.get(agent_id, key)
+            conversation.lock.acquire()
+            if self._ready(conversation):
+                return conversation
+
+    # acquire() for the async app. The lock is polled rather than waited on, so the event loop never blocks
+    # and a request cancelled while waiting never holds it.
+    async def acquire_async(self, agent_id: str, key: str, poll_interval: float = 0.01) -> Conversation:
+        while True:
+            conversation = self.get(agent_id, key)
+            while not conversation.lock.acquire(blocking=False):
+                await asyncio.sleep(poll_interval)
+            if self._ready(conversation):
+                return conversation
+
+    # Called with the lock held: loads a live conversation, or unlocks a retired one
+    def _ready(self, conversation: Conversation) -> bool:
+        if conversation.retired:
+            conversation.lock.release()
+            return False
+        try:
+            self._load(conversation)
+        except BaseException:
+            conversation.lock.release()
+            raise
+        return True
+
+    def release(self, conversation: Conversation):
+        conversation.lock.release()
+
+    @contextmanager
+    def turn(self, agent_id: str, key: str):
+        conversation = self.acquire(agent_id, key)
+        try:
+            yield conversation
+        finally:
+            self.release(conversation)
+
+    def needs_table(self, conversation: Conversation) -> bool:
+        return conversation.table_id is None or conversation.turns >= self.max_turns
+
+    # Makes table_id the conversation's table. When another worker got there first,
+    # table_id is deleted again and the conversation continues on that worker's table.
+    def started(self, conversation: Conversation, table_id: str):
+        previous_table_id = conversation.table_id
+        if not self.records.start(conversation.agent_id, conversation.key, table_id,
+                                  conversation.generation + 1, previous_table_id):
+            self._retired.put(table_id)
+            self._load(conversation)
+            return
+        conversation.start(table_id)
+        if previous_table_id is not None:
+            with self._lock:
+                self.rollovers += 1
+            self._retired.put(previous_table_id)
+
+    def record(self, conversation: Conversation, user_message: str, ai_response: str):
+        conversation.record(user_message, ai_response)
+        self.records.record_turn(conversation.agent_id, conversation.key, conversation.table_id)
+
+    def reset(self, agent_id: str, key: str) -> bool:
+        conversation = self._conversations.pop((agent_id, key))
+        table_id = self.records.remove(agent_id, key)
+        if conversation is None and table_id is None:
+            return False
+        self._start()
+        self._retired.put((conversation, table_id) if conversation is not None else table_id)
+        return True
+
+    def stats(self):
+        with self._lock:
+            counters = {
+                "rollovers": self.rollovers,
+                "tables_deleted": self.tables_deleted,
+                "delete_errors": self.delete_errors,
+            }
+        return {
+            "conversations": self.records.count(),
+            "in_memory": len(self._conversations),
+            "max_turns": self.max_turns,
+            "recap_turns": self.recap_turns,
+            **counters,
+            "cache": self._conversations.stats(),
+        }
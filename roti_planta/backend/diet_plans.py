@@ -0,0 +1,105 @@
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+import metrics
+
+# Firestore allows at most 500 writes per batch
+BATCH_WRITE_LIMIT = 500
+
+
+# Generated diet plans in Firestore, one document per profile fingerprint:
+#   diet_plans/{fingerprint} = {"plan": {"Breakfast": ..., "Lunch": ..., "Dinner": ...}, "created_at": epoch seconds}
+# Shared by every worker and by the off-peak precompute job (precompute_diet_plans.py).
+class DietPlanStore:
+    def __init__(self, client_factory, collection: str = "diet_plans", freshness: float = 86400.0):
+        self.client_factory = client_factory
+        self.collection = collection
+        self.freshness = freshness
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def _collection(self):
+        db = self.client_factory()
+        if db is None:
+            raise RuntimeError("Firestore client not available")
+        return db, db.collection(self.collection)
+
+    def _fresh_plan(self, snapshot) -> Optional[Dict[str, str]]:
+        if not snapshot.exists:
+            return None
+        stored = snapshot.to_dict() or {}
+        if time.time() - stored.get("created_at", 0) > self.freshness:
+            return None
+        return stored.get("plan")
+
+    def get(self, fingerprint: str) -> Optional[Dict[str, str]]:
+        try:
+            _, collection = self._collection()
+            with metrics.stage("firestore_diet_plan_get"):
+                snapshot = collection.document(fingerprint).get()
+            plan = self._fresh_plan(snapshot)
+        except Exception as e:
+            print(f"Error reading stored diet plan: {str(e)}")
+            self._count("errors")
+            return None
+        self._count("hits" if plan else "misses")
+        return plan
+
+    # Fresh plans for several fingerprints in one batched read, keyed by fingerprint
+    def get_many(self, fingerprints: Iterable[str]) -> Dict[str, Dict[str, str]]:
+        fingerprints = list(dict.fromkeys(fingerprints))
+        if not fingerprints:
+            return {}
+        db, collection = self._collection()
+        with metrics.stage("firestore_diet_plan_get"):
+            snapshots = db.get_all([collection.document(fingerprint) for fingerprint in fingerprints])
+        plans = {}
+        for snapshot in snapshots:
+            plan = self._fresh_plan(snapshot)
+            if plan:
+                plans[snapshot.id] = plan
+        return plans
+
+    def put(self, fingerprint: str, plan: Dict[str, str]):
+        try:
+            _, collection = self._collection()
+            with metrics.stage("firestore_diet_plan_put"):
+                collection.document(fingerprint).set({"plan": dict(plan), "created_at": time.time()})
+            self._count("writes")
+        except Exception as e:
+            print(f"Error storing diet plan: {str(e)}")
+            self._count("errors")
+
+    # Writes {fingerprint: plan} in batched commits
+    def put_many(self, plans: Dict[str, Dict[str, str]]):
+        db, collection = self._collection()
+        items = list(plans.items())
+        created_at = time.time()
+        for start in range(0, len(items), BATCH_WRITE_LIMIT):
+            batch = db.batch()
+            for fingerprint, plan in items[start:start + BATCH_WRITE_LIMIT]:
+                batch.set(collection.document(fingerprint), {"plan": dict(plan), "created_at": created_at})
+            with metrics.stage("firestore_diet_plan_put"):
+                batch.commit()
+        self._count("writes", len(items))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "collection": self.collection,
+                "freshness_seconds": self.freshness,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "errors": self.errors,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,80 @@
+import asyncio
+import inspect
+import types
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+
+# Request logic shared by the sync app (merge2.py) and the async app (asgi_app.py) is written once,
+# as a flow: a generator that yields each I/O step it needs and is sent the step's result, e.g.
+#     response = yield Call(self.call_table, "Report", self.client.table.add_table_rows, ...)
+#     partials = yield [self.analyze_text_flow(chunk) for chunk in chunks]
+# A step is a Call, another flow, or a list of those run concurrently (results in list order).
+# run() performs the steps in the calling thread, lists on a thread pool; run_async() awaits coroutine
+# functions, runs plain functions in a thread and gathers lists. A failed step raises inside the flow.
+class Call:
+    def __init__(self, fn, *args, **kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+
+def run(flow, concurrency: Optional[int] = None):
+    result, error = None, None
+    try:
+        while True:
+            try:
+                step = flow.throw(error) if error is not None else flow.send(result)
+            except StopIteration as stop:
+                return stop.value
+            try:
+                result, error = _perform(step, concurrency), None
+            except Exception as e:
+                result, error = None, e
+    finally:
+        flow.close()
+
+
+def _perform(step, concurrency):
+    if isinstance(step, Call):
+        return step.fn(*step.args, **step.kwargs)
+    if isinstance(step, types.GeneratorType):
+        return run(step, concurrency)
+    if not step:
+        return []
+    with ThreadPoolExecutor(max_workers=min(concurrency or len(step), len(step))) as executor:
+        return list(executor.map(lambda item: _perform(item, concurrency), step))
+
+
+# Same as run(); a cancelled request closes the flow, so its finally blocks still run
+async def run_async(flow, concurrency: Optional[int] = None):
+    result, error = None, None
+    try:
+        while True:
+            try:
+                step = flow.throw(error) if error is not None else flow.send(result)
+            except StopIteration as stop:
+                return stop.value
+            try:
+                result, error = await _perform_async(step, concurrency), None
+            except Exception as e:
+                result, error = None, e
+    finally:
+        flow.close()
+
+
+async def _perform_async(step, concurrency):
+    if isinstance(step, Call):
+        if inspect.iscoroutinefunction(step.fn):
+            return await step.fn(*step.args, **step.kwargs)
+        # Plain functions are blocking I/O (Firestore, SQLite, PDF workers): keep them off the event loop
+        return await asyncio.to_thread(step.fn, *step.args, **step.kwargs)
+    if isinstance(step, types.GeneratorType):
+        return await run_async(step, concurrency)
+    semaphore = asyncio.Semaphore(concurrency or max(len(step), 1))
+
+    async def bounded(item):
+        async with semaphore:
+            return await _perform_async(item, concurrency)
+
+    return list(await asyncio.gather(*(bounded(item) for item in step)))
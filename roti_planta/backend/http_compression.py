@@ -0,0 +1,86 @@
+import gzip
+import hashlib
+import os
+import threading
+import importlib.util
+from lazy_imports import LazyModule
+
+# brotli is optional; without it responses are gzip-compressed only
+BROTLI_AVAILABLE = importlib.util.find_spec("brotli") is not None
+brotli = LazyModule("brotli")
+
+
+# ETags, conditional requests and Accept-Encoding negotiation for JSON responses.
+# The ETag is a weak validator over the uncompressed JSON, so it stays the same whatever encoding
+# the client negotiates. Streamed responses (SSE) and non-JSON bodies pass through untouched.
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "1") == "1"
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "512"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+_totals_lock = threading.Lock()
+_totals = {"responses": 0, "not_modified": 0, "compressed": 0, "original_bytes": 0, "sent_bytes": 0}
+
+
+def _record(**amounts):
+    with _totals_lock:
+        for name, amount in amounts.items():
+            _totals[name] += amount
+
+
+def totals():
+    with _totals_lock:
+        summary = dict(_totals)
+    summary["enabled"] = COMPRESSION_ENABLED
+    summary["encodings"] = ["br", "gzip"] if BROTLI_AVAILABLE else ["gzip"]
+    summary["saved_ratio"] = (1 - summary["sent_bytes"] / summary["original_bytes"]) if summary["original_bytes"] else 0.0
+    return summary
+
+
+def payload_etag(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+# Preferred encoding the client accepts, or None
+def negotiate_encoding(accept_encodings) -> str:
+    candidates = ["br", "gzip"] if BROTLI_AVAILABLE else ["gzip"]
+    best, best_quality = None, 0
+    for encoding in candidates:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+# after_request hook. conditional=True answers a matching If-None-Match with 304 Not Modified.
+def finalize_response(request, response, conditional: bool):
+    if response.is_streamed or response.status_code != 200 or response.mimetype != "application/json":
+        return response
+    if "Content-Encoding" in response.headers:
+        return response
+    body = response.get_data()
+    etag = payload_etag(body)
+    response.set_etag(etag, weak=True)
+    response.vary.add("Accept-Encoding")
+    if conditional and request.if_none_match.contains_weak(etag):
+        response.status_code = 304
+        response.set_data(b"")
+        response.headers.pop("Content-Type", None)
+        _record(responses=1, not_modified=1, original_bytes=len(body))
+        return response
+    encoding = negotiate_encoding(request.accept_encodings) if COMPRESSION_ENABLED else None
+    if encoding is None or len(body) < COMPRESSION_MIN_BYTES:
+        _record(responses=1, original_bytes=len(body), sent_bytes=len(body))
+        return response
+    compressed = compress(body, encoding)
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    _record(responses=1, compressed=1, original_bytes=len(body), sent_bytes=len(compressed))
+    return response
@@ -0,0 +1,81 @@
+import io
+import os
+import threading
+import time
+import importlib.util
+from lazy_imports import LazyModule
+
+# Pillow is optional and only imported when the first photo is processed
+PIL_AVAILABLE = importlib.util.find_spec("PIL") is not None
+Image = LazyModule("PIL.Image")
+ImageOps = LazyModule("PIL.ImageOps")
+
+
+# Photo preprocessing before the Photo_Analysis upload:
+# apply the EXIF orientation, downscale to IMAGE_MAX_DIMENSION, drop EXIF/metadata and recompress.
+# Without Pillow installed the original bytes are passed through unchanged.
+
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "1600"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+IMAGE_PREPROCESS = os.getenv("IMAGE_PREPROCESS", "1") == "1"
+
+_totals_lock = threading.Lock()
+_totals = {"images": 0, "original_bytes": 0, "processed_bytes": 0, "elapsed_ms": 0.0}
+
+
+def _record(stats):
+    with _totals_lock:
+        _totals["images"] += 1
+        _totals["original_bytes"] += stats["original_bytes"]
+        _totals["processed_bytes"] += stats["processed_bytes"]
+        _totals["elapsed_ms"] += stats["elapsed_ms"]
+
+
+def totals():
+    with _totals_lock:
+        summary = dict(_totals)
+    summary["enabled"] = IMAGE_PREPROCESS and PIL_AVAILABLE
+    summary["max_dimension"] = IMAGE_MAX_DIMENSION
+    summary["jpeg_quality"] = IMAGE_JPEG_QUALITY
+    summary["saved_ratio"] = (1 - summary["processed_bytes"] / summary["original_bytes"]) if summary["original_bytes"] else 0.0
+    return summary
+
+
+def warmup():
+    if PIL_AVAILABLE:
+        Image.open
+
+
+# Returns (processed_bytes, filename, stats)
+def preprocess_image(data: bytes, filename: str, max_dimension: int = None, quality: int = None):
+    max_dimension = max_dimension or IMAGE_MAX_DIMENSION
+    quality = quality or IMAGE_JPEG_QUALITY
+    stats = {"original_bytes": len(data), "processed_bytes": len(data), "elapsed_ms": 0.0}
+    if not IMAGE_PREPROCESS or not PIL_AVAILABLE:
+        return data, filename, stats
+
+    start = time.perf_counter()
+    with Image.open(io.BytesIO(data)) as image:
+        stats["original_size"] = list(image.size)
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        stats["processed_size"] = list(image.size)
+
+        output = io.BytesIO()
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        base_name = os.path.splitext(filename)[0]
+        # Metadata is not copied to the new file, which strips EXIF (including GPS) as well
+        if has_alpha:
+            image.save(output, format="PNG", optimize=True)
+            filename = f"{base_name}.png"
+        else:
+            image.convert("RGB").save(output, format="JPEG", quality=quality, optimize=True, progressive=True)
+            filename = f"{base_name}.jpg"
+
+    processed = output.getvalue()
+    stats["processed_bytes"] = len(processed)
+    stats["elapsed_ms"] = (time.perf_counter() - start) * 1000
+    _record(stats)
+    print(f"Preprocessed {filename}: {stats['original_bytes']} -> {stats['processed_bytes']} bytes, "
+          f"{stats['original_size']} -> {stats['processed_size']} px in {stats['elapsed_ms']:.0f}ms")
+    return processed, filename, stats
@@ -0,0 +1,143 @@
+import itertools
+import threading
+import types
+from contextlib import contextmanager
+from functools import partial
+
+
+# Fixed set of shared JamAI clients. Each client owns a thread-safe httpx connection pool that keeps
+# its connections alive between calls, so clients are shared by concurrent callers instead of being
+# checked out one per call: a pool never limits how many JamAI calls run at once, it only spreads them
+# over a few connection pools. Clients are created on first demand and handed out round-robin.
+class ClientPool:
+    def __init__(self, name: str, factory, size: int):
+        self.name = name
+        self.factory = factory
+        self.size = size
+        self._clients = []
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._in_flight = 0
+
+    def acquire(self):
+        index = next(self._next) % self.size
+        with self._lock:
+            if index < len(self._clients):
+                return self._clients[index]
+            # Built under the lock so concurrent first calls do not create clients past the size
+            client = self.factory()
+            self._clients.append(client)
+            return client
+
+    # Creates every client ahead of the first request
+    def fill(self):
+        with self._lock:
+            while len(self._clients) < self.size:
+                self._clients.append(self.factory())
+
+    @contextmanager
+    def checkout(self):
+        yield self.acquire()
+
+    # Runs client.<namespace>.<method>(...) on the next shared client.
+    # Streaming calls return generators, which count as in flight until the stream is consumed.
+    def call(self, namespace: str, method: str, *args, **kwargs):
+        client = self.acquire()
+        with self._lock:
+            self._calls += 1
+            self._in_flight += 1
+        try:
+            result = getattr(getattr(client, namespace), method)(*args, **kwargs)
+        except BaseException:
+            self._done()
+            raise
+        if isinstance(result, types.GeneratorType):
+            return self._count_until_consumed(result)
+        self._done()
+        return result
+
+    def _count_until_consumed(self, generator):
+        try:
+            yield from generator
+        finally:
+            self._done()
+
+    def _done(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "created": len(self._clients),
+                "calls": self._calls,
+                "in_flight": self._in_flight,
+            }
+
+
+# client.<namespace>.<method> of a pool: each call runs on a pooled client
+class PooledMethod:
+    def __init__(self, pool: ClientPool, namespace: str, method: str):
+        self.pool = pool
+        self.namespace = namespace
+        self.method = method
+
+    def __call__(self, *args, **kwargs):
+        return self.pool.call(self.namespace, self.method, *args, **kwargs)
+
+
+class _PooledNamespace:
+    def __init__(self, pool: ClientPool, namespace: str):
+        self._pool = pool
+        self._namespace = namespace
+
+    def __getattr__(self, method):
+        return PooledMethod(self._pool, self._namespace, method)
+
+
+# Drop-in stand-in for a JamAI client: client.table.* and client.file.* calls run on a pooled client.
+class PooledJamAI:
+    def __init__(self, pool: ClientPool):
+        self.pool = pool
+        self.table = _PooledNamespace(pool, "table")
+        self.file = _PooledNamespace(pool, "file")
+
+    def checkout(self):
+        return self.pool.checkout()
+
+
+# One pool per table type ("chat", "action") plus one for file uploads.
+# factory(name) builds a client for the named pool, so pools can differ in e.g. HTTP timeout.
+class JamAIClients:
+    def __init__(self, factory, sizes):
+        self.factory = factory
+        self.pools = {name: ClientPool(name, partial(factory, name), size) for name, size in sizes.items()}
+
+    def client(self, name: str) -> PooledJamAI:
+        return PooledJamAI(self.pools[name])
+
+    def stats(self):
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+
+# Yields a plain JamAI client: a pooled one for PooledJamAI, otherwise the client itself
+@contextmanager
+def checkout(client):
+    if isinstance(client, PooledJamAI):
+        with client.checkout() as pooled_client:
+            yield pooled_client
+    else:
+        yield client
+
+
+# Yields fn bound to a pooled client for a PooledMethod, otherwise fn itself.
+# Lets a caller create the client first and time only the call.
+@contextmanager
+def bound(fn):
+    if isinstance(fn, PooledMethod):
+        with fn.pool.checkout() as client:
+            yield getattr(getattr(client, fn.namespace), fn.method)
+    else:
+        yield fn
@@ -0,0 +1,154 @@
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind: str, fn, args):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.fn = fn
+        self.args = args
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status == "done":
+            data["result"] = self.result
+        if self.status == "failed":
+            data["error"] = self.error
+        return data
+
+
+# Bounded background worker pool for long-running analyses.
+# submit() returns immediately with a Job; clients poll or long-poll with wait().
+class JobQueue:
+    def __init__(self, workers: int = 4, max_queue: int = 100, retention: float = 3600.0, samples: int = 1000):
+        self.workers = workers
+        self.retention = retention
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._wait_times = deque(maxlen=samples)
+        self._run_times = deque(maxlen=samples)
+
+    def _ensure_workers(self):
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, kind: str, fn, *args) -> Job:
+        job = Job(kind, fn, args)
+        with self._lock:
+            self._ensure_workers()
+            self._prune()
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self._rejected += 1
+                raise QueueFullError("Job queue is full, try again later")
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    # Blocks until the job finishes or timeout expires
+    def wait(self, job_id: str, timeout: float):
+        job = self.get(job_id)
+        if job is not None and timeout > 0:
+            job.done.wait(timeout)
+        return job
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            job.started_at = time.time()
+            job.status = "running"
+            with self._lock:
+                self._running += 1
+                self._wait_times.append(job.started_at - job.created_at)
+            try:
+                result = job.fn(*job.args)
+                if result is None:
+                    job.status = "failed"
+                    job.error = f"Failed to process the {job.kind}"
+                else:
+                    job.status = "done"
+                    job.result = result
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+            job.finished_at = time.time()
+            # Drop the upload bytes as soon as the job is finished
+            job.args = ()
+            with self._lock:
+                self._running -= 1
+                self._run_times.append(job.finished_at - job.started_at)
+                if job.status == "done":
+                    self._completed += 1
+                else:
+                    self._failed += 1
+            job.done.set()
+            self._queue.task_done()
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished_at and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    @staticmethod
+    def _summary(samples):
+        if not samples:
+            return {"count": 0, "avg_s": 0.0, "p95_s": 0.0, "max_s": 0.0}
+        ordered = sorted(samples)
+        return {
+            "count": len(ordered),
+            "avg_s": sum(ordered) / len(ordered),
+            "p95_s": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+            "max_s": ordered[-1],
+        }
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "tracked_jobs": len(self._jobs),
+                "wait_time": self._summary(list(self._wait_times)),
+                "run_time": self._summary(list(self._run_times)),
+            }
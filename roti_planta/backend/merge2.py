@@ -1,383 +1,183 @@
 import os
-from flask import Flask, request, jsonify
-from werkzeug.utils import secure_filename
-from jamaibase import JamAI, protocol as p
-from typing import Dict, Optional
-import pdfplumber
-import firebase_admin
-from firebase_admin import credentials
-from firebase_admin import firestore
-from google.cloud.firestore_v1 import FieldFilter
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+import atexit
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, request, jsonify, Response, stream_with_context, g
+from typing import Optional
+import pdf_extract
+import image_prep
+from jobs import JobQueue, QueueFullError
+from resilience import UpstreamUnavailableError
+from vitals import VitalsBuffer, VitalsBufferFullError
+import metrics
+import http_compression
+from services import (
+    ALLOWED_PHOTO_EXTENSIONS,
+    ALLOWED_DOCUMENT_EXTENSIONS,
+    DIET_PROFILE_FIELDS,
+    PROFILE_BULK_MAX_EMAILS,
+    WARMUP_COMPONENTS,
+    Chatbot,
+    analyze_upload,
+    chatbots,
+    check_symptoms_chatbot,
+    conversation_key,
+    conversation_store,
+    diet_plan_store,
+    diet_processor,
+    emotional_support_chatbot,
+    get_user_data,
+    get_users_data,
+    initialize_firebase,
+    jamai_clients,
+    jamai_guard,
+    medicine_recommendation_chatbot,
+    profile_cache,
+    readable_emails,
+    requested_fields,
+    result_store,
+    start_warmup,
+    upload_scope,
+    user_guide_cache,
+    user_guide_chatbot,
+    verified_email,
+    warmup_status,
+)
+
+# Flask app: the routes, plus the background job queue and vitals buffer that only this app serves.
+# Processors, stores and configuration shared with asgi_app.py live in services.py.
 
 # Initialize Flask app
 app = Flask(__name__)
 
-# Configuration for file uploads
-UPLOAD_FOLDER = 'uploads'
-ALLOWED_PHOTO_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
-ALLOWED_DOCUMENT_EXTENSIONS = {'.pdf'}
+# Background analysis jobs
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+JOB_MAX_WAIT_SECONDS = float(os.getenv("JOB_MAX_WAIT_SECONDS", "30"))
+
+# Batch chat endpoint
+BATCH_CHAT_MAX_ITEMS = int(os.getenv("BATCH_CHAT_MAX_ITEMS", "20"))
+
+# Wearable vitals ingestion: samples are buffered per user and flushed to Firestore every VITALS_FLUSH_INTERVAL seconds
+VITALS_COLLECTION = os.getenv("VITALS_COLLECTION", "vitals")
+VITALS_FLUSH_INTERVAL = float(os.getenv("VITALS_FLUSH_INTERVAL", "5"))
+VITALS_MAX_BUFFERED = int(os.getenv("VITALS_MAX_BUFFERED", "1000000"))
+VITALS_MAX_SAMPLES_PER_DOCUMENT = int(os.getenv("VITALS_MAX_SAMPLES_PER_DOCUMENT", "5000"))
+VITALS_MAX_SAMPLES_PER_REQUEST = int(os.getenv("VITALS_MAX_SAMPLES_PER_REQUEST", "10000"))
+
+vitals_buffer = VitalsBuffer(
+    initialize_firebase,
+    collection=VITALS_COLLECTION,
+    flush_interval=VITALS_FLUSH_INTERVAL,
+    max_buffered=VITALS_MAX_BUFFERED,
+    max_samples_per_document=VITALS_MAX_SAMPLES_PER_DOCUMENT,
+)
+# Write out whatever is still buffered when the worker exits
+atexit.register(vitals_buffer.stop)
+
+job_queue = JobQueue(workers=JOB_WORKERS, max_queue=JOB_QUEUE_SIZE, retention=JOB_RETENTION_SECONDS)
+
+# Serving processes only: the PDF forkserver and pool workers re-import this module, and warming up there
+# would start a pool per worker and open Firestore in every one. Gunicorn workers are plain forks and warm up.
+if WARMUP_COMPONENTS and not pdf_extract.in_worker_process():
+    start_warmup(WARMUP_COMPONENTS)
+
+# JamAI table unhealthy or past its deadline: fail fast with a clear degraded response
+@app.errorhandler(UpstreamUnavailableError)
+def upstream_unavailable(e):
+    metrics.errors_total.inc(stage="request", type=type(e).__name__)
+    response = jsonify({"error": str(e), "degraded": True, "table": e.table_id})
+    response.status_code = 503
+    if e.retry_after:
+        response.headers["Retry-After"] = str(math.ceil(e.retry_after))
+    return response
 
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
+# Request rate and latency per route for /metrics
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
 
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop('request_start', None)
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    if start is not None and route != '/metrics':
+        metrics.http_request_duration_seconds.observe(time.perf_counter() - start, route=route, method=request.method)
+        metrics.http_requests_total.inc(route=route, method=request.method, status=str(response.status_code))
+    return response
 
-# Project ID and API Key
-PROJECT_ID = os.getenv("PROJECT_ID", "proj_be2c8d9620ef80fd7a193afa")
-API_KEY = os.getenv("JAMAI_API_KEY", "jamai_pat_328b45b69108c037c231e0f5574c5eba79a7f63788f25ecb")
+@app.teardown_request
+def record_unhandled_error(exc):
+    if exc is not None:
+        metrics.errors_total.inc(stage="request", type=type(exc).__name__)
 
-# Initialize Firebase
-def initialize_firebase():
-    try:
-        if not firebase_admin._apps:
-            cred = credentials.Certificate('vcaretest-8e88b-firebase-adminsdk-fbsvc-72ceb7653a.json')
-            firebase_admin.initialize_app(cred)
-        return firestore.client()
-    except Exception as e:
-        print(f"Failed to initialize Firebase: {str(e)}")
-        return None
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
 
-# Function to retrieve user data by email
-def get_user_data(email):
-    try:
-        db = initialize_firebase()
-        users_ref = db.collection('users')
-        query = users_ref.where(filter=FieldFilter('email', '==', email)).limit(1)
-        results = query.get()
-        
-        for doc in results:
-            user_data = doc.to_dict()
-            return user_data
-            
-        print(f"No user found with email: {email}")
-        return None
-    except Exception as e:
-        print(f"Error retrieving data: {str(e)}")
-        return None
-
-# Chatbot class
-class Chatbot:
-    def __init__(self, project_id: str, api_key: str, table_id: str):
-        self.table_id = table_id
-        try:
-            self.client = JamAI(project_id=project_id, api_key=api_key)
-            print(f"Successfully connected to JamAI Base for {table_id}.")
-        except Exception as e:
-            print(f"Failed to initialize JamAI client for {table_id}: {str(e)}")
-            raise
+# Enable CORS
+@app.after_request
+def after_request(response):
+    response.headers.add("Access-Control-Allow-Origin", "*")
+    response.headers.add("Access-Control-Allow-Headers", "Content-Type,Authorization,If-None-Match")
+    response.headers.add("Access-Control-Allow-Methods", "GET,POST,OPTIONS")
+    response.headers.add("Access-Control-Expose-Headers", "ETag")
+    return response
 
-    def clean_text(self, text: str) -> str:
-        cleaned = text.replace("", "").replace("*", "")
-        return cleaned
+# POST endpoints that only read, so If-None-Match can answer them with 304 like a GET
+CONDITIONAL_POST_ENDPOINTS = {"get_user_data_endpoint", "get_users_data_endpoint", "get_diet_recommendations"}
 
-    def chat(self, user_message: str):
-        try:
-            print(f"User ({self.table_id}): {user_message}")
-            response = self.client.table.add_table_rows(
-                table_type=p.TableType.chat,
-                request=p.RowAddRequest(
-                    table_id=self.table_id,
-                    data=[{"User": user_message}],
-                    stream=False
-                )
-            )
-            ai_response = response.rows[0].columns["AI"].text
-            cleaned_response = self.clean_text(ai_response)
-            print(f"AI ({self.table_id}): {cleaned_response}")
-            return cleaned_response
-        except Exception as e:
-            print(f"Error for {self.table_id}: {str(e)}")
-            return f"Sorry, something went wrong: {str(e)}"
-
-# PhotoProcessor class
-class PhotoProcessor:
-    def __init__(self, project_id: str, pat: str):
-        self.client = JamAI(project_id=project_id, token=pat)
-    
-    def validate_image(self, image_path: str) -> bool:
-        if not os.path.exists(image_path):
-            raise FileNotFoundError(f"Image not found: {image_path}")
-        file_ext = os.path.splitext(image_path)[1].lower()
-        if file_ext not in ALLOWED_PHOTO_EXTENSIONS:
-            raise ValueError(f"Unsupported file format. Use: {ALLOWED_PHOTO_EXTENSIONS}")
-        return True
-
-    def clean_text(self, text: str) -> str:
-        cleaned = text.replace("", "").replace("---", "")
-        lines = cleaned.split('\n')
-        formatted_lines = []
-        in_interpretation = False
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            if "What Happened in the Image" in line and not line.endswith(":"):
-                line = "What Happened in the Image:"
-            elif "Interpretation" in line and not line.endswith(":"):
-                line = "Interpretation:"
-                in_interpretation = True
-            if in_interpretation and line.startswith("-"):
-                line = line.replace("- ", "• ")
-            formatted_lines.append(line)
-        
-        return '\n\n'.join(formatted_lines)
-
-    def process_photo(self, image_path: str) -> Optional[Dict[str, str]]:
-        try:
-            self.validate_image(image_path)
-            file_response = self.client.file.upload_file(image_path)
-            response = self.client.table.add_table_rows(
-                table_type=p.TableType.action,
-                request=p.RowAddRequest(
-                    table_id="Photo_Analysis",
-                    data=[{"Image": file_response.uri}],
-                    stream=False,
-                ),
-            )
-            if not response.rows or "Result" not in response.rows[0].columns:
-                return None
-            raw_result = response.rows[0].columns["Result"].text
-            cleaned_result = self.clean_text(raw_result)
-            return {"result": cleaned_result}
-        except Exception as e:
-            print(f"Error processing photo: {str(e)}")
-            return None
-
-# DocumentProcessor class
-class DocumentProcessor:
-    def __init__(self, project_id: str, pat: str):
-        self.client = JamAI(project_id=project_id, token=pat)
-    
-    def validate_document(self, doc_path: str) -> bool:
-        if not os.path.exists(doc_path):
-            raise FileNotFoundError(f"Document not found: {doc_path}")
-        file_ext = os.path.splitext(doc_path)[1].lower()
-        if file_ext not in ALLOWED_DOCUMENT_EXTENSIONS:
-            raise ValueError(f"Unsupported file format. Use: {ALLOWED_DOCUMENT_EXTENSIONS}")
-        return True
-
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
-        try:
-            with pdfplumber.open(pdf_path) as pdf:
-                text = "".join(page.extract_text() or "" for page in pdf.pages)
-                return text.strip()
-        except Exception as e:
-            raise RuntimeError(f"Failed to extract text from PDF: {str(e)}")
+# ETag, If-None-Match and gzip/brotli for JSON responses
+@app.after_request
+def compress_response(response):
+    conditional = request.method == "GET" or request.endpoint in CONDITIONAL_POST_ENDPOINTS
+    return http_compression.finalize_response(request, response, conditional)
 
-    def clean_text(self, text: str) -> str:
-        return text.replace("", "").replace("---", "")
+@app.route('/api/compression', methods=['GET'])
+def compression_stats():
+    return jsonify(http_compression.totals()), 200
 
-    def process_document(self, doc_path: str) -> Optional[Dict[str, str]]:
-        try:
-            self.validate_document(doc_path)
-            extracted_text = self.extract_text_from_pdf(doc_path)
-            if not extracted_text:
-                return None
-            response = self.client.table.add_table_rows(
-                table_type=p.TableType.action,
-                request=p.RowAddRequest(
-                    table_id="Report",
-                    data=[{"Information": extracted_text}],
-                    stream=False,
-                ),
-            )
-            if not response.rows or "Analysis" not in response.rows[0].columns:
-                return None
-            raw_result = response.rows[0].columns["Analysis"].text
-            cleaned_result = self.clean_text(raw_result)
-            return {"result": cleaned_result}
-        except Exception as e:
-            print(f"Error processing document: {str(e)}")
-            return None
+# Server-Sent Events helpers
+def sse_event(data, event: Optional[str] = None) -> str:
+    message = f"event: {event}\n" if event else ""
+    # default=str covers Firestore timestamps in profile payloads
+    return message + f"data: {json.dumps(data, default=str)}\n\n"
 
+def chat_response(chatbot: Chatbot):
+    data = request.get_json()
+    if not isinstance(data, dict) or 'message' not in data:
+        return jsonify({"error": "Missing 'message' in request body"}), 400
+    if not isinstance(data['message'], str):
+        return jsonify({"error": "'message' must be a string"}), 400
+    ai_response = chatbot.chat(data['message'], conversation_key(data, request.headers))
+    return jsonify({"response": ai_response})
 
-class DietRecommendationProcessor:
-    def __init__(self, project_id: str, api_key: str):
-        try:
-            self.jamai = JamAI(api_key=api_key, project_id=project_id)
-            print("Successfully initialized JamAI for Diet Recommendation.")
-        except Exception as e:
-            print(f"Failed to initialize JamAI for Diet Recommendation: {str(e)}")
-            self.jamai = None
+def chat_stream_response(chatbot: Chatbot):
+    data = request.get_json()
+    if not isinstance(data, dict) or 'message' not in data:
+        return jsonify({"error": "Missing 'message' in request body"}), 400
+    if not isinstance(data['message'], str):
+        return jsonify({"error": "'message' must be a string"}), 400
+    user_message = data['message']
+    key = conversation_key(data, request.headers)
 
-    def format_for_diet_recommendation(self, user_data):
-        if not user_data:
-            print("No user data to format.")
-            return None
+    def generate():
         try:
-            age = user_data.get('age', 'N/A')
-            height = user_data.get('height', 'N/A')
-            weight = user_data.get('weight', 'N/A')
-            formatted_data = {
-                "Age": str(age) if age != 'N/A' else 'N/A',
-                "Gender": user_data.get('gender', 'N/A'),
-                "Weight": str(weight) if weight != 'N/A' else 'N/A',
-                "Height": str(height) if height != 'N/A' else 'N/A',
-                "Activity Level": user_data.get('activityLevel', 'N/A'),
-                "Dietary Preference": ', '.join(user_data.get('dietaryPreferences', [])),
-                "Favourite Cuisine": ', '.join(user_data.get('favouriteCuisines', [])),
-                "Food Allergies": ', '.join(user_data.get('foodAllergies', []))
-            }
-            print("User data formatted successfully for JamAI Base!")
-            return formatted_data
-        except Exception as e:
-            print(f"Error formatting data for JamAI Base: {str(e)}")
-            return None
-
-    def clean_meal_plan(self, meal_plan):
-        if meal_plan == "Not available":
-            return meal_plan
-        cleaned = meal_plan.replace("", "").replace("#", "").replace("##", "").replace("###", "").replace("####", "")
-        phrases_to_remove = [
-            "Breakfast Meal Plan",
-            "Lunch Meal Plan",
-            "Dinner Meal Plan",
-            "Fiber-Rich, Low-GI Foods and Lean Proteins"
-        ]
-        for phrase in phrases_to_remove:
-            cleaned = cleaned.replace(phrase, "")
-        lines = cleaned.split('\n')
-        formatted_lines = []
-        for line in lines:
-            line = line.strip()
-            if line:
-                line = line.replace("Carbs:", "Carbs: ").replace("Protein:", "Protein: ").replace("Fat:", "Fat: ").replace("Fiber:", "Fiber: ").replace("Calories:", "Total Calories: ")
-                if not line.startswith("1.") and not line.startswith("2.") and not line.startswith("3.") and not line.startswith("-") and not line.startswith("Total "):
-                    continue
-                formatted_lines.append(line)
-        return '\n'.join(formatted_lines)
-
-    def add_to_diet_recommendation_table(self, formatted_data):
-        print("Attempting to add data to Diet_Recommendation table...")
-        try:
-            if not self.jamai:
-                print("JamAI client not initialized.")
-                return None
-            
-            # Prepare the data for the Diet_Recommendation table
-            row_data = {
-                "Age": formatted_data["Age"],
-                "Gender": formatted_data["Gender"],
-                "Weight": formatted_data["Weight"],
-                "Height": formatted_data["Height"],
-                "Activity Level": formatted_data["Activity Level"],
-                "Dietary Preference": formatted_data["Dietary Preference"],
-                "Favourite Cuisine": formatted_data["Favourite Cuisine"],
-                "Food Allergies": formatted_data["Food Allergies"]
-            }
-
-            # Add a row to the Diet_Recommendation table
-            print("Sending request to JamAI Base...")
-            response = self.jamai.table.add_table_rows(
-                table_type=p.TableType.action,
-                request=p.RowAddRequest(
-                    table_id="Diet_Recommendation",
-                    data=[row_data],
-                    stream=False
-                )
-            )
-
-            # Debug: Print the response type and structure
-            print("JamAI Response Type:", type(response))
-            print("JamAI Response:", response)
-
-            # Check the type of response
-            if isinstance(response, p.GenTableRowsChatCompletionChunks):
-                print("Received a streaming response from JamAI Base.")
-                recommendations = {
-                    "Breakfast": "Not available",
-                    "Lunch": "Not available",
-                    "Dinner": "Not available"
-                }
-                # Handle streaming response
-                for chunk in response:
-                    if isinstance(chunk, tuple) and len(chunk) > 1 and chunk[0] == 'rows':
-                        # Extract the GenTableChatCompletionChunks object
-                        table_chunks = chunk[1][0]  # First row
-                        columns = table_chunks.columns
-                        print("Streaming Columns:", columns)
-                        # Extract meal plans from the columns
-                        if 'Breakfast' in columns:
-                            breakfast_chunk = columns['Breakfast']
-                            if breakfast_chunk.choices and breakfast_chunk.choices[0].message.content:
-                                recommendations["Breakfast"] = self.clean_meal_plan(breakfast_chunk.choices[0].message.content)
-                        if 'Lunch' in columns:
-                            lunch_chunk = columns['Lunch']
-                            if lunch_chunk.choices and lunch_chunk.choices[0].message.content:
-                                recommendations["Lunch"] = self.clean_meal_plan(lunch_chunk.choices[0].message.content)
-                        if 'Dinner' in columns:
-                            dinner_chunk = columns['Dinner']
-                            if dinner_chunk.choices and dinner_chunk.choices[0].message.content:
-                                recommendations["Dinner"] = self.clean_meal_plan(dinner_chunk.choices[0].message.content)
-                        break  # We only need the 'rows' chunk
-                print("Processed streaming response into meal plans.")
-                print("Warning: Received a streaming response despite stream=False. This may indicate a misconfiguration.")
-            elif isinstance(response, p.ChatCompletionChunk):
-                print("Received a ChatCompletionChunk response from JamAI Base.")
-                recommendations = {
-                    "Breakfast": "Not available",
-                    "Lunch": "Not available",
-                    "Dinner": "Not available"
-                }
-                # Handle ChatCompletionChunk response
-                content = response.choices[0].message.content if response.choices and response.choices[0].message else "Not available"
-                print("Extracted Content:", content)
-                # Parse the content into recommendations
-                content = content.lower()
-                if "breakfast:" in content:
-                    breakfast_section = content.split("breakfast:")[1].split("lunch:")[0] if "lunch:" in content else content.split("breakfast:")[1]
-                    recommendations["Breakfast"] = self.clean_meal_plan(breakfast_section.strip())
-                if "lunch:" in content:
-                    lunch_section = content.split("lunch:")[1].split("dinner:")[0] if "dinner:" in content else content.split("lunch:")[1]
-                    recommendations["Lunch"] = self.clean_meal_plan(lunch_section.strip())
-                if "dinner:" in content:
-                    dinner_section = content.split("dinner:")[1]
-                    recommendations["Dinner"] = self.clean_meal_plan(dinner_section.strip())
-                print("Processed ChatCompletionChunk response into meal plans.")
-                print("Warning: Received a ChatCompletionChunk response, which is unexpected for an action table. This may indicate a misconfiguration.")
-            else:
-                # Handle non-streaming response (expected behavior for an action table)
-                print("Received a non-streaming response from JamAI Base.")
-                if hasattr(response, 'rows') and response.rows:
-                    row = response.rows[0]  # Access the first row
-                    columns = row.columns  # Access the columns dictionary
-                    print("Non-Streaming Columns:", columns)
-                    recommendations = {
-                        "Breakfast": self.clean_meal_plan(columns.get("Breakfast", {}).get("text", "Not available")),
-                        "Lunch": self.clean_meal_plan(columns.get("Lunch", {}).get("text", "Not available")),
-                        "Dinner": self.clean_meal_plan(columns.get("Dinner", {}).get("text", "Not available"))
-                    }
-                else:
-                    print("Error: No rows returned in the response or unexpected response format.")
-                    recommendations = None
-
-            return recommendations
-
+            for delta in chatbot.chat_stream(user_message, key):
+                yield sse_event({"delta": delta})
+            yield sse_event({}, event="done")
+        except UpstreamUnavailableError as e:
+            yield sse_event({"error": str(e), "degraded": True}, event="error")
         except Exception as e:
-            print(f"Error interacting with JamAI Base: {str(e)}")
-            return None
+            print(f"Error streaming for {chatbot.table_id}: {str(e)}")
+            yield sse_event({"error": f"Sorry, something went wrong: {str(e)}"}, event="error")
 
-
-# Initialize processors
-emotional_support_chatbot = Chatbot(project_id=PROJECT_ID, api_key=API_KEY, table_id="EmotionalSupport")
-check_symptoms_chatbot = Chatbot(project_id=PROJECT_ID, api_key=API_KEY, table_id="CheckSymptoms")
-medicine_recommendation_chatbot = Chatbot(project_id=PROJECT_ID, api_key=API_KEY, table_id="MedicineRecommendation")
-user_guide_chatbot = Chatbot(project_id=PROJECT_ID, api_key=API_KEY, table_id="UserGuide")
-photo_processor = PhotoProcessor(PROJECT_ID, API_KEY)
-document_processor = DocumentProcessor(PROJECT_ID, API_KEY)
-diet_processor = DietRecommendationProcessor(PROJECT_ID, API_KEY)
-
-# Enable CORS
-@app.after_request
-def after_request(response):
-    response.headers.add("Access-Control-Allow-Origin", "*")
-    response.headers.add("Access-Control-Allow-Headers", "Content-Type,Authorization")
-    response.headers.add("Access-Control-Allow-Methods", "GET,POST,OPTIONS")
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
     return response
 
 # Endpoints
@@ -388,48 +188,139 @@ def get_user_data_endpoint():
         user_email = data.get('email')
         if not user_email:
             return jsonify({"error": "Email is required"}), 400
-        user_data = get_user_data(user_email)
+        try:
+            fields = requested_fields(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        user_data = get_user_data(user_email, fields)
         if not user_data:
             return jsonify({"error": "User not found"}), 404
         return jsonify(user_data), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Body: {"emails": ["a@example.com", ...]}; returns {"users": {email: user_data}, "not_found": [...]}
+# Needs the caller's Firebase ID token (Authorization: Bearer <token>); callers read their own profile
+# and those of the patients listed in their profile (see readable_emails())
+@app.route('/api/get-users-data', methods=['POST'])
+def get_users_data_endpoint():
+    try:
+        caller = verified_email(request.headers)
+        if caller is None:
+            return jsonify({"error": "Sign-in (Authorization: Bearer <Firebase ID token>) is required"}), 401
+        data = request.get_json()
+        emails = data.get('emails') if isinstance(data, dict) else None
+        if not isinstance(emails, list) or not emails or not all(isinstance(email, str) and email for email in emails):
+            return jsonify({"error": "A non-empty list of 'emails' is required"}), 400
+        if len(emails) > PROFILE_BULK_MAX_EMAILS:
+            return jsonify({"error": f"At most {PROFILE_BULK_MAX_EMAILS} emails per request"}), 400
+        allowed = readable_emails(caller)
+        denied = [email for email in dict.fromkeys(emails) if email.strip().lower() not in allowed]
+        if denied:
+            return jsonify({"error": "Not allowed to read these profiles", "denied": denied}), 403
+        try:
+            fields = requested_fields(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        users = get_users_data(emails, fields)
+        not_found = [email for email in dict.fromkeys(emails) if email not in users]
+        return jsonify({"users": users, "not_found": not_found}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/profile-cache', methods=['GET'])
+def profile_cache_stats():
+    return jsonify(profile_cache.stats()), 200
+
 @app.route('/api/emotional-support', methods=['POST'])
 def emotional_support():
-    data = request.get_json()
-    if not data or 'message' not in data:
-        return jsonify({"error": "Missing 'message' in request body"}), 400
-    user_message = data['message']
-    ai_response = emotional_support_chatbot.chat(user_message)
-    return jsonify({"response": ai_response})
+    return chat_response(emotional_support_chatbot)
 
 @app.route('/api/check-symptoms', methods=['POST'])
 def check_symptoms():
-    data = request.get_json()
-    if not data or 'message' not in data:
-        return jsonify({"error": "Missing 'message' in request body"}), 400
-    user_message = data['message']
-    ai_response = check_symptoms_chatbot.chat(user_message)
-    return jsonify({"response": ai_response})
+    return chat_response(check_symptoms_chatbot)
 
 @app.route('/api/medicine-recommendation', methods=['POST'])
 def medicine_recommendation():
-    data = request.get_json()
-    if not data or 'message' not in data:
-        return jsonify({"error": "Missing 'message' in request body"}), 400
-    user_message = data['message']
-    ai_response = medicine_recommendation_chatbot.chat(user_message)
-    return jsonify({"response": ai_response})
+    return chat_response(medicine_recommendation_chatbot)
 
 @app.route('/api/user-guide', methods=['POST'])
 def user_guide():
+    return chat_response(user_guide_chatbot)
+
+@app.route('/api/emotional-support/stream', methods=['POST'])
+def emotional_support_stream():
+    return chat_stream_response(emotional_support_chatbot)
+
+@app.route('/api/check-symptoms/stream', methods=['POST'])
+def check_symptoms_stream():
+    return chat_stream_response(check_symptoms_chatbot)
+
+@app.route('/api/medicine-recommendation/stream', methods=['POST'])
+def medicine_recommendation_stream():
+    return chat_stream_response(medicine_recommendation_chatbot)
+
+@app.route('/api/user-guide/stream', methods=['POST'])
+def user_guide_stream():
+    return chat_stream_response(user_guide_chatbot)
+
+@app.route('/api/user-guide/cache', methods=['GET'])
+def user_guide_cache_stats():
+    return jsonify(user_guide_cache.stats()), 200
+
+# Call after the UserGuide table's knowledge or prompt changes
+@app.route('/api/user-guide/cache/invalidate', methods=['POST'])
+def user_guide_cache_invalidate():
+    cleared = user_guide_cache.clear()
+    return jsonify({"cleared": cleared}), 200
+
+@app.route('/api/chat/conversations', methods=['GET'])
+def chat_conversation_stats():
+    return jsonify(conversation_store.stats()), 200
+
+# Body: {"table": "EmotionalSupport", "thread_id": "..."} with the user's Firebase ID token in the
+# Authorization header; the next message starts a fresh table
+@app.route('/api/chat/reset', methods=['POST'])
+def chat_reset():
     data = request.get_json()
-    if not data or 'message' not in data:
-        return jsonify({"error": "Missing 'message' in request body"}), 400
-    message = data["message"]
-    response = user_guide_chatbot.chat(message)
-    return jsonify({"response": response})
+    if not data or data.get('table') not in chatbots:
+        return jsonify({"error": f"Missing or unknown 'table'. Use: {list(chatbots)}"}), 400
+    key = conversation_key(data, request.headers)
+    if key is None:
+        return jsonify({"error": "Sign-in (Authorization: Bearer <Firebase ID token>) or thread_id is required"}), 400
+    return jsonify({"reset": conversation_store.reset(data['table'], key)}), 200
+
+# Body: {"items": [{"table": "CheckSymptoms", "message": "..."}, ...]}
+# Items for the same table share one add_table_rows call; different tables run concurrently.
+@app.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    data = request.get_json()
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Missing 'items' in request body"}), 400
+    if len(items) > BATCH_CHAT_MAX_ITEMS:
+        return jsonify({"error": f"At most {BATCH_CHAT_MAX_ITEMS} items per batch"}), 400
+    grouped = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or 'message' not in item:
+            return jsonify({"error": f"Missing 'message' in item {index}"}), 400
+        if not isinstance(item['message'], str):
+            return jsonify({"error": f"'message' must be a string (item {index})"}), 400
+        table_id = item.get('table')
+        if table_id not in chatbots:
+            return jsonify({"error": f"Unknown table in item {index}. Use: {list(chatbots)}"}), 400
+        grouped.setdefault(table_id, []).append((index, item['message']))
+
+    def run_group(table_id):
+        messages = [message for _, message in grouped[table_id]]
+        return table_id, chatbots[table_id].chat_many(messages)
+
+    results = [None] * len(items)
+    with ThreadPoolExecutor(max_workers=len(grouped)) as executor:
+        for table_id, responses in executor.map(run_group, list(grouped)):
+            for (index, _), ai_response in zip(grouped[table_id], responses):
+                results[index] = {"table": table_id, "response": ai_response}
+    return jsonify({"results": results}), 200
 
 @app.route('/api/process-photo', methods=['POST'])
 def process_photo():
@@ -440,18 +331,14 @@ def process_photo():
         return jsonify({"error": "No file selected"}), 400
     if not os.path.splitext(file.filename)[1].lower() in ALLOWED_PHOTO_EXTENSIONS:
         return jsonify({"error": f"Unsupported file format. Use: {list(ALLOWED_PHOTO_EXTENSIONS)}"}), 400
-    filename = secure_filename(file.filename)
-    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    file.save(file_path)
     try:
-        result = photo_processor.process_photo(file_path)
-        os.remove(file_path)
+        result = analyze_upload("photo", file.read(), file.filename, upload_scope(request.form, request.headers))
         if result is None:
             return jsonify({"error": "Failed to process the photo"}), 500
         return jsonify(result), 200
+    except UpstreamUnavailableError:
+        raise
     except Exception as e:
-        if os.path.exists(file_path):
-            os.remove(file_path)
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/process-document', methods=['POST'])
@@ -463,20 +350,71 @@ def process_document():
         return jsonify({"error": "No file selected"}), 400
     if not os.path.splitext(file.filename)[1].lower() in ALLOWED_DOCUMENT_EXTENSIONS:
         return jsonify({"error": f"Unsupported file format. Use: {list(ALLOWED_DOCUMENT_EXTENSIONS)}"}), 400
-    filename = secure_filename(file.filename)
-    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    file.save(file_path)
     try:
-        result = document_processor.process_document(file_path)
-        os.remove(file_path)
+        result = analyze_upload("document", file.read(), file.filename, upload_scope(request.form, request.headers))
         if result is None:
             return jsonify({"error": "Failed to process the document"}), 500
         return jsonify(result), 200
+    except UpstreamUnavailableError:
+        raise
     except Exception as e:
-        if os.path.exists(file_path):
-            os.remove(file_path)
         return jsonify({"error": str(e)}), 500
 
+# Job mode: the POST returns a job id at once and the analysis runs on the background pool
+def submit_upload_job(kind: str, allowed_extensions):
+    if 'file' not in request.files:
+        return jsonify({"error": "No file part in the request"}), 400
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({"error": "No file selected"}), 400
+    if not os.path.splitext(file.filename)[1].lower() in allowed_extensions:
+        return jsonify({"error": f"Unsupported file format. Use: {list(allowed_extensions)}"}), 400
+    try:
+        job = job_queue.submit(kind, analyze_upload, kind, file.read(), file.filename, upload_scope(request.form, request.headers))
+    except QueueFullError as e:
+        return jsonify({"error": str(e)}), 503
+    return jsonify({"job_id": job.id, "status": job.status}), 202
+
+@app.route('/api/jobs/process-photo', methods=['POST'])
+def process_photo_job():
+    return submit_upload_job("photo", ALLOWED_PHOTO_EXTENSIONS)
+
+@app.route('/api/jobs/process-document', methods=['POST'])
+def process_document_job():
+    return submit_upload_job("document", ALLOWED_DOCUMENT_EXTENSIONS)
+
+@app.route('/api/jobs/metrics', methods=['GET'])
+def job_metrics():
+    return jsonify(job_queue.metrics()), 200
+
+# Poll with GET /api/jobs/<job_id>, or long-poll with ?wait=<seconds>
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    try:
+        wait = min(float(request.args.get('wait', 0)), JOB_MAX_WAIT_SECONDS)
+    except ValueError:
+        return jsonify({"error": "'wait' must be a number of seconds"}), 400
+    job = job_queue.wait(job_id, wait)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict()), 200
+
+@app.route('/api/circuit-breakers', methods=['GET'])
+def circuit_breaker_stats():
+    return jsonify(jamai_guard.stats()), 200
+
+@app.route('/api/jamai-pool', methods=['GET'])
+def jamai_pool_stats():
+    return jsonify(jamai_clients.stats()), 200
+
+@app.route('/api/image-prep', methods=['GET'])
+def image_prep_stats():
+    return jsonify(image_prep.totals()), 200
+
+@app.route('/api/result-store', methods=['GET'])
+def result_store_stats():
+    return jsonify(result_store.stats()), 200
+
 @app.route('/api/get-diet-recommendations', methods=['POST'])
 def get_diet_recommendations():
     try:
@@ -484,13 +422,14 @@ def get_diet_recommendations():
         user_email = data.get('email')
         if not user_email:
             return jsonify({"error": "Email is required"}), 400
-        user_data = get_user_data(user_email)
+        user_data = get_user_data(user_email, DIET_PROFILE_FIELDS)
         if not user_data:
             return jsonify({"error": "User not found"}), 404
         formatted_data = diet_processor.format_for_diet_recommendation(user_data)
         if not formatted_data:
             return jsonify({"error": "Failed to format data"}), 500
-        recommendations = diet_processor.add_to_diet_recommendation_table(formatted_data)
+        regenerate = bool(data.get('regenerate')) or request.args.get('regenerate') == '1'
+        recommendations = diet_processor.get_recommendations(formatted_data, regenerate=regenerate)
         if not recommendations:
             return jsonify({"error": "Failed to generate recommendations"}), 500
         response = {
@@ -498,12 +437,91 @@ def get_diet_recommendations():
             "recommendations": recommendations
         }
         return jsonify(response), 200
+    except UpstreamUnavailableError:
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Server-Sent Events: "user_data" first, then one "meal" event ({"meal", "plan"}) per meal as its column
+# finishes, then "done". Stored plans arrive as three immediate meal events.
+@app.route('/api/get-diet-recommendations/stream', methods=['POST'])
+def get_diet_recommendations_stream():
+    data = request.get_json()
+    user_email = data.get('email') if data else None
+    if not user_email:
+        return jsonify({"error": "Email is required"}), 400
+    user_data = get_user_data(user_email, DIET_PROFILE_FIELDS)
+    if not user_data:
+        return jsonify({"error": "User not found"}), 404
+    formatted_data = diet_processor.format_for_diet_recommendation(user_data)
+    if not formatted_data:
+        return jsonify({"error": "Failed to format data"}), 500
+    regenerate = bool(data.get('regenerate')) or request.args.get('regenerate') == '1'
+
+    def generate():
+        yield sse_event(user_data, event="user_data")
+        try:
+            for meal, plan in diet_processor.stream_recommendations(formatted_data, regenerate=regenerate):
+                yield sse_event({"meal": meal, "plan": plan}, event="meal")
+            yield sse_event({}, event="done")
+        except UpstreamUnavailableError as e:
+            yield sse_event({"error": str(e), "degraded": True}, event="error")
+        except Exception as e:
+            print(f"Error streaming diet recommendations: {str(e)}")
+            yield sse_event({"error": f"Failed to generate recommendations: {str(e)}"}, event="error")
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+@app.route('/api/diet-plan-store', methods=['GET'])
+def diet_plan_store_stats():
+    return jsonify(diet_plan_store.stats()), 200
+
+# Body: {"email": "...", "samples": [{"timestamp": 1760000000, "heartRate": 72, "steps": 12, "spo2": 98}, ...]}
+# or {"batches": [{"email": ..., "samples": [...]}, ...]}. timestamp is epoch seconds/milliseconds or ISO 8601.
+# Samples are acknowledged once buffered (202) and reach Firestore with the next flush.
+@app.route('/api/vitals', methods=['POST'])
+def ingest_vitals():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "JSON body is required"}), 400
+    batches = data.get('batches')
+    if batches is None:
+        batches = [data]
+    if not isinstance(batches, list) or not batches:
+        return jsonify({"error": "'batches' must be a non-empty list"}), 400
+    total = 0
+    for index, batch in enumerate(batches):
+        if not isinstance(batch, dict) or not isinstance(batch.get('samples'), list):
+            return jsonify({"error": f"Each batch needs 'email' and a 'samples' list (batch {index})"}), 400
+        email = batch.get('email')
+        if not isinstance(email, str) or not email.strip():
+            return jsonify({"error": f"'email' must be a non-empty string (batch {index})"}), 400
+        total += len(batch['samples'])
+    if total > VITALS_MAX_SAMPLES_PER_REQUEST:
+        return jsonify({"error": f"At most {VITALS_MAX_SAMPLES_PER_REQUEST} samples per request"}), 400
+    try:
+        # All batches or none, so the client can safely retry the whole request after a 503
+        accepted, rejected = vitals_buffer.ingest_many([(batch['email'], batch['samples']) for batch in batches])
+    except VitalsBufferFullError as e:
+        response = jsonify({"error": str(e), "accepted": 0})
+        response.headers["Retry-After"] = str(math.ceil(VITALS_FLUSH_INTERVAL))
+        return response, 503
+    return jsonify({"accepted": accepted, "rejected": rejected}), 202
+
+@app.route('/api/vitals/buffer', methods=['GET'])
+def vitals_buffer_stats():
+    return jsonify(vitals_buffer.stats()), 200
+
 @app.route('/api/health', methods=['GET'])
 def health():
     return jsonify({"status": "API is running"}), 200
 
+@app.route('/api/warmup', methods=['GET'])
+def warmup_state():
+    return jsonify(warmup_status), 200
+
 if __name__ == "__main__":
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
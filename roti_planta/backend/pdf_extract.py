@@ -0,0 +1,216 @@
+import io
+import os
+import sys
+import time
+import threading
+import multiprocessing
+from multiprocessing.connection import wait
+from lazy_imports import LazyModule
+
+pdfplumber = LazyModule("pdfplumber")
+
+
+# Page-parallel PDF text extraction.
+# pdfplumber layout analysis is CPU-bound, so page ranges are spread across a pool of worker processes
+# and the page texts are reassembled in document order.
+# All parsing, including the page count and small PDFs, runs in the pool under the time budget.
+# A running extraction cannot be interrupted, so when a request runs out of time only the workers
+# busy with its own pages are killed and replaced; other requests' extractions carry on.
+
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "100"))
+PDF_EXTRACT_TIMEOUT = float(os.getenv("PDF_EXTRACT_TIMEOUT", "30"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "4"))
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 2)))
+# The app runs threads (Firestore listener, guard and job pools) by the time the pool starts,
+# and forking a threaded process can deadlock the child, so workers never start with fork
+PDF_START_METHOD = os.getenv(
+    "PDF_START_METHOD", "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+# How often a request with pages still queued checks for a worker freed by another request
+_POLL_INTERVAL = 0.05
+
+
+class WorkerExitedError(RuntimeError):
+    pass
+
+
+# Worker process loop: runs (fn, args) tasks from the pipe, sends back (ok, result or exception)
+def _serve(conn):
+    while True:
+        try:
+            fn, args = conn.recv()
+        except EOFError:
+            return
+        try:
+            conn.send((True, fn(*args)))
+        except Exception as e:
+            conn.send((False, e))
+
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child_conn,), name="pdf-extract", daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        self.process.terminate()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+
+# Fixed number of worker processes, started on demand. Each task gets a worker to itself,
+# so a worker can be killed without touching tasks of other requests.
+class WorkerPool:
+    def __init__(self, size: int, start_method: str):
+        self.size = size
+        self.context = multiprocessing.get_context(start_method)
+        self._idle = []
+        self._count = 0
+        self._condition = threading.Condition()
+        self.killed = 0
+
+    # An idle (or new) worker, or None once timeout runs out
+    def _checkout(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                while self._idle:
+                    worker = self._idle.pop()
+                    if worker.process.is_alive():
+                        return worker
+                    # Died while idle (e.g. out of memory)
+                    worker.conn.close()
+                    self._count -= 1
+                if self._count < self.size:
+                    self._count += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+        try:
+            return _Worker(self.context)
+        except BaseException:
+            self._discard()
+            raise
+
+    def _checkin(self, worker: _Worker):
+        with self._condition:
+            self._idle.append(worker)
+            self._condition.notify()
+
+    def _discard(self):
+        with self._condition:
+            self._count -= 1
+            self._condition.notify()
+
+    def _kill(self, worker: _Worker):
+        worker.kill()
+        with self._condition:
+            self.killed += 1
+        self._discard()
+
+    # fn(*args) for every args tuple, on up to size workers at once; results in order.
+    # Raises TimeoutError at deadline (time.monotonic()) and the first task's error otherwise.
+    # Whatever is still running then belongs to this call alone, and its workers are killed.
+    def map(self, fn, arg_list, deadline: float):
+        results = [None] * len(arg_list)
+        pending = list(enumerate(arg_list))
+        running = {}
+        try:
+            while pending or running:
+                while pending:
+                    worker = self._checkout(0 if running else deadline - time.monotonic())
+                    if worker is None:
+                        break
+                    index, args = pending.pop(0)
+                    running[worker.conn] = (worker, index)
+                    worker.conn.send((fn, args))
+                remaining = deadline - time.monotonic()
+                if not running or remaining <= 0:
+                    raise TimeoutError("PDF extraction deadline passed")
+                for conn in wait(list(running), timeout=min(remaining, _POLL_INTERVAL) if pending else remaining):
+                    worker, index = running.pop(conn)
+                    try:
+                        ok, value = conn.recv()
+                    except EOFError:
+                        # e.g. killed for running out of memory
+                        self._kill(worker)
+                        raise WorkerExitedError("PDF extraction worker exited")
+                    self._checkin(worker)
+                    if not ok:
+                        raise value
+                    results[index] = value
+            return results
+        finally:
+            for worker, _ in running.values():
+                self._kill(worker)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> WorkerPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool(PDF_EXTRACT_WORKERS, PDF_START_METHOD)
+        return _pool
+
+
+# True in pool workers and in the forkserver: they import the parent's main module again as "__mp_main__"
+# and must not run the app's startup side effects, which would start pools of their own.
+# (multiprocessing aliases "__mp_main__" to "__main__" in the parent, so only a distinct module counts.)
+def in_worker_process() -> bool:
+    main = sys.modules.get("__mp_main__")
+    return multiprocessing.parent_process() is not None or (main is not None and main is not sys.modules.get("__main__"))
+
+
+# Imports pdfplumber and starts the worker processes ahead of the first upload
+def warmup():
+    pdfplumber.open
+    get_pool().map(int, [()] * PDF_EXTRACT_WORKERS, time.monotonic() + PDF_EXTRACT_TIMEOUT)
+
+
+# Runs in a worker process: extracts pages [start, end) of the PDF
+def extract_page_range(data: bytes, start: int, end: int):
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        return [page.extract_text() or "" for page in pdf.pages[start:end]]
+
+
+# Runs in a worker process: page count (capped at max_pages) and the text of the first pages
+def extract_first_pages(data: bytes, pages_per_task: int, max_pages: int):
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        page_count = min(len(pdf.pages), max_pages)
+        return page_count, [page.extract_text() or "" for page in pdf.pages[:min(pages_per_task, page_count)]]
+
+
+def page_ranges(page_count: int, pages_per_task: int):
+    return [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+
+
+# Returns the text of each page, in order, for at most max_pages pages.
+# Raises TimeoutError when extraction does not finish within timeout seconds.
+def extract_pages(data: bytes, max_pages: int = None, timeout: float = None, pages_per_task: int = None):
+    max_pages = PDF_MAX_PAGES if max_pages is None else max_pages
+    timeout = PDF_EXTRACT_TIMEOUT if timeout is None else timeout
+    pages_per_task = pages_per_task or PDF_PAGES_PER_TASK
+    deadline = time.monotonic() + timeout
+    pool = get_pool()
+    try:
+        [(page_count, pages)] = pool.map(extract_first_pages, [(data, pages_per_task, max_pages)], deadline)
+        if page_count <= pages_per_task:
+            return pages
+        ranges = page_ranges(page_count, pages_per_task)[1:]
+        for range_pages in pool.map(extract_page_range, [(data, start, end) for start, end in ranges], deadline):
+            pages.extend(range_pages)
+        return pages
+    except TimeoutError:
+        raise TimeoutError(f"PDF text extraction exceeded {timeout}s") from None
+
+
+def extract_text(data: bytes, max_pages: int = None, timeout: float = None) -> str:
+    return "".join(extract_pages(data, max_pages=max_pages, timeout=timeout)).strip()
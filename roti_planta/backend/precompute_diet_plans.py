@@ -0,0 +1,103 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services import DIET_PROFILE_FIELDS, diet_processor, diet_plan_store, guarded_call, initialize_firebase, firestore_v1, p
+
+# Off-peak batch job: generates diet plans for every user ahead of the breakfast and dinner peaks.
+# Pages through the Firestore users collection, skips profiles whose plan is still fresh in the
+# plan store, and sends the rest to Diet_Recommendation as multi-row requests at bounded concurrency.
+# /api/get-diet-recommendations then serves these plans from the store.
+#   python precompute_diet_plans.py --page-size 200 --rows-per-request 5 --concurrency 4
+
+
+def iter_user_pages(page_size: int, limit: int = 0):
+    db = initialize_firebase()
+    if db is None:
+        raise RuntimeError("Firestore client not available")
+    query = (
+        db.collection("users")
+        .select(DIET_PROFILE_FIELDS)
+        .order_by(firestore_v1.FieldPath.document_id())
+        .limit(page_size)
+    )
+    seen = 0
+    last_doc = None
+    while True:
+        page = list((query.start_after(last_doc) if last_doc else query).stream())
+        if not page:
+            return
+        if limit:
+            page = page[:limit - seen]
+        seen += len(page)
+        yield page
+        if len(page) < page_size or (limit and seen >= limit):
+            return
+        last_doc = page[-1]
+
+
+# Returns {fingerprint: formatted_data} for the page's profiles that need a plan
+def pending_profiles(page, force: bool):
+    profiles = {}
+    for doc in page:
+        formatted_data = diet_processor.format_for_diet_recommendation(doc.to_dict())
+        if formatted_data:
+            profiles[diet_processor.fingerprint(formatted_data)] = formatted_data
+    if not force and profiles:
+        for fingerprint in diet_plan_store.get_many(profiles):
+            profiles.pop(fingerprint, None)
+    return profiles
+
+
+def generate_chunk(chunk):
+    fingerprints = [fingerprint for fingerprint, _ in chunk]
+    response = guarded_call(
+        "Diet_Recommendation",
+        diet_processor.jamai.table.add_table_rows,
+        table_type=p.TableType.action,
+        request=diet_processor.build_batch_request([formatted_data for _, formatted_data in chunk]),
+    )
+    return {fingerprint: diet_processor.parse_row(row) for fingerprint, row in zip(fingerprints, response.rows)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute diet plans for all users into the plan store.")
+    parser.add_argument("--page-size", type=int, default=200, help="users read per Firestore page")
+    parser.add_argument("--rows-per-request", type=int, default=5, help="profiles per add_table_rows call")
+    parser.add_argument("--concurrency", type=int, default=4, help="add_table_rows calls in flight")
+    parser.add_argument("--limit", type=int, default=0, help="stop after this many users (0 = all)")
+    parser.add_argument("--force", action="store_true", help="regenerate plans that are still fresh")
+    args = parser.parse_args()
+
+    totals = {"users": 0, "generated": 0, "skipped": 0, "failed": 0}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for page in iter_user_pages(args.page_size, args.limit):
+            totals["users"] += len(page)
+            profiles = list(pending_profiles(page, args.force).items())
+            totals["skipped"] += len(page) - len(profiles)
+            chunks = [profiles[start:start + args.rows_per_request] for start in range(0, len(profiles), args.rows_per_request)]
+            futures = [(chunk, executor.submit(generate_chunk, chunk)) for chunk in chunks]
+            plans = {}
+            for chunk, future in futures:
+                try:
+                    plans.update(future.result())
+                except Exception as e:
+                    print(f"Failed to generate {len(chunk)} plans: {str(e)}")
+                    totals["failed"] += len(chunk)
+            # Plans with a missing meal are left for the live endpoint to generate again
+            incomplete = [fingerprint for fingerprint, plan in plans.items() if not diet_processor.complete_plan(plan)]
+            for fingerprint in incomplete:
+                del plans[fingerprint]
+            totals["failed"] += len(incomplete)
+            if plans:
+                diet_plan_store.put_many(plans)
+                totals["generated"] += len(plans)
+            print(f"{totals['users']} users: {totals['generated']} generated, {totals['skipped']} skipped, {totals['failed']} failed")
+
+    elapsed = time.perf_counter() - started
+    print(f"Done in {elapsed:.1f}s: {totals}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import threading
+from cache import TTLCache
+
+
+# In-memory cache for user profiles looked up by email.
+# Keeps an email -> document id index and the profile dict per document id.
+# A Firestore on_snapshot listener on the users collection drops profiles that change,
+# so cached entries never outlive an update by more than the listener delay.
+# Callers that only read a few fields pass fields=[...]; those profiles are loaded with a Firestore
+# select() projection and cached per projection (a cached full profile also serves any projection).
+class ProfileCache:
+    def __init__(self, loader, ttl: float = 300.0, max_size: int = 10000, bulk_loader=None):
+        # loader(email, fields=None) returns (doc_id, profile_dict) or None
+        self.loader = loader
+        # bulk_loader(emails, fields=None) returns {email: (doc_id, profile_dict)} for the emails that exist
+        self.bulk_loader = bulk_loader
+        self.index = TTLCache(max_size=max_size, ttl=ttl)
+        # Full profiles by doc_id, projected ones by (doc_id, projection)
+        self.profiles = TTLCache(max_size=max_size, ttl=ttl)
+        self._projections = set()
+        self._projections_lock = threading.Lock()
+        self._watch = None
+        self._watch_lock = threading.Lock()
+
+    # Sorted field tuple for a fields list (always including email), None for the full profile
+    @staticmethod
+    def projection(fields):
+        if fields is None:
+            return None
+        return tuple(sorted(set(fields) | {'email'}))
+
+    def _key(self, doc_id: str, projection):
+        return doc_id if projection is None else (doc_id, projection)
+
+    def cached(self, email: str, fields=None):
+        projection = self.projection(fields)
+        doc_id = self.index.get(email)
+        if doc_id is None:
+            return None
+        profile = self.profiles.get(doc_id)
+        if profile is None and projection is not None:
+            profile = self.profiles.get(self._key(doc_id, projection))
+        # The email may have changed since the index entry was written
+        if profile is None or profile.get('email') != email:
+            return None
+        if projection is not None:
+            return {field: profile[field] for field in projection if field in profile}
+        return dict(profile)
+
+    def get(self, email: str, fields=None):
+        profile = self.cached(email, fields)
+        if profile is not None:
+            return profile
+        projection = self.projection(fields)
+        result = self.loader(email, fields=list(projection) if projection else None)
+        if result is None:
+            return None
+        doc_id, profile = result
+        self.put(doc_id, profile, projection)
+        return dict(profile)
+
+    # {email: profile} for the emails that exist; misses are loaded together through bulk_loader
+    def get_many(self, emails, fields=None):
+        projection = self.projection(fields)
+        found = {}
+        missing = []
+        for email in dict.fromkeys(emails):
+            profile = self.cached(email, fields)
+            if profile is not None:
+                found[email] = profile
+            else:
+                missing.append(email)
+        if missing and self.bulk_loader is not None:
+            loaded = self.bulk_loader(missing, fields=list(projection) if projection else None)
+            for email, (doc_id, profile) in loaded.items():
+                self.put(doc_id, profile, projection)
+                found[email] = dict(profile)
+        elif missing:
+            for email in missing:
+                profile = self.get(email, fields)
+                if profile is not None:
+                    found[email] = profile
+        return found
+
+    def put(self, doc_id: str, profile, projection=None):
+        if projection is not None:
+            with self._projections_lock:
+                self._projections.add(projection)
+        self.profiles.set(self._key(doc_id, projection), profile)
+        if profile.get('email'):
+            self.index.set(profile['email'], doc_id)
+
+    def invalidate(self, doc_id: str):
+        self.profiles.invalidate(doc_id)
+        with self._projections_lock:
+            projections = list(self._projections)
+        for projection in projections:
+            self.profiles.invalidate((doc_id, projection))
+
+    def clear(self):
+        self.index.clear()
+        self.profiles.clear()
+
+    def watch(self, collection_ref):
+        with self._watch_lock:
+            if self._watch is None:
+                self._watch = collection_ref.on_snapshot(self._on_snapshot)
+                print("Profile cache listening for changes on the users collection.")
+
+    def unwatch(self):
+        with self._watch_lock:
+            if self._watch is not None:
+                self._watch.unsubscribe()
+                self._watch = None
+
+    def _on_snapshot(self, col_snapshot, changes, read_time):
+        for change in changes:
+            # The initial snapshot reports every document as ADDED; only updates matter here
+            if change.type.name in ('MODIFIED', 'REMOVED'):
+                self.invalidate(change.document.id)
+
+    def stats(self):
+        return {
+            "watching": self._watch is not None,
+            "index": self.index.stats(),
+            "profiles": self.profiles.stats(),
+            "projections": [list(projection) for projection in sorted(self._projections)],
+        }
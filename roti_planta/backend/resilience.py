@@ -0,0 +1,221 @@
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from lazy_imports import LazyModule
+
+httpx = LazyModule("httpx")
+
+
+# Raised when an upstream table is unhealthy or too slow; routes turn it into a 503 degraded response
+class UpstreamUnavailableError(Exception):
+    def __init__(self, message: str, table_id: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.table_id = table_id
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(UpstreamUnavailableError):
+    pass
+
+
+class DeadlineExceededError(UpstreamUnavailableError):
+    pass
+
+
+# Closed -> open after failure_threshold consecutive failures; open -> half-open after reset_timeout,
+# where a single trial call decides whether to close again or re-open.
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == "open" and remaining <= 0:
+                self.state = "half-open"
+            if self.state == "half-open" and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return
+            self.rejected += 1
+            raise CircuitOpenError(
+                f"{self.name} is temporarily unavailable, please try again shortly",
+                table_id=self.name,
+                retry_after=max(remaining, 1.0),
+            )
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self.trial_in_flight = False
+
+    # Feeds the breaker with the outcome of a failed call
+    def record_error(self, error: Exception):
+        if is_upstream_failure(error):
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.state == "half-open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"Circuit opened for {self.name} after {self.failures} failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "rejected": self.rejected,
+            }
+
+
+# jamaibase 1.x raises these for 429/503; matched by name so the SDK is not imported here
+RETRYABLE_ERROR_NAMES = {"RateLimitExceedError", "ServerBusyError", "UnavailableError"}
+
+# jamaibase 0.3 raises a plain RuntimeError carrying the server's message for every non-404 error
+RETRYABLE_MESSAGES = ("429", "503", "too many requests", "rate limit", "server busy", "server is busy",
+                      "service unavailable", "temporarily unavailable")
+
+
+# Failures where the request cannot have been processed upstream, so retrying does not duplicate rows
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return True
+    if any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__):
+        return True
+    if type(error) is RuntimeError:
+        message = str(error).lower()
+        return any(marker in message for marker in RETRYABLE_MESSAGES)
+    return False
+
+
+# Failures that say the upstream table is unhealthy: retryable errors plus timeouts.
+# Anything else (bad input, missing table, parse errors) means the table answered.
+def is_upstream_failure(error: Exception) -> bool:
+    return is_retryable(error) or isinstance(error, (httpx.TimeoutException, DeadlineExceededError))
+
+
+# Per-table deadlines, jittered bounded retries and a circuit breaker per table id around JamAI calls
+class TableGuard:
+    def __init__(self, timeouts=None, default_timeout: float = 30.0, max_retries: int = 2,
+                 base_delay: float = 0.2, max_delay: float = 2.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0, workers: int = 64):
+        self.timeouts = timeouts or {}
+        self.default_timeout = default_timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jamai-call")
+
+    def breaker(self, table_id: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self.breakers.get(table_id)
+            if breaker is None:
+                breaker = CircuitBreaker(table_id, self.failure_threshold, self.reset_timeout)
+                self.breakers[table_id] = breaker
+            return breaker
+
+    def timeout_for(self, table_id: str) -> float:
+        return self.timeouts.get(table_id, self.default_timeout)
+
+    def _deadline_exceeded(self, table_id: str, breaker: CircuitBreaker) -> DeadlineExceededError:
+        breaker.record_failure()
+        return DeadlineExceededError(
+            f"{table_id} did not respond within {self.timeout_for(table_id):g}s",
+            table_id=table_id,
+        )
+
+    # Full jitter backoff before the next attempt, never past the deadline.
+    # None when the error is final; the breaker has then been fed.
+    def _retry_delay(self, table_id: str, breaker: CircuitBreaker, error: Exception, attempt: int, deadline: float):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if attempt > self.max_retries or not is_retryable(error) or time.monotonic() + delay >= deadline:
+            breaker.record_error(error)
+            return None
+        print(f"Retrying {table_id} after {type(error).__name__} (attempt {attempt})")
+        return delay
+
+    def call(self, table_id: str, fn, *args, **kwargs):
+        breaker = self.breaker(table_id)
+        breaker.allow()
+        deadline = time.monotonic() + self.timeout_for(table_id)
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            future = self._executor.submit(fn, *args, **kwargs)
+            try:
+                result = future.result(timeout=max(remaining, 0))
+            except FutureTimeoutError:
+                # The worker thread finishes in the background; the caller is released now
+                raise self._deadline_exceeded(table_id, breaker)
+            except Exception as e:
+                attempt += 1
+                delay = self._retry_delay(table_id, breaker, e, attempt, deadline)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            breaker.record_success()
+            return result
+
+    # call() for coroutine functions (JamAIAsync). The deadline cancels the request itself.
+    async def call_async(self, table_id: str, fn, *args, **kwargs):
+        breaker = self.breaker(table_id)
+        breaker.allow()
+        deadline = time.monotonic() + self.timeout_for(table_id)
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                result = await asyncio.wait_for(fn(*args, **kwargs), timeout=max(remaining, 0))
+            except asyncio.TimeoutError:
+                raise self._deadline_exceeded(table_id, breaker)
+            except Exception as e:
+                attempt += 1
+                delay = self._retry_delay(table_id, breaker, e, attempt, deadline)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            breaker.record_success()
+            return result
+
+    def stats(self):
+        with self._lock:
+            breakers = dict(self.breakers)
+        return {
+            table_id: dict(breaker.stats(), timeout_seconds=self.timeout_for(table_id))
+            for table_id, breaker in breakers.items()
+        }
+
+
+# Parses "Photo_Analysis=90,Report=120" into {"Photo_Analysis": 90.0, "Report": 120.0}
+def parse_timeouts(value: str):
+    timeouts = {}
+    for item in value.split(","):
+        if "=" in item:
+            table_id, seconds = item.split("=", 1)
+            timeouts[table_id.strip()] = float(seconds)
+    return timeouts
@@ -0,0 +1,96 @@
+import json
+import sqlite3
+import threading
+import time
+
+
+# Persistent store for photo/report analysis results keyed by a hash of the uploaded bytes.
+# Entries are scoped per user, and the least recently used ones are evicted once the
+# stored results exceed max_bytes.
+class ResultStore:
+    def __init__(self, path: str = "analysis_results.db", max_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+
+    # The database is opened on first use; callers hold self._lock
+    @property
+    def _conn(self):
+        if self._db is None:
+            self._db = self._open()
+        return self._db
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " scope TEXT NOT NULL,"
+            " kind TEXT NOT NULL,"
+            " digest TEXT NOT NULL,"
+            " result TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (scope, kind, digest))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        conn.commit()
+        return conn
+
+    def get(self, scope: str, kind: str, digest: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM results WHERE scope = ? AND kind = ? AND digest = ?",
+                (scope, kind, digest),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE results SET last_used = ? WHERE scope = ? AND kind = ? AND digest = ?",
+                (time.time(), scope, kind, digest),
+            )
+            self._conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, scope: str, kind: str, digest: str, result) -> None:
+        payload = json.dumps(result, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (scope, kind, digest, result, size, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (scope, kind, digest, payload, len(payload.encode("utf-8")), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT scope, kind, digest, size FROM results ORDER BY last_used").fetchall()
+        for scope, kind, digest, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute(
+                "DELETE FROM results WHERE scope = ? AND kind = ? AND digest = ?",
+                (scope, kind, digest),
+            )
+            total -= size
+
+    def stats(self):
+        with self._lock:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+            return {
+                "entries": count,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
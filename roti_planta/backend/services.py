@@ -0,0 +1,1176 @@
+from __future__ import annotations
+
+import os
+import re
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+from dotenv import load_dotenv
+from lazy_imports import LazyModule
+import pdf_extract
+from cache import TTLCache
+from profile_cache import ProfileCache
+from uploads import upload_file_bytes
+from result_store import ResultStore
+import image_prep
+from jamai_pool import JamAIClients, bound, checkout
+from resilience import TableGuard, UpstreamUnavailableError, parse_timeouts
+from conversations import Conversation, ConversationStore
+from diet_plans import DietPlanStore
+from flows import Call, run
+import metrics
+import textclean
+
+# Configuration, processors and stores shared by both serving modes: the Flask app (merge2.py)
+# and the async app (asgi_app.py). Importing this module builds no web app, job queue or vitals buffer.
+
+# Heavy SDKs are imported on first use so a worker can serve /api/health right after start
+jamaibase = LazyModule("jamaibase")
+p = LazyModule("jamaibase.protocol")
+jamaibase_exceptions = LazyModule("jamaibase.exceptions")
+firebase_admin = LazyModule("firebase_admin")
+credentials = LazyModule("firebase_admin.credentials")
+firestore = LazyModule("firebase_admin.firestore")
+firebase_auth = LazyModule("firebase_admin.auth")
+firestore_v1 = LazyModule("google.cloud.firestore_v1")
+
+# Load environment variables
+load_dotenv()
+
+# Configuration for file uploads (processed in memory; photos pass through a private temp file for the JamAI upload)
+ALLOWED_PHOTO_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+ALLOWED_DOCUMENT_EXTENSIONS = {'.pdf'}
+
+# Stored analysis results, keyed by SHA-256 of the uploaded bytes
+RESULT_STORE_PATH = os.getenv("RESULT_STORE_PATH", "analysis_results.db")
+RESULT_STORE_MAX_BYTES = int(os.getenv("RESULT_STORE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Long reports are analysed in chunks (map) and the partial analyses merged (reduce)
+REPORT_CHUNK_CHARS = int(os.getenv("REPORT_CHUNK_CHARS", "12000"))
+REPORT_CHUNK_CONCURRENCY = int(os.getenv("REPORT_CHUNK_CONCURRENCY", "8"))
+# Action table that merges partial analyses into one (input "Information", output "Analysis", like "Report",
+# but prompted to combine analyses rather than analyse a raw report). Created from "Report" on first use
+# when the project does not have it; REPORT_MERGE_PROMPT becomes its "Analysis" prompt.
+REPORT_MERGE_TABLE_ID = os.getenv("REPORT_MERGE_TABLE_ID", "Report_Merge")
+if REPORT_MERGE_TABLE_ID == "Report":
+    raise ValueError("REPORT_MERGE_TABLE_ID must name a merge table, not the raw-report 'Report' table")
+REPORT_MERGE_PROMPT = os.getenv(
+    "REPORT_MERGE_PROMPT",
+    "The information below is a set of partial analyses, each covering consecutive sections of the same "
+    "medical report. Combine them into one analysis of the whole report in the same format, keeping every "
+    "finding and recommendation and removing repetition.\n\n${Information}",
+)
+
+# Shared JamAI clients per table type, used round-robin by concurrent requests.
+# Each client has its own HTTP connection pool; the sizes do not cap concurrent calls.
+JAMAI_POOL_SIZE_CHAT = int(os.getenv("JAMAI_POOL_SIZE_CHAT", "4"))
+JAMAI_POOL_SIZE_ACTION = int(os.getenv("JAMAI_POOL_SIZE_ACTION", "4"))
+JAMAI_POOL_SIZE_FILE = int(os.getenv("JAMAI_POOL_SIZE_FILE", "2"))
+
+# Per-table deadlines (seconds), retries and circuit breaking for JamAI calls
+JAMAI_DEFAULT_TIMEOUT = float(os.getenv("JAMAI_DEFAULT_TIMEOUT", "30"))
+JAMAI_TABLE_TIMEOUTS = parse_timeouts(os.getenv(
+    "JAMAI_TABLE_TIMEOUTS", "Photo_Analysis=90,Report=120,Diet_Recommendation=90,file_upload=60"
+))
+JAMAI_MAX_RETRIES = int(os.getenv("JAMAI_MAX_RETRIES", "2"))
+JAMAI_BREAKER_FAILURES = int(os.getenv("JAMAI_BREAKER_FAILURES", "5"))
+JAMAI_BREAKER_RESET_SECONDS = float(os.getenv("JAMAI_BREAKER_RESET_SECONDS", "30"))
+
+# Components pre-initialized in the background at startup, e.g. "jamai,firebase,pdf"
+WARMUP_COMPONENTS = [name.strip() for name in os.getenv("WARMUP_COMPONENTS", "").split(",") if name.strip()]
+
+# Project ID and API Key
+PROJECT_ID = os.getenv("PROJECT_ID", "proj_be2c8d9620ef80fd7a193afa")
+API_KEY = os.getenv("JAMAI_API_KEY", "jamai_pat_328b45b69108c037c231e0f5574c5eba79a7f63788f25ecb")
+
+# UserGuide answer cache
+USER_GUIDE_CACHE_SIZE = int(os.getenv("USER_GUIDE_CACHE_SIZE", "512"))
+USER_GUIDE_CACHE_TTL = float(os.getenv("USER_GUIDE_CACHE_TTL", "86400"))
+
+# User profile cache
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "300"))
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+PROFILE_CACHE_LISTENER = os.getenv("PROFILE_CACHE_LISTENER", "1") == "1"
+
+# Bulk profile lookups: Firestore 'in' filters take at most 30 values, chunks are queried concurrently
+PROFILE_BULK_MAX_EMAILS = int(os.getenv("PROFILE_BULK_MAX_EMAILS", "50"))
+PROFILE_BULK_CHUNK_SIZE = min(int(os.getenv("PROFILE_BULK_CHUNK_SIZE", "30")), 30)
+PROFILE_BULK_CONCURRENCY = int(os.getenv("PROFILE_BULK_CONCURRENCY", "8"))
+# Profile field listing the emails of the patients a caregiver or volunteer may read in bulk
+PROFILE_CARE_FIELD = os.getenv("PROFILE_CARE_FIELD", "patients")
+
+# Per-user chat conversations: each one gets its own empty copy of the agent table, rolled over after
+# CHAT_MAX_TURNS rows with the last CHAT_RECAP_TURNS turns carried into the new table;
+# tables of finished conversations are deleted in the background
+CHAT_CONVERSATIONS = os.getenv("CHAT_CONVERSATIONS", "1") == "1"
+CHAT_MAX_TURNS = int(os.getenv("CHAT_MAX_TURNS", "20"))
+CHAT_RECAP_TURNS = int(os.getenv("CHAT_RECAP_TURNS", "3"))
+CHAT_RECAP_CHARS = int(os.getenv("CHAT_RECAP_CHARS", "400"))
+CHAT_CONVERSATION_TTL = float(os.getenv("CHAT_CONVERSATION_TTL", "21600"))
+CHAT_CONVERSATION_MAX = int(os.getenv("CHAT_CONVERSATION_MAX", "10000"))
+# Which table each conversation uses, shared by restarts and by the workers on this host
+CHAT_CONVERSATION_STORE_PATH = os.getenv("CHAT_CONVERSATION_STORE_PATH", "chat_conversations.db")
+
+# Diet plan memoization
+DIET_MEALS = ("Breakfast", "Lunch", "Dinner")
+# Profile fields read for diet plans (format_for_diet_recommendation), also returned as user_data
+DIET_PROFILE_FIELDS = [field.strip() for field in os.getenv(
+    "DIET_PROFILE_FIELDS",
+    "age,gender,weight,height,activityLevel,dietaryPreferences,favouriteCuisines,foodAllergies"
+).split(",") if field.strip()]
+DIET_PLAN_FRESHNESS_SECONDS = float(os.getenv("DIET_PLAN_FRESHNESS_SECONDS", "86400"))
+DIET_PLAN_CACHE_SIZE = int(os.getenv("DIET_PLAN_CACHE_SIZE", "5000"))
+# Shared Firestore store of generated plans (filled by precompute_diet_plans.py), read before generating
+DIET_PLAN_STORE = os.getenv("DIET_PLAN_STORE", "1") == "1"
+DIET_PLAN_COLLECTION = os.getenv("DIET_PLAN_COLLECTION", "diet_plans")
+
+# Initialize Firebase
+def initialize_firebase():
+    try:
+        if not firebase_admin._apps:
+            cred = credentials.Certificate('vcaretest-8e88b-firebase-adminsdk-fbsvc-72ceb7653a.json')
+            firebase_admin.initialize_app(cred)
+        return firestore.client()
+    except Exception as e:
+        print(f"Failed to initialize Firebase: {str(e)}")
+        return None
+
+# Query Firestore for the user document with this email, returns (doc_id, user_data).
+# fields limits the read to those fields with a select() projection.
+def query_user_document(email, fields=None):
+    try:
+        db = initialize_firebase()
+        users_ref = db.collection('users')
+        if PROFILE_CACHE_LISTENER:
+            profile_cache.watch(users_ref)
+        query = users_ref.where(filter=firestore_v1.FieldFilter('email', '==', email)).limit(1)
+        if fields:
+            query = query.select(fields)
+        with metrics.stage("firestore_query"):
+            results = query.get()
+        
+        for doc in results:
+            user_data = doc.to_dict()
+            return doc.id, user_data
+            
+        print(f"No user found with email: {email}")
+        return None
+    except Exception as e:
+        print(f"Error retrieving data: {str(e)}")
+        return None
+
+# Query Firestore for several emails at once with chunked 'in' queries, returns {email: (doc_id, user_data)}
+def query_user_documents(emails, fields=None):
+    db = initialize_firebase()
+    if db is None:
+        raise RuntimeError("Firestore client not available")
+    users_ref = db.collection('users')
+    if PROFILE_CACHE_LISTENER:
+        profile_cache.watch(users_ref)
+    chunks = [emails[start:start + PROFILE_BULK_CHUNK_SIZE] for start in range(0, len(emails), PROFILE_BULK_CHUNK_SIZE)]
+
+    def query_chunk(chunk):
+        query = users_ref.where(filter=firestore_v1.FieldFilter('email', 'in', chunk))
+        if fields:
+            query = query.select(fields)
+        with metrics.stage("firestore_query", table="bulk"):
+            return query.get()
+
+    found = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(PROFILE_BULK_CONCURRENCY, len(chunks)))) as executor:
+        for results in executor.map(query_chunk, chunks):
+            for doc in results:
+                user_data = doc.to_dict()
+                # Same as the single lookup: the first document with an email wins
+                found.setdefault(user_data.get('email'), (doc.id, user_data))
+    return found
+
+profile_cache = ProfileCache(
+    query_user_document, ttl=PROFILE_CACHE_TTL, max_size=PROFILE_CACHE_SIZE, bulk_loader=query_user_documents
+)
+
+# Function to retrieve user data by email; pass fields to read only those (plus email)
+def get_user_data(email, fields=None):
+    return profile_cache.get(email, fields)
+
+# {email: user_data} for the emails that exist
+def get_users_data(emails, fields=None):
+    return profile_cache.get_many(emails, fields)
+
+# Emails whose profiles a signed-in user may read in bulk: their own, plus the patients listed in
+# their profile's PROFILE_CARE_FIELD
+def readable_emails(email: str):
+    profile = get_user_data(email, [PROFILE_CARE_FIELD]) or {}
+    patients = profile.get(PROFILE_CARE_FIELD)
+    if not isinstance(patients, list):
+        patients = []
+    return {email} | {patient.strip().lower() for patient in patients if isinstance(patient, str)}
+
+# Optional 'fields' list from a request body, None for the full profile
+def requested_fields(data):
+    fields = data.get('fields')
+    if fields is None:
+        return None
+    if not isinstance(fields, list) or not all(isinstance(field, str) and field for field in fields):
+        raise ValueError("'fields' must be a list of field names")
+    return fields
+
+# Drops a retired conversation table; runs on the conversation store's cleanup thread
+def delete_conversation_table(table_id: str):
+    chat_client.table.delete_table(p.TableType.chat, table_id, missing_ok=True)
+    print(f"Deleted conversation table {table_id}")
+
+conversation_store = ConversationStore(
+    max_turns=CHAT_MAX_TURNS,
+    recap_turns=CHAT_RECAP_TURNS,
+    recap_chars=CHAT_RECAP_CHARS,
+    ttl=CHAT_CONVERSATION_TTL,
+    max_conversations=CHAT_CONVERSATION_MAX,
+    delete_table=delete_conversation_table,
+    path=CHAT_CONVERSATION_STORE_PATH,
+)
+
+jamai_guard = TableGuard(
+    timeouts=JAMAI_TABLE_TIMEOUTS,
+    default_timeout=JAMAI_DEFAULT_TIMEOUT,
+    max_retries=JAMAI_MAX_RETRIES,
+    failure_threshold=JAMAI_BREAKER_FAILURES,
+    reset_timeout=JAMAI_BREAKER_RESET_SECONDS,
+)
+
+# /metrics stage of a JamAI call, named after the SDK method: "jamai_add_table_rows", "jamai_duplicate_table", ...
+def jamai_stage(table_id: str, fn) -> str:
+    if table_id == "file_upload":
+        return "jamai_file_upload"
+    return f"jamai_{getattr(fn, 'method', None) or getattr(fn, '__name__', 'call')}"
+
+# Guarded JamAI call, timed per table id for /metrics
+# The pooled client is picked, and created on first use, before the guard starts the table's deadline,
+# so client start-up never counts as the table being slow
+def guarded_call(table_id: str, fn, *args, **kwargs):
+    with metrics.stage(jamai_stage(table_id, fn), table=table_id):
+        with bound(fn) as call:
+            return jamai_guard.call(table_id, call, *args, **kwargs)
+
+# guarded_call for JamAIAsync methods (asgi_app.py)
+async def guarded_call_async(table_id: str, fn, *args, **kwargs):
+    with metrics.stage(jamai_stage(table_id, fn), table=table_id):
+        return await jamai_guard.call_async(table_id, fn, *args, **kwargs)
+
+# Cache key for chat messages: case, punctuation and whitespace differences map to the same key
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_message(message: str) -> str:
+    normalized = _PUNCTUATION_RE.sub(" ", message.lower())
+    return _WHITESPACE_RE.sub(" ", normalized).strip()
+
+# Chatbot class
+class Chatbot:
+    def __init__(self, project_id: str, api_key: str, table_id: str, cache: Optional[TTLCache] = None, client=None):
+        self.table_id = table_id
+        self.cache = cache
+        try:
+            self.client = client or jamaibase.JamAI(project_id=project_id, api_key=api_key)
+            print(f"Successfully connected to JamAI Base for {table_id}.")
+        except Exception as e:
+            print(f"Failed to initialize JamAI client for {table_id}: {str(e)}")
+            raise
+
+    @metrics.timed("text_cleaning", table="chat")
+    def clean_text(self, text: str) -> str:
+        return textclean.clean_chat_text(text)
+
+    def build_request(self, user_message: str, stream: bool = False, table_id: Optional[str] = None) -> p.RowAddRequest:
+        return p.RowAddRequest(
+            table_id=table_id or self.table_id,
+            data=[{"User": user_message}],
+            stream=stream
+        )
+
+    # JamAI calls of the flows below: guarded_call here, guarded_call_async in the async app (asgi_app.py)
+    call_table = staticmethod(guarded_call)
+
+    # The conversation's turn lock; the async app waits for it without blocking the event loop
+    def acquire_turn(self, conversation_key: str) -> Conversation:
+        return conversation_store.acquire(self.table_id, conversation_key)
+
+    # Creates the conversation's next table (first turn or roll-over): the agent table's columns and
+    # prompts without its rows. create_as_child would force include_data, copying other users' history.
+    def open_conversation_table_flow(self, conversation: Conversation):
+        table_id = conversation.next_table_id()
+        yield Call(
+            self.call_table,
+            self.table_id,
+            self.client.table.duplicate_table,
+            p.TableType.chat,
+            self.table_id,
+            table_id_dst=table_id,
+            include_data=False,
+            create_as_child=False,
+        )
+        yield Call(conversation_store.started, conversation, table_id)
+        print(f"Started conversation table {table_id}")
+
+    def send_flow(self, user_message: str, table_id: Optional[str] = None):
+        response = yield Call(
+            self.call_table,
+            self.table_id,
+            self.client.table.add_table_rows,
+            table_type=p.TableType.chat,
+            request=self.build_request(user_message, table_id=table_id)
+        )
+        return self.clean_text(response.rows[0].columns["AI"].text)
+
+    # conversation_key (see conversation_key()) keeps the user's history in its own table;
+    # without one the message goes to the shared agent table.
+    # Answers within a conversation depend on its history, so they never touch the response cache.
+    def chat_flow(self, user_message: str, conversation_key: Optional[str] = None):
+        use_cache = self.cache is not None and conversation_key is None
+        cache_key = normalize_message(user_message) if use_cache else None
+        if cache_key:
+            cached_response = self.cache.get(cache_key)
+            if cached_response is not None:
+                print(f"Cache hit ({self.table_id}): {cache_key}")
+                return cached_response
+        try:
+            print(f"User ({self.table_id}): {user_message}")
+            if conversation_key is None:
+                cleaned_response = yield from self.send_flow(user_message)
+            else:
+                conversation = yield Call(self.acquire_turn, conversation_key)
+                try:
+                    if conversation_store.needs_table(conversation):
+                        yield from self.open_conversation_table_flow(conversation)
+                    cleaned_response = yield from self.send_flow(conversation.prepare(user_message), table_id=conversation.table_id)
+                    yield Call(conversation_store.record, conversation, user_message, cleaned_response)
+                finally:
+                    conversation_store.release(conversation)
+            print(f"AI ({self.table_id}): {cleaned_response}")
+            if cache_key:
+                self.cache.set(cache_key, cleaned_response)
+            return cleaned_response
+        except UpstreamUnavailableError:
+            raise
+        except Exception as e:
+            print(f"Error for {self.table_id}: {str(e)}")
+            return f"Sorry, something went wrong: {str(e)}"
+
+    def chat(self, user_message: str, conversation_key: Optional[str] = None):
+        return run(self.chat_flow(user_message, conversation_key))
+
+    # Answers several messages with one add_table_rows call (one row per message), in input order
+    def chat_many(self, user_messages):
+        responses = [None] * len(user_messages)
+        pending = []
+        for index, user_message in enumerate(user_messages):
+            cache_key = normalize_message(user_message) if self.cache is not None else None
+            cached_response = self.cache.get(cache_key) if cache_key else None
+            if cached_response is not None:
+                responses[index] = cached_response
+            else:
+                pending.append((index, user_message, cache_key))
+        if not pending:
+            return responses
+        try:
+            print(f"User ({self.table_id}, batch of {len(pending)})")
+            response = guarded_call(
+                self.table_id,
+                self.client.table.add_table_rows,
+                table_type=p.TableType.chat,
+                request=p.RowAddRequest(
+                    table_id=self.table_id,
+                    data=[{"User": user_message} for _, user_message, _ in pending],
+                    stream=False
+                )
+            )
+            for (index, _, cache_key), row in zip(pending, response.rows):
+                cleaned_response = self.clean_text(row.columns["AI"].text)
+                responses[index] = cleaned_response
+                if cache_key:
+                    self.cache.set(cache_key, cleaned_response)
+        except UpstreamUnavailableError:
+            raise
+        except Exception as e:
+            print(f"Error for {self.table_id}: {str(e)}")
+            for index, _, _ in pending:
+                responses[index] = f"Sorry, something went wrong: {str(e)}"
+        for index, _, _ in pending:
+            if responses[index] is None:
+                responses[index] = "Sorry, something went wrong: no response row returned"
+        return responses
+
+    # Yields cleaned AI text deltas as JamAI generates them.
+    # clean_text only drops characters, so applying it per chunk gives the same result as on the full answer.
+    def chat_stream(self, user_message: str, conversation_key: Optional[str] = None):
+        print(f"User ({self.table_id}, stream): {user_message}")
+        if conversation_key is None:
+            yield from self.stream_row(user_message)
+            return
+        with conversation_store.turn(self.table_id, conversation_key) as conversation:
+            if conversation_store.needs_table(conversation):
+                run(self.open_conversation_table_flow(conversation))
+            deltas = []
+            for delta in self.stream_row(conversation.prepare(user_message), table_id=conversation.table_id):
+                deltas.append(delta)
+                yield delta
+            conversation_store.record(conversation, user_message, "".join(deltas))
+
+    def stream_row(self, user_message: str, table_id: Optional[str] = None):
+        # Streams have no overall deadline, but still respect and feed the table's circuit breaker
+        breaker = jamai_guard.breaker(self.table_id)
+        breaker.allow()
+        try:
+            chunks = self.client.table.add_table_rows(
+                table_type=p.TableType.chat,
+                request=self.build_request(user_message, stream=True, table_id=table_id)
+            )
+            for chunk in chunks:
+                if not isinstance(chunk, p.GenTableStreamChatCompletionChunk):
+                    continue
+                if chunk.output_column_name != "AI":
+                    continue
+                delta = self.clean_text(chunk.text or "")
+                if delta:
+                    yield delta
+        except GeneratorExit:
+            # Client went away, not an upstream failure
+            breaker.record_success()
+            raise
+        except Exception as e:
+            breaker.record_error(e)
+            raise
+        breaker.record_success()
+
+# PhotoProcessor class
+class PhotoProcessor:
+    def __init__(self, project_id: str, pat: str, client=None, file_client=None):
+        self.client = client or jamaibase.JamAI(project_id=project_id, token=pat)
+        self.file_client = file_client or self.client
+    
+    def validate_image(self, image_path: str) -> bool:
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f"Image not found: {image_path}")
+        return self.validate_image_name(image_path)
+
+    def validate_image_name(self, filename: str) -> bool:
+        file_ext = os.path.splitext(filename)[1].lower()
+        if file_ext not in ALLOWED_PHOTO_EXTENSIONS:
+            raise ValueError(f"Unsupported file format. Use: {ALLOWED_PHOTO_EXTENSIONS}")
+        return True
+
+    @metrics.timed("text_cleaning", table="Photo_Analysis")
+    def clean_text(self, text: str) -> str:
+        return textclean.clean_photo_text(text)
+
+    def process_photo(self, image_path: str) -> Optional[Dict[str, str]]:
+        try:
+            self.validate_image(image_path)
+            with open(image_path, "rb") as f:
+                data = f.read()
+        except Exception as e:
+            print(f"Error processing photo: {str(e)}")
+            return None
+        return self.process_photo_bytes(data, os.path.basename(image_path))
+
+    # JamAI calls of the flows below: guarded_call here, guarded_call_async in the async app (asgi_app.py)
+    call_table = staticmethod(guarded_call)
+
+    # The pooled file client is checked out before the upload's deadline starts
+    def upload(self, data: bytes, filename: str):
+        with checkout(self.file_client) as file_client:
+            return guarded_call("file_upload", upload_file_bytes, file_client, data, filename)
+
+    def photo_flow(self, data: bytes, filename: str):
+        try:
+            self.validate_image_name(filename)
+            data, filename, _ = yield Call(image_prep.preprocess_image, data, filename)
+            file_response = yield Call(self.upload, data, filename)
+            response = yield Call(
+                self.call_table,
+                "Photo_Analysis",
+                self.client.table.add_table_rows,
+                table_type=p.TableType.action,
+                request=self.build_request(file_response.uri),
+            )
+            return self.parse_response(response)
+        except UpstreamUnavailableError:
+            raise
+        except Exception as e:
+            print(f"Error processing photo: {str(e)}")
+            return None
+
+    def process_photo_bytes(self, data: bytes, filename: str) -> Optional[Dict[str, str]]:
+        return run(self.photo_flow(data, filename))
+
+    def build_request(self, image_uri: str) -> p.RowAddRequest:
+        return p.RowAddRequest(
+            table_id="Photo_Analysis",
+            data=[{"Image": image_uri}],
+            stream=False,
+        )
+
+    def parse_response(self, response) -> Optional[Dict[str, str]]:
+        if not response.rows or "Result" not in response.rows[0].columns:
+            return None
+        raw_result = response.rows[0].columns["Result"].text
+        cleaned_result = self.clean_text(raw_result)
+        return {"result": cleaned_result}
+
+# Report section boundaries: a blank line, or a heading line such as "DISCHARGE SUMMARY" or "Medications:"
+_SECTION_BREAK_RE = re.compile(r"\n\s*\n|\n(?=[A-Z][A-Z0-9 ,/&()\-]{3,}:?[ \t]*\n|[A-Z][\w ,/&()\-]{2,60}:[ \t]*\n)")
+
+# DocumentProcessor class
+# Gen config update that turns a copy of "Report" into the merge table: same model and system prompt
+# for "Analysis", prompted with REPORT_MERGE_PROMPT
+def merge_table_gen_config(report) -> p.GenConfigUpdateRequest:
+    analysis = next((column for column in report.cols if column.id == "Analysis"), None)
+    if analysis is None or analysis.gen_config is None:
+        raise ValueError("Report table has no generated 'Analysis' column to copy")
+    gen_config = analysis.gen_config.model_copy(update={"prompt": REPORT_MERGE_PROMPT})
+    return p.GenConfigUpdateRequest(table_id=REPORT_MERGE_TABLE_ID, column_map={"Analysis": gen_config})
+
+class DocumentProcessor:
+    def __init__(self, project_id: str, pat: str, client=None):
+        self.client = client or jamaibase.JamAI(project_id=project_id, token=pat)
+        self._merge_table_ready = False
+        self._merge_table_lock = threading.Lock()
+    
+    def validate_document(self, doc_path: str) -> bool:
+        if not os.path.exists(doc_path):
+            raise FileNotFoundError(f"Document not found: {doc_path}")
+        return self.validate_document_name(doc_path)
+
+    def validate_document_name(self, filename: str) -> bool:
+        file_ext = os.path.splitext(filename)[1].lower()
+        if file_ext not in ALLOWED_DOCUMENT_EXTENSIONS:
+            raise ValueError(f"Unsupported file format. Use: {ALLOWED_DOCUMENT_EXTENSIONS}")
+        return True
+
+    # Accepts a path, raw bytes or a binary file-like object (e.g. BytesIO).
+    # Pages are extracted in parallel, capped at PDF_MAX_PAGES and bounded by PDF_EXTRACT_TIMEOUT.
+    @metrics.timed("pdf_extraction")
+    def extract_pages_from_pdf(self, pdf_source):
+        try:
+            if isinstance(pdf_source, (bytes, bytearray)):
+                data = bytes(pdf_source)
+            elif isinstance(pdf_source, str):
+                with open(pdf_source, "rb") as f:
+                    data = f.read()
+            else:
+                data = pdf_source.read()
+            return pdf_extract.extract_pages(data)
+        except Exception as e:
+            raise RuntimeError(f"Failed to extract text from PDF: {str(e)}")
+
+    def extract_text_from_pdf(self, pdf_source) -> str:
+        return "".join(self.extract_pages_from_pdf(pdf_source)).strip()
+
+    # Splits page texts into chunks of at most max_chars, breaking at page and section boundaries
+    def split_report(self, pages, max_chars: int = REPORT_CHUNK_CHARS):
+        sections = []
+        for page_text in pages:
+            sections.extend(section for section in _SECTION_BREAK_RE.split(page_text) if section.strip())
+        chunks = []
+        current = ""
+        for section in sections:
+            # A single section longer than a chunk is split on line boundaries
+            while len(section) > max_chars:
+                cut = section.rfind("\n", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                if current:
+                    chunks.append(current)
+                    current = ""
+                chunks.append(section[:cut])
+                section = section[cut:]
+            if current and len(current) + len(section) + 1 > max_chars:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n{section}" if current else section
+        if current:
+            chunks.append(current)
+        return [chunk.strip() for chunk in chunks if chunk.strip()]
+
+    @metrics.timed("text_cleaning", table="Report")
+    def clean_text(self, text: str) -> str:
+        return textclean.clean_report_text(text)
+
+    def process_document(self, doc_path: str) -> Optional[Dict[str, str]]:
+        try:
+            self.validate_document(doc_path)
+            with open(doc_path, "rb") as f:
+                data = f.read()
+        except Exception as e:
+            print(f"Error processing document: {str(e)}")
+            return None
+        return self.process_document_bytes(data, os.path.basename(doc_path))
+
+    # JamAI calls of the flows below: guarded_call here, guarded_call_async in the async app (asgi_app.py)
+    call_table = staticmethod(guarded_call)
+
+    def document_flow(self, data: bytes, filename: str):
+        try:
+            self.validate_document_name(filename)
+            pages = yield Call(self.extract_pages_from_pdf, data)
+            extracted_text = "".join(pages).strip()
+            if not extracted_text:
+                return None
+            if len(extracted_text) > REPORT_CHUNK_CHARS:
+                return (yield from self.analyze_chunked_flow(pages))
+            return (yield from self.analyze_text_flow(extracted_text))
+        except UpstreamUnavailableError:
+            raise
+        except Exception as e:
+            print(f"Error processing document: {str(e)}")
+            return None
+
+    def process_document_bytes(self, data: bytes, filename: str) -> Optional[Dict[str, str]]:
+        return run(self.document_flow(data, filename), REPORT_CHUNK_CONCURRENCY)
+
+    def analyze_text_flow(self, text: str, table_id: str = "Report"):
+        response = yield Call(
+            self.call_table,
+            table_id,
+            self.client.table.add_table_rows,
+            table_type=p.TableType.action,
+            request=self.build_request(text, table_id=table_id),
+        )
+        return self.parse_response(response)
+
+    # Map: analyse every chunk concurrently. Reduce: merge the partial analyses on the merge table,
+    # in rounds of groups that fit REPORT_CHUNK_CHARS until one merge covers everything.
+    # Latency follows the slowest chunk plus a few merge rounds, not the total report length.
+    def analyze_chunked_flow(self, pages):
+        chunks = self.split_report(pages)
+        print(f"Analysing report in {len(chunks)} chunks")
+        if len(chunks) == 1:
+            return (yield from self.analyze_text_flow(chunks[0]))
+        partials = yield [self.analyze_text_flow(chunk) for chunk in chunks]
+        if any(partial is None for partial in partials):
+            return None
+        results = [partial['result'] for partial in partials]
+        if not (yield Call(self.merge_table_available)):
+            return {"result": self.merge_input(results)}
+        while True:
+            groups = self.merge_groups(results)
+            if len(groups) == 1:
+                return (yield from self.merge_analyses_flow(groups[0]))
+            print(f"Merging {len(results)} partial analyses in {len(groups)} groups")
+            merged = yield [self.merge_analyses_flow(group) for group in groups]
+            if any(partial is None for partial in merged):
+                return None
+            results = [partial['result'] for partial in merged]
+
+    def analyze_chunked(self, pages) -> Optional[Dict[str, str]]:
+        return run(self.analyze_chunked_flow(pages), REPORT_CHUNK_CONCURRENCY)
+
+    # Splits analyses into consecutive groups whose merge input fits REPORT_CHUNK_CHARS.
+    # Groups hold at least two analyses, so every round shrinks the list.
+    def merge_groups(self, analyses, max_chars: int = REPORT_CHUNK_CHARS):
+        groups = []
+        current = []
+        size = 0
+        for analysis in analyses:
+            # Plus room for the "Partial analysis i of n" header
+            cost = len(analysis) + 40
+            if len(current) >= 2 and size + cost > max_chars:
+                groups.append(current)
+                current, size = [], 0
+            current.append(analysis)
+            size += cost
+        if len(current) == 1 and groups:
+            groups[-1].append(current[0])
+        elif current:
+            groups.append(current)
+        return groups
+
+    # Makes sure the merge table exists, creating it from "Report" if needed. When it cannot be created,
+    # long reports get the partial analyses one after another instead of failing.
+    def merge_table_available(self) -> bool:
+        with self._merge_table_lock:
+            return run(self.merge_table_flow())
+
+    # Called under the merge table lock
+    def merge_table_flow(self):
+        if self._merge_table_ready:
+            return True
+        try:
+            yield from self.create_merge_table_flow()
+        except UpstreamUnavailableError:
+            raise
+        except Exception as e:
+            print(f"Merge table {REPORT_MERGE_TABLE_ID} not available, returning partial analyses: {str(e)}")
+            return False
+        self._merge_table_ready = True
+        return True
+
+    def create_merge_table_flow(self):
+        try:
+            yield Call(self.call_table, REPORT_MERGE_TABLE_ID, self.client.table.get_table, p.TableType.action, REPORT_MERGE_TABLE_ID)
+            return
+        except jamaibase_exceptions.ResourceNotFoundError:
+            pass
+        print(f"Creating merge table {REPORT_MERGE_TABLE_ID} from Report")
+        report = yield Call(self.call_table, "Report", self.client.table.get_table, p.TableType.action, "Report")
+        yield Call(
+            self.call_table,
+            REPORT_MERGE_TABLE_ID,
+            self.client.table.duplicate_table,
+            p.TableType.action,
+            "Report",
+            table_id_dst=REPORT_MERGE_TABLE_ID,
+            include_data=False,
+        )
+        yield Call(
+            self.call_table, REPORT_MERGE_TABLE_ID, self.client.table.update_gen_config, p.TableType.action, merge_table_gen_config(report)
+        )
+
+    # Input row for the merge table
+    def merge_input(self, analyses) -> str:
+        return "\n\n".join(
+            f"Partial analysis {index} of {len(analyses)}:\n{analysis}"
+            for index, analysis in enumerate(analyses, start=1)
+        )
+
+    def merge_analyses_flow(self, analyses):
+        if len(analyses) == 1:
+            return {"result": analyses[0]}
+        return (yield from self.analyze_text_flow(self.merge_input(analyses), table_id=REPORT_MERGE_TABLE_ID))
+
+    def build_request(self, extracted_text: str, table_id: str = "Report") -> p.RowAddRequest:
+        return p.RowAddRequest(
+            table_id=table_id,
+            data=[{"Information": extracted_text}],
+            stream=False,
+        )
+
+    def parse_response(self, response) -> Optional[Dict[str, str]]:
+        if not response.rows or "Analysis" not in response.rows[0].columns:
+            return None
+        raw_result = response.rows[0].columns["Analysis"].text
+        cleaned_result = self.clean_text(raw_result)
+        return {"result": cleaned_result}
+
+
+class DietRecommendationProcessor:
+    def __init__(self, project_id: str, api_key: str, client=None, plan_store: Optional[DietPlanStore] = None):
+        self.plan_cache = TTLCache(max_size=DIET_PLAN_CACHE_SIZE, ttl=DIET_PLAN_FRESHNESS_SECONDS)
+        self.plan_store = plan_store
+        try:
+            self.jamai = client or jamaibase.JamAI(api_key=api_key, project_id=project_id)
+            print("Successfully initialized JamAI for Diet Recommendation.")
+        except Exception as e:
+            print(f"Failed to initialize JamAI for Diet Recommendation: {str(e)}")
+            self.jamai = None
+
+    def format_for_diet_recommendation(self, user_data):
+        if not user_data:
+            print("No user data to format.")
+            return None
+        try:
+            age = user_data.get('age', 'N/A')
+            height = user_data.get('height', 'N/A')
+            weight = user_data.get('weight', 'N/A')
+            formatted_data = {
+                "Age": str(age) if age != 'N/A' else 'N/A',
+                "Gender": user_data.get('gender', 'N/A'),
+                "Weight": str(weight) if weight != 'N/A' else 'N/A',
+                "Height": str(height) if height != 'N/A' else 'N/A',
+                "Activity Level": user_data.get('activityLevel', 'N/A'),
+                "Dietary Preference": ', '.join(user_data.get('dietaryPreferences', [])),
+                "Favourite Cuisine": ', '.join(user_data.get('favouriteCuisines', [])),
+                "Food Allergies": ', '.join(user_data.get('foodAllergies', []))
+            }
+            print("User data formatted successfully for JamAI Base!")
+            return formatted_data
+        except Exception as e:
+            print(f"Error formatting data for JamAI Base: {str(e)}")
+            return None
+
+    @metrics.timed("text_cleaning", table="Diet_Recommendation")
+    def clean_meal_plan(self, meal_plan):
+        return textclean.clean_meal_plan(meal_plan)
+
+    # Stable hash of the profile fields that drive the meal plans
+    def fingerprint(self, formatted_data) -> str:
+        canonical = json.dumps(formatted_data, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    # Plan for this fingerprint from the in-process cache, then the shared plan store
+    def stored_plan(self, key: str):
+        recommendations = self.plan_cache.get(key)
+        if recommendations is None and self.plan_store is not None:
+            recommendations = self.plan_store.get(key)
+            if recommendations is not None:
+                self.plan_cache.set(key, dict(recommendations))
+        if recommendations is not None:
+            print(f"Serving stored diet plan for fingerprint {key[:12]}")
+        return recommendations
+
+    # A plan is only worth serving again when every meal came back with text
+    @staticmethod
+    def complete_plan(recommendations) -> bool:
+        return all(recommendations.get(meal) not in (None, "", "Not available") for meal in DIET_MEALS)
+
+    # Incomplete plans (a failed or empty meal) are not stored, so the next request asks the table again
+    def store_plan(self, key: str, recommendations):
+        if not self.complete_plan(recommendations):
+            print(f"Not storing incomplete diet plan for fingerprint {key[:12]}")
+            return
+        self.plan_cache.set(key, dict(recommendations))
+        if self.plan_store is not None:
+            self.plan_store.put(key, recommendations)
+
+    # JamAI calls of the flows below: guarded_call here, guarded_call_async in the async app (asgi_app.py)
+    call_table = staticmethod(guarded_call)
+
+    # Serves a stored plan for an unchanged profile, regenerate=True forces a new LLM run
+    def recommendations_flow(self, formatted_data, regenerate: bool = False):
+        key = self.fingerprint(formatted_data)
+        if not regenerate:
+            recommendations = yield Call(self.stored_plan, key)
+            if recommendations is not None:
+                return dict(recommendations)
+        recommendations = yield from self.diet_table_flow(formatted_data)
+        if recommendations:
+            yield Call(self.store_plan, key, recommendations)
+        return recommendations
+
+    def get_recommendations(self, formatted_data, regenerate: bool = False):
+        return run(self.recommendations_flow(formatted_data, regenerate))
+
+    # Yields (meal, plan) as each meal column finishes, e.g. ("Breakfast", "..."), then stores the plan if complete.
+    # clean_meal_plan works on whole lines, so it runs once per completed column rather than per delta.
+    def stream_recommendations(self, formatted_data, regenerate: bool = False):
+        key = self.fingerprint(formatted_data)
+        if not regenerate:
+            recommendations = self.stored_plan(key)
+            if recommendations is not None:
+                yield from recommendations.items()
+                return
+        if not self.jamai:
+            raise RuntimeError("JamAI client not initialized.")
+        recommendations = {}
+        for meal, plan in self.stream_meal_columns(formatted_data):
+            recommendations[meal] = plan
+            yield meal, plan
+        for meal in DIET_MEALS:
+            if meal not in recommendations:
+                recommendations[meal] = "Not available"
+                yield meal, "Not available"
+        self.store_plan(key, recommendations)
+
+    def stream_meal_columns(self, formatted_data):
+        # Streams have no overall deadline, but still respect and feed the table's circuit breaker
+        breaker = jamai_guard.breaker("Diet_Recommendation")
+        breaker.allow()
+        buffers = {}
+        try:
+            chunks = self.jamai.table.add_table_rows(
+                table_type=p.TableType.action,
+                request=self.build_request(formatted_data, stream=True)
+            )
+            for chunk in chunks:
+                if not isinstance(chunk, p.GenTableStreamChatCompletionChunk):
+                    continue
+                meal = chunk.output_column_name
+                if meal not in DIET_MEALS:
+                    continue
+                buffers.setdefault(meal, []).append(chunk.text or "")
+                finish_reason = chunk.choices[0].finish_reason if chunk.choices else None
+                if finish_reason is not None:
+                    yield meal, self.clean_meal_plan("".join(buffers.pop(meal)) or "Not available")
+        except GeneratorExit:
+            # Client went away, not an upstream failure
+            breaker.record_success()
+            raise
+        except Exception as e:
+            breaker.record_error(e)
+            raise
+        breaker.record_success()
+        # Columns whose last chunk carried no finish_reason
+        for meal, parts in buffers.items():
+            yield meal, self.clean_meal_plan("".join(parts) or "Not available")
+
+    def diet_table_flow(self, formatted_data):
+        print("Attempting to add data to Diet_Recommendation table...")
+        try:
+            if not self.jamai:
+                print("JamAI client not initialized.")
+                return None
+            
+            # Add a row to the Diet_Recommendation table
+            print("Sending request to JamAI Base...")
+            response = yield Call(
+                self.call_table,
+                "Diet_Recommendation",
+                self.jamai.table.add_table_rows,
+                table_type=p.TableType.action,
+                request=self.build_request(formatted_data)
+            )
+            return self.parse_response(response)
+
+        except UpstreamUnavailableError:
+            raise
+        except Exception as e:
+            print(f"Error interacting with JamAI Base: {str(e)}")
+            return None
+
+    def build_row_data(self, formatted_data):
+        # Prepare the data for the Diet_Recommendation table
+        return {
+            "Age": formatted_data["Age"],
+            "Gender": formatted_data["Gender"],
+            "Weight": formatted_data["Weight"],
+            "Height": formatted_data["Height"],
+            "Activity Level": formatted_data["Activity Level"],
+            "Dietary Preference": formatted_data["Dietary Preference"],
+            "Favourite Cuisine": formatted_data["Favourite Cuisine"],
+            "Food Allergies": formatted_data["Food Allergies"]
+        }
+
+    # One request for several profiles (one row each), used by the precompute job
+    def build_batch_request(self, formatted_rows) -> p.RowAddRequest:
+        return p.RowAddRequest(
+            table_id="Diet_Recommendation",
+            data=[self.build_row_data(formatted_data) for formatted_data in formatted_rows],
+            stream=False
+        )
+
+    def build_request(self, formatted_data, stream: bool = False) -> p.RowAddRequest:
+        return p.RowAddRequest(
+            table_id="Diet_Recommendation",
+            data=[self.build_row_data(formatted_data)],
+            stream=stream
+        )
+
+    def parse_response(self, response):
+        try:
+            # Debug: Print the response type and structure
+            print("JamAI Response Type:", type(response))
+            print("JamAI Response:", response)
+
+            # Check the type of response
+            if isinstance(response, p.GenTableRowsChatCompletionChunks):
+                print("Received a streaming response from JamAI Base.")
+                recommendations = {
+                    "Breakfast": "Not available",
+                    "Lunch": "Not available",
+                    "Dinner": "Not available"
+                }
+                # Handle streaming response
+                for chunk in response:
+                    if isinstance(chunk, tuple) and len(chunk) > 1 and chunk[0] == 'rows':
+                        # Extract the GenTableChatCompletionChunks object
+                        table_chunks = chunk[1][0]  # First row
+                        columns = table_chunks.columns
+                        print("Streaming Columns:", columns)
+                        # Extract meal plans from the columns
+                        if 'Breakfast' in columns:
+                            breakfast_chunk = columns['Breakfast']
+                            if breakfast_chunk.choices and breakfast_chunk.choices[0].message.content:
+                                recommendations["Breakfast"] = self.clean_meal_plan(breakfast_chunk.choices[0].message.content)
+                        if 'Lunch' in columns:
+                            lunch_chunk = columns['Lunch']
+                            if lunch_chunk.choices and lunch_chunk.choices[0].message.content:
+                                recommendations["Lunch"] = self.clean_meal_plan(lunch_chunk.choices[0].message.content)
+                        if 'Dinner' in columns:
+                            dinner_chunk = columns['Dinner']
+                            if dinner_chunk.choices and dinner_chunk.choices[0].message.content:
+                                recommendations["Dinner"] = self.clean_meal_plan(dinner_chunk.choices[0].message.content)
+                        break  # We only need the 'rows' chunk
+                print("Processed streaming response into meal plans.")
+                print("Warning: Received a streaming response despite stream=False. This may indicate a misconfiguration.")
+            elif isinstance(response, p.ChatCompletionChunk):
+                print("Received a ChatCompletionChunk response from JamAI Base.")
+                recommendations = {
+                    "Breakfast": "Not available",
+                    "Lunch": "Not available",
+                    "Dinner": "Not available"
+                }
+                # Handle ChatCompletionChunk response
+                content = response.choices[0].message.content if response.choices and response.choices[0].message else "Not available"
+                print("Extracted Content:", content)
+                # Parse the content into recommendations
+                content = content.lower()
+                if "breakfast:" in content:
+                    breakfast_section = content.split("breakfast:")[1].split("lunch:")[0] if "lunch:" in content else content.split("breakfast:")[1]
+                    recommendations["Breakfast"] = self.clean_meal_plan(breakfast_section.strip())
+                if "lunch:" in content:
+                    lunch_section = content.split("lunch:")[1].split("dinner:")[0] if "dinner:" in content else content.split("lunch:")[1]
+                    recommendations["Lunch"] = self.clean_meal_plan(lunch_section.strip())
+                if "dinner:" in content:
+                    dinner_section = content.split("dinner:")[1]
+                    recommendations["Dinner"] = self.clean_meal_plan(dinner_section.strip())
+                print("Processed ChatCompletionChunk response into meal plans.")
+                print("Warning: Received a ChatCompletionChunk response, which is unexpected for an action table. This may indicate a misconfiguration.")
+            else:
+                # Handle non-streaming response (expected behavior for an action table)
+                print("Received a non-streaming response from JamAI Base.")
+                if hasattr(response, 'rows') and response.rows:
+                    row = response.rows[0]  # Access the first row
+                    columns = row.columns  # Access the columns dictionary
+                    print("Non-Streaming Columns:", columns)
+                    recommendations = self.parse_row(row)
+                else:
+                    print("Error: No rows returned in the response or unexpected response format.")
+                    recommendations = None
+
+            return recommendations
+
+        except Exception as e:
+            print(f"Error parsing JamAI Base response: {str(e)}")
+            return None
+
+    # row is a GenTableChatCompletionChunks: columns maps column name -> ChatCompletionChunk
+    def parse_row(self, row) -> Dict[str, str]:
+        recommendations = {}
+        for meal in DIET_MEALS:
+            cell = row.columns.get(meal)
+            recommendations[meal] = self.clean_meal_plan((cell.text if cell is not None else "") or "Not available")
+        return recommendations
+
+
+# Tables served by each client pool
+JAMAI_POOL_TABLES = {
+    "chat": ("EmotionalSupport", "CheckSymptoms", "MedicineRecommendation", "UserGuide"),
+    "action": ("Photo_Analysis", "Report", REPORT_MERGE_TABLE_ID, "Diet_Recommendation"),
+    "file": ("file_upload",),
+}
+
+# The guard only stops waiting at a table's deadline; the HTTP timeout (the longest deadline
+# among the pool's tables) is what ends the abandoned request instead of the SDK's 15 minute default
+def jamai_http_timeout(pool_name: str) -> float:
+    return max(jamai_guard.timeout_for(table_id) for table_id in JAMAI_POOL_TABLES[pool_name])
+
+def jamai_client(pool_name: str):
+    timeout = jamai_http_timeout(pool_name)
+    return jamaibase.JamAI(project_id=PROJECT_ID, token=API_KEY, timeout=timeout, file_upload_timeout=timeout)
+
+# Shared JamAI clients: every processor draws from these pools instead of owning a client
+jamai_clients = JamAIClients(
+    factory=jamai_client,
+    sizes={
+        "chat": JAMAI_POOL_SIZE_CHAT,
+        "action": JAMAI_POOL_SIZE_ACTION,
+        "file": JAMAI_POOL_SIZE_FILE,
+    },
+)
+chat_client = jamai_clients.client("chat")
+action_client = jamai_clients.client("action")
+file_client = jamai_clients.client("file")
+
+# Initialize processors
+emotional_support_chatbot = Chatbot(project_id=PROJECT_ID, api_key=API_KEY, table_id="EmotionalSupport", client=chat_client)
+check_symptoms_chatbot = Chatbot(project_id=PROJECT_ID, api_key=API_KEY, table_id="CheckSymptoms", client=chat_client)
+medicine_recommendation_chatbot = Chatbot(project_id=PROJECT_ID, api_key=API_KEY, table_id="MedicineRecommendation", client=chat_client)
+user_guide_cache = TTLCache(max_size=USER_GUIDE_CACHE_SIZE, ttl=USER_GUIDE_CACHE_TTL)
+user_guide_chatbot = Chatbot(project_id=PROJECT_ID, api_key=API_KEY, table_id="UserGuide", cache=user_guide_cache, client=chat_client)
+chatbots = {
+    chatbot.table_id: chatbot
+    for chatbot in (emotional_support_chatbot, check_symptoms_chatbot, medicine_recommendation_chatbot, user_guide_chatbot)
+}
+photo_processor = PhotoProcessor(PROJECT_ID, API_KEY, client=action_client, file_client=file_client)
+document_processor = DocumentProcessor(PROJECT_ID, API_KEY, client=action_client)
+diet_plan_store = DietPlanStore(initialize_firebase, collection=DIET_PLAN_COLLECTION, freshness=DIET_PLAN_FRESHNESS_SECONDS)
+diet_processor = DietRecommendationProcessor(
+    PROJECT_ID, API_KEY, client=action_client, plan_store=diet_plan_store if DIET_PLAN_STORE else None
+)
+result_store = ResultStore(RESULT_STORE_PATH, max_bytes=RESULT_STORE_MAX_BYTES)
+
+# Runs a photo or document analysis on the given processors, returning the stored result for a
+# byte-identical re-upload. scope None (no user identity) always runs a fresh analysis and stores nothing.
+def analyze_upload_flow(photo, document, kind: str, data: bytes, filename: str, scope: Optional[str]):
+    digest = hashlib.sha256(data).hexdigest()
+    stored = (yield Call(result_store.get, scope, kind, digest)) if scope else None
+    if stored is not None:
+        print(f"Serving stored {kind} analysis for {digest[:12]}")
+        return stored
+    if kind == "photo":
+        result = yield from photo.photo_flow(data, filename)
+    else:
+        result = yield from document.document_flow(data, filename)
+    if result is not None and scope:
+        yield Call(result_store.put, scope, kind, digest, result)
+    return result
+
+def analyze_upload(kind: str, data: bytes, filename: str, scope: Optional[str]):
+    return run(analyze_upload_flow(photo_processor, document_processor, kind, data, filename, scope), REPORT_CHUNK_CONCURRENCY)
+
+# Stored results are only shared between uploads from the same user; None when the upload carries no identity.
+# form and headers of the current request (shared with asgi_app.py)
+def upload_scope(form, headers) -> Optional[str]:
+    email = form.get('email') or headers.get('X-User-Email')
+    return email.strip().lower() if email and email.strip() else None
+
+# Warmup hook: initializes selected components in a background thread so the first real
+# request does not pay for SDK imports, client creation or worker start-up
+def warm_jamai():
+    for pool in jamai_clients.pools.values():
+        pool.fill()
+
+def warm_firebase():
+    db = initialize_firebase()
+    if db is not None and PROFILE_CACHE_LISTENER:
+        profile_cache.watch(db.collection('users'))
+
+WARMUP_STEPS = {
+    "jamai": warm_jamai,
+    "firebase": warm_firebase,
+    "pdf": pdf_extract.warmup,
+    "images": image_prep.warmup,
+    "result_store": lambda: result_store.stats(),
+}
+warmup_status = {}
+
+def run_warmup(components):
+    for name in components:
+        step = WARMUP_STEPS.get(name)
+        if step is None:
+            warmup_status[name] = "unknown component"
+            continue
+        warmup_status[name] = "running"
+        try:
+            step()
+            warmup_status[name] = "done"
+        except Exception as e:
+            print(f"Warmup of {name} failed: {str(e)}")
+            warmup_status[name] = f"failed: {str(e)}"
+
+def start_warmup(components):
+    for name in components:
+        warmup_status[name] = "pending"
+    thread = threading.Thread(target=run_warmup, args=(list(components),), name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+# Email of the signed-in Firebase user whose ID token is in the Authorization header ("Bearer <token>").
+# None without a valid token: client-supplied emails are never trusted for access to a user's data.
+def verified_email(headers) -> Optional[str]:
+    authorization = headers.get('Authorization', '')
+    if not authorization.startswith('Bearer '):
+        return None
+    if initialize_firebase() is None:
+        return None
+    try:
+        with metrics.stage("firebase_verify_token"):
+            claims = firebase_auth.verify_id_token(authorization[len('Bearer '):].strip())
+    except Exception as e:
+        print(f"Rejected Firebase ID token: {str(e)}")
+        return None
+    email = claims.get('email')
+    return email.strip().lower() if email else None
+
+# Conversation for a chat request: the signed-in user (see verified_email()) plus an optional thread_id
+# for parallel conversations. Without a verified user, only a client-generated thread_id keys the conversation.
+# None (no identity, or conversations disabled) uses the shared table.
+def conversation_key(data, headers) -> Optional[str]:
+    if not CHAT_CONVERSATIONS:
+        return None
+    email = verified_email(headers)
+    thread_id = data.get('thread_id')
+    if not email and not thread_id:
+        return None
+    return f"{email or 'anonymous'}/{thread_id or 'default'}"
@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The app's SQLite stores go to a throwaway directory, so test runs never share conversations or results
+_store_dir = tempfile.mkdtemp(prefix="vcare-tests-")
+os.environ.setdefault("CHAT_CONVERSATION_STORE_PATH", os.path.join(_store_dir, "chat_conversations.db"))
+os.environ.setdefault("RESULT_STORE_PATH", os.path.join(_store_dir, "analysis_results.db"))
@@ -0,0 +1,159 @@
+import asyncio
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+
+from jamaibase import protocol as p
+from jamaibase.exceptions import ResourceNotFoundError
+
+import asgi_app
+import services
+
+
+def rows_response(column: str, text: str) -> p.GenTableRowsChatCompletionChunks:
+    cell = p.ChatCompletionChunk(
+        id="chatcmpl-test",
+        created=0,
+        model="test-model",
+        usage=None,
+        choices=[p.ChatCompletionChoice(message=p.ChatEntry.assistant(text), index=0, finish_reason="stop")],
+    )
+    return p.GenTableRowsChatCompletionChunks(rows=[p.GenTableChatCompletionChunks(row_id="row-0", columns={column: cell})])
+
+
+def table_meta(table_id: str, prompt: str) -> p.TableMetaResponse:
+    return p.TableMetaResponse(
+        id=table_id,
+        cols=[
+            p.ColumnSchema(id="Information", dtype="str"),
+            p.ColumnSchema(id="Analysis", dtype="str", gen_config=p.LLMGenConfig(model="test-model", prompt=prompt)),
+        ],
+        parent_id=None,
+        title="",
+        updated_at="",
+        indexed_at_fts=None,
+        indexed_at_vec=None,
+        indexed_at_sca=None,
+        num_rows=0,
+    )
+
+
+class FakeAsyncTable:
+    def __init__(self, column: str, tables=("Report", services.REPORT_MERGE_TABLE_ID)):
+        self.column = column
+        self.tables = set(tables)
+        self.duplicates = []
+        self.gen_configs = []
+        self.table_ids = []
+
+    async def get_table(self, table_type, table_id):
+        if table_id not in self.tables:
+            raise ResourceNotFoundError(f"Table {table_id} not found")
+        return table_meta(table_id, "Analyse this report: ${Information}")
+
+    async def update_gen_config(self, table_type, request):
+        self.gen_configs.append(request)
+
+    async def duplicate_table(self, table_type, table_id_src, table_id_dst=None, include_data=True, create_as_child=False):
+        self.duplicates.append((table_id_dst, include_data, create_as_child))
+        self.tables.add(table_id_dst)
+
+    async def add_table_rows(self, table_type, request):
+        self.table_ids.append(request.table_id)
+        return rows_response(self.column, f"answer {len(self.table_ids)}")
+
+
+def test_conversation_turns_go_to_one_empty_table(monkeypatch):
+    chatbot = asgi_app.check_symptoms_chatbot
+    table = FakeAsyncTable("AI")
+    monkeypatch.setattr(chatbot, "client", SimpleNamespace(table=table))
+
+    async def two_turns():
+        await chatbot.chat("I have a headache", "a@example.com/default")
+        return await chatbot.chat("It started today", "a@example.com/default")
+
+    assert asyncio.run(two_turns()) == "answer 2"
+    [(table_id, include_data, create_as_child)] = table.duplicates
+    assert not include_data and not create_as_child
+    assert table.table_ids == [table_id, table_id]
+
+
+def test_long_report_is_mapped_and_merged(monkeypatch):
+    table = FakeAsyncTable("Analysis")
+    monkeypatch.setattr(asgi_app.document_processor, "client", SimpleNamespace(table=table))
+    result = asyncio.run(asgi_app.document_processor.analyze_chunked(long_report_pages()))
+
+    assert result["result"]
+    assert table.table_ids.count("Report") > 1
+    assert table.table_ids[-1] == services.REPORT_MERGE_TABLE_ID
+
+
+def long_report_pages():
+    section = "Finding: " + "normal value " * 300
+    return ["\n\n".join([section] * 4)] * 3
+
+
+def test_missing_merge_table_is_created_from_report():
+    table = FakeAsyncTable("Analysis", tables=("Report",))
+    processor = asgi_app.AsyncDocumentProcessor("project", "token")
+    processor.client = SimpleNamespace(table=table)
+
+    assert asyncio.run(processor.analyze_chunked(long_report_pages()))["result"]
+    [(table_id, include_data, _)] = table.duplicates
+    assert table_id == services.REPORT_MERGE_TABLE_ID and not include_data
+    [update] = table.gen_configs
+    assert update.column_map["Analysis"].prompt == services.REPORT_MERGE_PROMPT
+    assert update.column_map["Analysis"].model == "test-model"
+    assert table.table_ids[-1] == services.REPORT_MERGE_TABLE_ID
+
+
+def test_partial_analyses_are_returned_when_the_merge_table_cannot_be_created():
+    table = FakeAsyncTable("Analysis", tables=())
+    processor = asgi_app.AsyncDocumentProcessor("project", "token")
+    processor.client = SimpleNamespace(table=table)
+
+    result = asyncio.run(processor.analyze_chunked(long_report_pages()))
+    assert result["result"].startswith("Partial analysis 1 of")
+    assert services.REPORT_MERGE_TABLE_ID not in table.table_ids
+
+
+class FakeSyncTable:
+    def __init__(self, column: str):
+        self.column = column
+        self.duplicates = []
+        self.table_ids = []
+
+    def duplicate_table(self, table_type, table_id_src, table_id_dst=None, include_data=True, create_as_child=False):
+        self.duplicates.append((table_id_dst, include_data, create_as_child))
+
+    def add_table_rows(self, table_type, request):
+        self.table_ids.append(request.table_id)
+        return rows_response(self.column, f"answer {len(self.table_ids)}")
+
+
+def test_sync_and_async_chatbots_share_the_conversation_flow(monkeypatch):
+    sync_table, async_table = FakeSyncTable("AI"), FakeAsyncTable("AI")
+    monkeypatch.setattr(services.medicine_recommendation_chatbot, "client", SimpleNamespace(table=sync_table))
+    monkeypatch.setattr(asgi_app.medicine_recommendation_chatbot, "client", SimpleNamespace(table=async_table))
+
+    assert services.medicine_recommendation_chatbot.chat("Can I take ibuprofen?", "b@example.com/sync") == "answer 1"
+    assert asyncio.run(asgi_app.medicine_recommendation_chatbot.chat("Can I take ibuprofen?", "b@example.com/async")) == "answer 1"
+    assert len(sync_table.duplicates) == len(async_table.duplicates) == 1
+
+
+def test_metrics_route():
+    async def scrape():
+        client = asgi_app.app.test_client()
+        await client.get('/api/health')
+        return await client.get('/metrics')
+
+    response = asyncio.run(scrape())
+    assert response.status_code == 200
+    assert 'route="/api/health"' in asyncio.run(response.get_data(as_text=True))
+
+
+# The Flask app, its job queue and vitals buffer (with their threads and exit hooks) stay out of the ASGI process
+def test_importing_the_async_app_leaves_out_the_sync_app():
+    code = "import sys, asgi_app; assert not {'merge2', 'jobs', 'vitals'} & set(sys.modules)"
+    subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), check=True)
@@ -0,0 +1,116 @@
+import time
+from types import SimpleNamespace
+
+import services
+from cache import TTLCache
+from conversations import ConversationStore
+
+
+class RecordingDeletes:
+    def __init__(self):
+        self.table_ids = []
+
+    def __call__(self, table_id):
+        self.table_ids.append(table_id)
+
+    def wait(self, count):
+        deadline = time.monotonic() + 5
+        while len(self.table_ids) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.table_ids
+
+
+def test_cache_reports_lru_and_expired_evictions():
+    evicted = []
+    cache = TTLCache(max_size=1, ttl=60, on_evict=lambda key, value: evicted.append(key))
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3, ttl=0)
+    assert cache.sweep() == 1
+    assert evicted == ["a", "b", "c"]
+    assert cache.pop("missing") is None
+
+
+def test_rollover_deletes_the_previous_table():
+    deletes = RecordingDeletes()
+    store = ConversationStore(max_turns=1, delete_table=deletes)
+    with store.turn("CheckSymptoms", "a@example.com") as conversation:
+        store.started(conversation, "t1")
+        conversation.record("hi", "hello")
+        assert store.needs_table(conversation)
+        store.started(conversation, "t2")
+    assert deletes.wait(1) == ["t1"]
+    assert store.stats()["rollovers"] == 1
+
+
+def test_reset_retires_the_conversation_table():
+    deletes = RecordingDeletes()
+    store = ConversationStore(delete_table=deletes)
+    with store.turn("CheckSymptoms", "a@example.com") as first:
+        store.started(first, "ta")
+    assert store.reset("CheckSymptoms", "a@example.com")
+    assert deletes.wait(1) == ["ta"]
+    assert first.retired
+    with store.turn("CheckSymptoms", "a@example.com") as fresh:
+        assert fresh is not first and fresh.table_id is None
+    assert not store.reset("CheckSymptoms", "b@example.com")
+
+
+def test_restarted_store_continues_the_conversation(tmp_path):
+    path = str(tmp_path / "conversations.db")
+    store = ConversationStore(path=path)
+    with store.turn("CheckSymptoms", "a@example.com") as conversation:
+        store.started(conversation, "ta")
+        store.record(conversation, "hi", "hello")
+
+    # A new process (or another worker) on the same records
+    restarted = ConversationStore(path=path)
+    with restarted.turn("CheckSymptoms", "a@example.com") as conversation:
+        assert conversation.table_id == "ta"
+        assert conversation.turns == 1
+        assert not restarted.needs_table(conversation)
+
+
+def test_second_worker_starting_the_same_conversation_uses_the_first_table(tmp_path):
+    path = str(tmp_path / "conversations.db")
+    deletes = RecordingDeletes()
+    first, second = ConversationStore(path=path), ConversationStore(path=path, delete_table=deletes)
+    with second.turn("CheckSymptoms", "a@example.com") as late:
+        # Both workers saw no table; the first one records its table first
+        with first.turn("CheckSymptoms", "a@example.com") as early:
+            first.started(early, "t-first")
+        second.started(late, "t-second")
+        assert late.table_id == "t-first"
+    assert deletes.wait(1) == ["t-second"]
+
+
+def test_idle_conversations_are_swept_in_every_worker(tmp_path):
+    deletes = RecordingDeletes()
+    store = ConversationStore(ttl=0, delete_table=deletes, path=str(tmp_path / "conversations.db"))
+    with store.turn("CheckSymptoms", "a@example.com") as conversation:
+        store.started(conversation, "ta")
+    time.sleep(0.01)
+    assert store.sweep() == 1
+    assert deletes.table_ids == ["ta"]
+    assert store.records.count() == 0
+
+
+def test_conversation_key_comes_from_a_verified_id_token(monkeypatch):
+    def verify_id_token(token):
+        if token != "valid-token":
+            raise ValueError("invalid token")
+        return {"email": "A@Example.com"}
+
+    monkeypatch.setattr(services, "initialize_firebase", lambda: object())
+    monkeypatch.setattr(services, "firebase_auth", SimpleNamespace(verify_id_token=verify_id_token))
+    # A claimed email alone selects nobody's conversation
+    assert services.conversation_key({"email": "a@example.com"}, {}) is None
+    assert services.conversation_key({"email": "a@example.com"}, {"Authorization": "Bearer forged"}) is None
+    assert services.conversation_key({}, {"Authorization": "Bearer valid-token"}) == "a@example.com/default"
+    assert services.conversation_key({"thread_id": "t1"}, {}) == "anonymous/t1"
+
+
+def test_table_copies_are_timed_apart_from_row_adds():
+    table = services.chat_client.table
+    assert services.jamai_stage("CheckSymptoms", table.duplicate_table) == "jamai_duplicate_table"
+    assert services.jamai_stage("CheckSymptoms", table.add_table_rows) == "jamai_add_table_rows"
@@ -0,0 +1,69 @@
+from jamaibase import protocol as p
+
+from cache import TTLCache
+from services import diet_processor
+
+
+def completion(text: str) -> p.ChatCompletionChunk:
+    return p.ChatCompletionChunk(
+        id="chatcmpl-test",
+        created=0,
+        model="test-model",
+        usage=None,
+        choices=[p.ChatCompletionChoice(message=p.ChatEntry.assistant(text), index=0, finish_reason="stop")],
+    )
+
+
+def rows_response(**columns) -> p.GenTableRowsChatCompletionChunks:
+    return p.GenTableRowsChatCompletionChunks(
+        rows=[p.GenTableChatCompletionChunks(
+            row_id="row-0",
+            columns={name: completion(text) for name, text in columns.items()},
+        )]
+    )
+
+
+BREAKFAST = "### Breakfast Meal Plan\n1. Oatmeal with chia seeds\n- Carbs:40g Protein:10g Fat:6g Fiber:8g\nCalories:310 kcal"
+DINNER = (
+    "### Dinner Meal Plan\n1. Baked salmon with broccoli\n- Carbs:20g Protein:32g Fat:18g Fiber:6g\n"
+    "Calories:450 kcal\nEnjoy your meal!"
+)
+
+
+def test_parse_row_reads_cell_text():
+    response = rows_response(Breakfast=BREAKFAST, Lunch="", Dinner=DINNER)
+    plans = diet_processor.parse_row(response.rows[0])
+    assert plans == {
+        "Breakfast": "1. Oatmeal with chia seeds\n- Carbs: 40g Protein: 10g Fat: 6g Fiber: 8g\nTotal Calories: 310 kcal",
+        "Lunch": "Not available",
+        "Dinner": "1. Baked salmon with broccoli\n- Carbs: 20g Protein: 32g Fat: 18g Fiber: 6g\nTotal Calories: 450 kcal",
+    }
+
+
+def test_missing_or_empty_meal_is_not_available():
+    response = rows_response(Breakfast=BREAKFAST, Lunch="")
+    plans = diet_processor.parse_response(response)
+    assert plans["Lunch"] == "Not available"
+    assert plans["Dinner"] == "Not available"
+
+
+class FakePlanStore:
+    def __init__(self):
+        self.plans = {}
+
+    def put(self, key, plan):
+        self.plans[key] = plan
+
+
+def test_only_complete_plans_are_stored(monkeypatch):
+    store = FakePlanStore()
+    monkeypatch.setattr(diet_processor, "plan_store", store)
+    monkeypatch.setattr(diet_processor, "plan_cache", TTLCache(max_size=10, ttl=60))
+    complete = {"Breakfast": "1. Oatmeal", "Lunch": "1. Chicken salad", "Dinner": "1. Salmon"}
+
+    diet_processor.store_plan("incomplete", dict(complete, Lunch="Not available"))
+    diet_processor.store_plan("empty", dict(complete, Dinner=""))
+    diet_processor.store_plan("complete", complete)
+
+    assert list(store.plans) == ["complete"]
+    assert diet_processor.plan_cache.get("incomplete") is None
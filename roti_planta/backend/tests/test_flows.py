@@ -0,0 +1,58 @@
+import asyncio
+
+from flows import Call, run, run_async
+
+
+def double(value):
+    return value * 2
+
+
+async def double_async(value):
+    return value * 2
+
+
+def fail():
+    raise ValueError("step failed")
+
+
+def sample_flow(step):
+    first = yield Call(step, 1)
+    rest = yield [Call(step, value) for value in (2, 3)]
+    try:
+        yield Call(fail)
+    except ValueError as e:
+        return [first, *rest, str(e)]
+
+
+def test_sync_and_async_drivers_run_the_same_flow():
+    expected = [2, 4, 6, "step failed"]
+    assert run(sample_flow(double)) == expected
+    assert asyncio.run(run_async(sample_flow(double_async))) == expected
+    # Plain functions run in a thread under the async driver
+    assert asyncio.run(run_async(sample_flow(double))) == expected
+
+
+def test_failed_and_cancelled_flows_run_their_cleanup():
+    released = []
+
+    def cleanup_flow(step):
+        try:
+            yield step
+        finally:
+            released.append(True)
+
+    async def cancel_while_waiting():
+        task = asyncio.ensure_future(run_async(cleanup_flow(Call(asyncio.sleep, 10))))
+        await asyncio.sleep(0)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    try:
+        run(cleanup_flow(Call(fail)))
+    except ValueError:
+        pass
+    asyncio.run(cancel_while_waiting())
+    assert released == [True, True]
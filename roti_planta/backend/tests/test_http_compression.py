@@ -0,0 +1,64 @@
+import gzip
+import json
+
+from flask import Flask, jsonify, request
+
+import http_compression
+
+REPORT = {"analysis": "Cholesterol within range. " * 60}
+
+
+def build_app():
+    app = Flask(__name__)
+
+    @app.route("/report")
+    def report():
+        return jsonify(REPORT)
+
+    @app.route("/short")
+    def short():
+        return jsonify({"ok": True})
+
+    @app.after_request
+    def finalize(response):
+        return http_compression.finalize_response(request, response, conditional=request.method == "GET")
+
+    return app
+
+
+def test_gzip_is_negotiated_and_keeps_the_etag(monkeypatch):
+    monkeypatch.setattr(http_compression, "BROTLI_AVAILABLE", False)
+    client = build_app().test_client()
+
+    plain = client.get("/report")
+    zipped = client.get("/report", headers={"Accept-Encoding": "gzip, br;q=0.5"})
+
+    assert "Content-Encoding" not in plain.headers
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in zipped.headers["Vary"]
+    assert json.loads(gzip.decompress(zipped.get_data())) == REPORT
+    assert zipped.headers["ETag"] == plain.headers["ETag"]
+    assert zipped.headers["ETag"].startswith('W/"')
+
+
+def test_small_and_refused_bodies_are_sent_uncompressed(monkeypatch):
+    monkeypatch.setattr(http_compression, "BROTLI_AVAILABLE", False)
+    client = build_app().test_client()
+
+    assert "Content-Encoding" not in client.get("/short", headers={"Accept-Encoding": "gzip"}).headers
+    assert "Content-Encoding" not in client.get("/report", headers={"Accept-Encoding": "gzip;q=0"}).headers
+
+
+def test_matching_if_none_match_returns_304():
+    client = build_app().test_client()
+    etag = client.get("/report").headers["ETag"]
+    before = http_compression.totals()["not_modified"]
+
+    cached = client.get("/report", headers={"If-None-Match": etag})
+    changed = client.get("/report", headers={"If-None-Match": 'W/"stale"'})
+
+    assert cached.status_code == 304
+    assert cached.get_data() == b""
+    assert cached.headers["ETag"] == etag
+    assert changed.status_code == 200
+    assert http_compression.totals()["not_modified"] == before + 1
@@ -0,0 +1,22 @@
+from types import SimpleNamespace
+
+from jamai_pool import ClientPool, PooledJamAI
+
+
+def test_pooled_clients_are_shared_round_robin():
+    pool = ClientPool("chat", object, size=2)
+    held = [pool.acquire() for _ in range(4)]
+    # Nothing is checked out exclusively: more callers than clients never wait
+    assert held[0] is held[2] and held[1] is held[3] and held[0] is not held[1]
+    assert pool.stats()["created"] == 2
+
+
+def test_streams_count_as_in_flight_until_consumed():
+    def stream():
+        yield "chunk"
+
+    pool = ClientPool("chat", lambda: SimpleNamespace(table=SimpleNamespace(stream=stream)), size=1)
+    chunks = PooledJamAI(pool).table.stream()
+    assert pool.stats()["in_flight"] == 1
+    assert list(chunks) == ["chunk"]
+    assert pool.stats()["in_flight"] == 0
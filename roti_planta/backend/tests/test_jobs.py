@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+from jobs import JobQueue, QueueFullError
+
+
+def test_job_status_moves_from_queued_to_done_or_failed():
+    jobs = JobQueue(workers=1)
+    release = threading.Event()
+    blocker = jobs.submit("document", release.wait)
+    queued = jobs.submit("document", lambda value: {"summary": value}, "ok")
+    failed = jobs.submit("photo", lambda: None)
+    raised = jobs.submit("photo", lambda: 1 / 0)
+
+    assert jobs.get(queued.id).to_dict()["status"] == "queued"
+    release.set()
+    for job in (blocker, queued, failed, raised):
+        assert jobs.wait(job.id, timeout=5).done.is_set()
+
+    assert queued.to_dict()["result"] == {"summary": "ok"}
+    assert queued.args == ()
+    assert failed.to_dict()["error"] == "Failed to process the photo"
+    assert "division by zero" in raised.to_dict()["error"]
+    assert "result" not in raised.to_dict()
+    metrics = jobs.metrics()
+    assert (metrics["completed"], metrics["failed"]) == (2, 2)
+
+
+def test_wait_returns_after_timeout_for_a_running_job():
+    jobs = JobQueue(workers=1)
+    release = threading.Event()
+    job = jobs.submit("document", release.wait)
+
+    assert jobs.wait(job.id, timeout=0.05).status in ("queued", "running")
+    assert jobs.wait("missing", timeout=0.05) is None
+    release.set()
+    assert jobs.wait(job.id, timeout=5).status == "done"
+
+
+def test_finished_jobs_expire_after_retention():
+    jobs = JobQueue(workers=1, retention=60)
+    job = jobs.submit("document", lambda: "report")
+    jobs.wait(job.id, timeout=5)
+
+    job.finished_at -= 61
+    jobs.submit("document", lambda: "next")
+    assert jobs.get(job.id) is None
+
+
+def test_full_queue_rejects_new_jobs():
+    jobs = JobQueue(workers=1, max_queue=1)
+    release = threading.Event()
+    running = jobs.submit("document", release.wait)
+    while running.status == "queued":
+        running.done.wait(0.01)
+    jobs.submit("document", release.wait)
+
+    with pytest.raises(QueueFullError):
+        jobs.submit("document", release.wait)
+    assert jobs.metrics()["rejected"] == 1
+    release.set()
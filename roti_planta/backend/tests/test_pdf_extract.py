@@ -0,0 +1,39 @@
+import threading
+import time
+
+import pytest
+
+from pdf_extract import PDF_START_METHOD, WorkerPool
+
+
+def test_timeout_kills_only_the_late_requests_worker():
+    pool = WorkerPool(2, PDF_START_METHOD)
+    pool.map(int, [(), ()], time.monotonic() + 30)
+    results = {}
+
+    def slow_request():
+        try:
+            pool.map(time.sleep, [(30,)], time.monotonic() + 1)
+        except TimeoutError as e:
+            results["slow"] = e
+
+    def other_request():
+        results["other"] = pool.map(time.sleep, [(2,)], time.monotonic() + 30)
+
+    threads = [threading.Thread(target=slow_request), threading.Thread(target=other_request)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert isinstance(results["slow"], TimeoutError)
+    assert results["other"] == [None]
+    assert pool.killed == 1
+
+
+def test_task_errors_keep_the_worker():
+    pool = WorkerPool(1, PDF_START_METHOD)
+    with pytest.raises(ValueError):
+        pool.map(int, [("not a number",)], time.monotonic() + 30)
+    assert pool.map(int, [("7",), ("8",)], time.monotonic() + 30) == [7, 8]
+    assert pool.killed == 0
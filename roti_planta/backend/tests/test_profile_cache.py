@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+
+from profile_cache import ProfileCache
+
+PROFILES = {
+    "doc-a": {"email": "a@example.com", "age": 34, "weight": 60, "foodAllergies": ["Peanuts"]},
+    "doc-b": {"email": "b@example.com", "age": 51, "weight": 82, "foodAllergies": []},
+}
+
+
+class FakeUsers:
+    def __init__(self):
+        self.loads = []
+        self.listener = None
+
+    def load(self, email, fields=None):
+        self.loads.append((email, fields))
+        for doc_id, profile in PROFILES.items():
+            if profile["email"] == email:
+                return doc_id, {field: value for field, value in profile.items() if fields is None or field in fields}
+        return None
+
+    def load_many(self, emails, fields=None):
+        return {email: self.load(email, fields) for email in emails if self.load(email, fields)}
+
+    def on_snapshot(self, callback):
+        self.listener = callback
+        return SimpleNamespace(unsubscribe=lambda: None)
+
+    def change(self, kind, doc_id):
+        change = SimpleNamespace(type=SimpleNamespace(name=kind), document=SimpleNamespace(id=doc_id))
+        self.listener(None, [change], None)
+
+
+def test_projection_reads_only_the_requested_fields():
+    users = FakeUsers()
+    cache = ProfileCache(users.load)
+
+    assert cache.get("a@example.com", ["age"]) == {"age": 34, "email": "a@example.com"}
+    assert users.loads == [("a@example.com", ["age", "email"])]
+    # Cached per projection; another projection is another read
+    assert cache.get("a@example.com", ["age"]) == {"age": 34, "email": "a@example.com"}
+    assert cache.get("a@example.com", ["weight"]) == {"email": "a@example.com", "weight": 60}
+    assert len(users.loads) == 2
+
+
+def test_full_profile_serves_any_projection():
+    users = FakeUsers()
+    cache = ProfileCache(users.load)
+
+    assert cache.get("b@example.com") == PROFILES["doc-b"]
+    assert cache.get("b@example.com", ["weight", "foodAllergies"]) == {"email": "b@example.com", "foodAllergies": [], "weight": 82}
+    assert users.loads == [("b@example.com", None)]
+
+
+def test_snapshot_changes_invalidate_full_and_projected_profiles():
+    users = FakeUsers()
+    cache = ProfileCache(users.load)
+    cache.watch(users)
+    cache.get("a@example.com")
+    cache.get("a@example.com", ["age"])
+    cache.get("b@example.com")
+
+    # The initial snapshot lists every document as ADDED, which keeps the cache
+    users.change("ADDED", "doc-a")
+    assert cache.cached("a@example.com") is not None
+    users.change("MODIFIED", "doc-a")
+    assert cache.cached("a@example.com") is None
+    assert cache.cached("a@example.com", ["age"]) is None
+    assert cache.cached("b@example.com") is not None
+    users.change("REMOVED", "doc-b")
+    assert cache.cached("b@example.com") is None
+
+
+def test_get_many_loads_only_the_misses_in_one_call():
+    users = FakeUsers()
+    bulk_calls = []
+
+    def load_many(emails, fields=None):
+        bulk_calls.append(list(emails))
+        return users.load_many(emails, fields)
+
+    cache = ProfileCache(users.load, bulk_loader=load_many)
+    cache.get("a@example.com")
+    found = cache.get_many(["a@example.com", "b@example.com", "missing@example.com", "b@example.com"])
+
+    assert set(found) == {"a@example.com", "b@example.com"}
+    assert bulk_calls == [["b@example.com", "missing@example.com"]]
@@ -0,0 +1,99 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from jamaibase.exceptions import BadInputError, ServerBusyError
+
+from jamai_pool import ClientPool, PooledJamAI, bound
+from resilience import CircuitOpenError, DeadlineExceededError, TableGuard, is_retryable
+
+
+class RateLimitExceedError(RuntimeError):
+    pass
+
+
+def test_retryable_errors():
+    assert is_retryable(httpx.ConnectError("refused"))
+    assert is_retryable(ServerBusyError())
+    # jamaibase 1.x type, matched by name
+    assert is_retryable(RateLimitExceedError("slow down"))
+    # jamaibase 0.3 wraps every non-404 response in a RuntimeError with the server's message
+    assert is_retryable(RuntimeError("429 Too Many Requests"))
+    assert is_retryable(RuntimeError("Service Unavailable"))
+
+
+def test_non_retryable_errors():
+    assert not is_retryable(RuntimeError("Table 'Report' does not have column 'AI'"))
+    assert not is_retryable(BadInputError("bad input"))
+    assert not is_retryable(httpx.ReadTimeout("read"))
+    assert not is_retryable(KeyError("AI"))
+
+
+def failing(error):
+    def call():
+        raise error
+    return call
+
+
+def test_retries_retryable_errors_until_success():
+    guard = TableGuard(max_retries=2, base_delay=0, max_delay=0)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RuntimeError("503 Service Unavailable")
+        return "ok"
+
+    assert guard.call("Report", flaky) == "ok"
+    assert len(attempts) == 3
+
+
+def test_breaker_ignores_errors_from_a_healthy_table():
+    guard = TableGuard(max_retries=0, failure_threshold=2)
+    for _ in range(3):
+        with pytest.raises(BadInputError):
+            guard.call("Report", failing(BadInputError("bad input")))
+    assert guard.breaker("Report").state == "closed"
+
+
+def test_breaker_opens_on_upstream_failures():
+    guard = TableGuard(max_retries=0, failure_threshold=2)
+    for _ in range(2):
+        with pytest.raises(httpx.ReadTimeout):
+            guard.call("Report", failing(httpx.ReadTimeout("read")))
+    with pytest.raises(CircuitOpenError):
+        guard.call("Report", lambda: "ok")
+
+
+def test_async_call_deadline_cancels_the_request():
+    guard = TableGuard(timeouts={"Report": 0.05}, max_retries=0)
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    with pytest.raises(DeadlineExceededError):
+        asyncio.run(guard.call_async("Report", slow))
+    assert cancelled
+
+
+def test_deadline_starts_after_the_pooled_client_is_created():
+    def slow_client():
+        time.sleep(0.1)
+        return SimpleNamespace(table=SimpleNamespace(add_table_rows=lambda: "ok"))
+
+    pool = ClientPool("action", slow_client, size=1)
+    guard = TableGuard(timeouts={"Report": 0.05}, max_retries=0)
+
+    # Creating the client (0.1s) takes longer than the table's deadline, but only the call itself is timed
+    with bound(PooledJamAI(pool).table.add_table_rows) as call:
+        assert guard.call("Report", call) == "ok"
+    assert guard.breaker("Report").stats()["consecutive_failures"] == 0
+
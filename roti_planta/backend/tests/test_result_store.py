@@ -0,0 +1,44 @@
+import itertools
+
+import result_store
+from result_store import ResultStore
+
+
+def fake_clock(monkeypatch):
+    ticks = itertools.count(1_760_000_000)
+    monkeypatch.setattr(result_store.time, "time", lambda: next(ticks))
+
+
+def test_least_recently_used_results_are_evicted(monkeypatch, tmp_path):
+    fake_clock(monkeypatch)
+    result = {"result": "x" * 80}
+    # Room for two results of about 95 bytes
+    store = ResultStore(str(tmp_path / "results.db"), max_bytes=200)
+    store.put("a@example.com", "photo", "first", result)
+    store.put("a@example.com", "photo", "second", result)
+    # Reading "first" makes "second" the least recently used
+    assert store.get("a@example.com", "photo", "first") == result
+    store.put("a@example.com", "photo", "third", result)
+
+    assert store.get("a@example.com", "photo", "second") is None
+    assert store.get("a@example.com", "photo", "first") == result
+    assert store.get("a@example.com", "photo", "third") == result
+    assert store.stats()["entries"] == 2
+    assert store.stats()["bytes"] <= 200
+
+
+def test_results_are_scoped_per_user_and_kind(tmp_path):
+    store = ResultStore(str(tmp_path / "results.db"))
+    store.put("a@example.com", "document", "digest", {"result": "a's report"})
+
+    assert store.get("b@example.com", "document", "digest") is None
+    assert store.get("a@example.com", "photo", "digest") is None
+    assert store.get("a@example.com", "document", "digest") == {"result": "a's report"}
+    store.put("b@example.com", "document", "digest", {"result": "b's report"})
+    assert store.get("a@example.com", "document", "digest") == {"result": "a's report"}
+
+
+def test_results_survive_a_restart(tmp_path):
+    path = str(tmp_path / "results.db")
+    ResultStore(path).put("a@example.com", "photo", "digest", {"result": "rash"})
+    assert ResultStore(path).get("a@example.com", "photo", "digest") == {"result": "rash"}
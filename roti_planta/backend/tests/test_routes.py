@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+import asgi_app
+import merge2
+import services
+
+
+@pytest.mark.parametrize("path", ["/api/user-guide", "/api/check-symptoms", "/api/user-guide/stream"])
+def test_non_string_message_is_rejected(path):
+    response = merge2.app.test_client().post(path, json={"message": 123})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "'message' must be a string"}
+
+
+def test_non_string_batch_message_is_rejected():
+    items = [{"table": "UserGuide", "message": "How do I log vitals?"}, {"table": "UserGuide", "message": ["hi"]}]
+    response = merge2.app.test_client().post("/api/chat/batch", json={"items": items})
+    assert response.status_code == 400
+    assert "item 1" in response.get_json()["error"]
+
+
+def test_async_app_rejects_non_string_message():
+    async def post():
+        return await asgi_app.app.test_client().post("/api/user-guide", json={"message": {"text": "hi"}})
+
+    assert asyncio.run(post()).status_code == 400
+
+
+def test_bulk_profiles_need_sign_in_and_caregiver_access(monkeypatch):
+    profiles = {
+        "carer@example.com": {"email": "carer@example.com", "patients": ["Patient@example.com"]},
+        "patient@example.com": {"email": "patient@example.com", "age": 70},
+        "other@example.com": {"email": "other@example.com", "age": 40},
+    }
+    monkeypatch.setattr(merge2, "verified_email", lambda headers: "carer@example.com" if headers.get("Authorization") else None)
+    monkeypatch.setattr(services, "get_user_data", lambda email, fields=None: profiles.get(email))
+    monkeypatch.setattr(merge2, "get_users_data", lambda emails, fields=None: {email: profiles[email] for email in emails if email in profiles})
+    client = merge2.app.test_client()
+    signed_in = {"Authorization": "Bearer token"}
+
+    assert client.post("/api/get-users-data", json={"emails": ["patient@example.com"]}).status_code == 401
+    denied = client.post("/api/get-users-data", json={"emails": ["patient@example.com", "other@example.com"]}, headers=signed_in)
+    assert denied.status_code == 403
+    assert denied.get_json()["denied"] == ["other@example.com"]
+    response = client.post("/api/get-users-data", json={"emails": ["patient@example.com", "carer@example.com"]}, headers=signed_in)
+    assert response.status_code == 200
+    assert set(response.get_json()["users"]) == {"patient@example.com", "carer@example.com"}
@@ -0,0 +1,47 @@
+import threading
+from types import SimpleNamespace
+
+from uploads import upload_file_bytes
+
+
+class RecordingFileClient:
+    def __init__(self):
+        self.paths = []
+        self.lock = threading.Lock()
+
+    def upload_file(self, file_path):
+        with open(file_path, "rb") as f:
+            data = f.read()
+        with self.lock:
+            self.paths.append(file_path)
+        return SimpleNamespace(uri=f"s3://test/{data.decode()}")
+
+
+def test_upload_goes_through_public_upload_file_with_original_name():
+    file_client = RecordingFileClient()
+    response = upload_file_bytes(SimpleNamespace(file=file_client), b"photo", "meal.png")
+    assert response.uri == "s3://test/photo"
+    assert file_client.paths[0].endswith("/meal.png")
+
+
+def test_client_filename_cannot_escape_the_temp_directory():
+    file_client = RecordingFileClient()
+    upload_file_bytes(SimpleNamespace(file=file_client), b"x", "../../etc/meal.png")
+    assert "/etc/" not in file_client.paths[0]
+    assert file_client.paths[0].endswith("/meal.png")
+
+
+def test_concurrent_uploads_of_the_same_name_do_not_collide():
+    file_client = RecordingFileClient()
+    results = {}
+
+    def upload(index):
+        results[index] = upload_file_bytes(SimpleNamespace(file=file_client), str(index).encode(), "same.png").uri
+
+    threads = [threading.Thread(target=upload, args=(index,)) for index in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {index: f"s3://test/{index}" for index in range(20)}
+    assert len(set(file_client.paths)) == 20
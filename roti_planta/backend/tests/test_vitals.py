@@ -0,0 +1,102 @@
+import pytest
+
+import vitals
+from vitals import VitalsBuffer, VitalsBufferFullError
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db = db
+        self.writes = []
+
+    def set(self, reference, data):
+        self.writes.append((reference, data))
+
+    def commit(self):
+        self.db.commits += 1
+        if self.db.commits in self.db.failing_commits:
+            raise RuntimeError("commit failed")
+        self.db.documents.update(self.writes)
+        if self.db.commits in self.db.landed_failing_commits:
+            raise RuntimeError("commit landed, then the response was lost")
+
+
+class FakeCollection:
+    def document(self, doc_id=None):
+        assert doc_id, "vitals documents need deterministic ids"
+        return doc_id
+
+
+class FakeFirestore:
+    def __init__(self, failing_commits=(), landed_failing_commits=()):
+        self.documents = {}
+        self.commits = 0
+        self.failing_commits = set(failing_commits)
+        self.landed_failing_commits = set(landed_failing_commits)
+
+    def collection(self, name):
+        return FakeCollection()
+
+    def batch(self):
+        return FakeBatch(self)
+
+
+def samples(count, start=1_760_000_000):
+    return [{"timestamp": start + second, "heartRate": 70} for second in range(count)]
+
+
+def test_failed_batch_requeues_only_its_documents(monkeypatch):
+    monkeypatch.setattr(vitals, "BATCH_WRITE_LIMIT", 2)
+    db = FakeFirestore(failing_commits={2})
+    buffer = VitalsBuffer(lambda: db, max_samples_per_document=10)
+    # 4 documents for one user: the first batch lands, the second fails
+    buffer.ingest("a@example.com", samples(40))
+    assert buffer.flush() == 0
+    assert len(db.documents) == 2
+    assert buffer.stats()["buffered_samples"] == 20
+
+    assert buffer.flush() == 20
+    assert len(db.documents) == 4
+    assert sum(document["count"] for document in db.documents.values()) == 40
+
+
+def test_same_samples_get_the_same_document_ids():
+    first, second = FakeFirestore(), FakeFirestore()
+    for db in (first, second):
+        buffer = VitalsBuffer(lambda: db)
+        buffer.ingest("a/b@example.com", samples(3))
+        buffer.flush()
+    assert list(first.documents) == list(second.documents)
+    assert "/" not in next(iter(first.documents))
+
+
+def test_commit_that_landed_is_not_duplicated_by_its_retry(monkeypatch):
+    monkeypatch.setattr(vitals, "BATCH_WRITE_LIMIT", 2)
+    db = FakeFirestore(landed_failing_commits={2})
+    buffer = VitalsBuffer(lambda: db, max_samples_per_document=10)
+    # The second batch lands, then its commit raises
+    buffer.ingest("a@example.com", samples(40))
+    assert buffer.flush() == 0
+    # New samples arrive before the retry; the requeued documents keep their ids
+    buffer.ingest("a@example.com", samples(5, start=1_760_000_100))
+
+    assert buffer.flush() == 25
+    assert len(db.documents) == 5
+    assert sum(document["count"] for document in db.documents.values()) == 45
+
+
+def test_chunks_sharing_a_first_timestamp_get_their_own_documents():
+    db = FakeFirestore()
+    buffer = VitalsBuffer(lambda: db)
+    buffer.ingest("a@example.com", samples(3))
+    buffer.flush()
+    buffer.ingest("a@example.com", samples(5))
+    buffer.flush()
+    assert len(db.documents) == 2
+
+
+def test_full_buffer_rejects_every_batch():
+    buffer = VitalsBuffer(lambda: FakeFirestore(), max_buffered=5)
+    with pytest.raises(VitalsBufferFullError):
+        buffer.ingest_many([("a@example.com", samples(3)), ("b@example.com", samples(3))])
+    assert buffer.stats()["buffered_samples"] == 0
@@ -0,0 +1,62 @@
+# Post-processing for LLM output from the JamAI tables, shared by every processor in merge2.py.
+# Each cleaner returns exactly what the previous per-class implementation returned.
+
+_MEAL_PLAN_HEADINGS = (
+    "Breakfast Meal Plan",
+    "Lunch Meal Plan",
+    "Dinner Meal Plan",
+    "Fiber-Rich, Low-GI Foods and Lean Proteins",
+)
+# Lines kept in a meal plan. "Calories:" is rewritten to "Total Calories: ", so it is kept as well.
+_MEAL_PLAN_LINE_PREFIXES = ("1.", "2.", "3.", "-", "Total ", "Calories:")
+# Label fixes applied to the kept lines; none of them spans a newline, so they run over the joined text
+_NUTRIENT_LABELS = (
+    ("Carbs:", "Carbs: "),
+    ("Protein:", "Protein: "),
+    ("Fat:", "Fat: "),
+    ("Fiber:", "Fiber: "),
+    ("Calories:", "Total Calories: "),
+)
+
+
+def clean_chat_text(text: str) -> str:
+    # Only drops characters, so it can be applied to streamed chunks one at a time
+    return text.replace("*", "")
+
+
+def clean_report_text(text: str) -> str:
+    return text.replace("---", "")
+
+
+def clean_photo_text(text: str) -> str:
+    formatted_lines = []
+    append = formatted_lines.append
+    in_interpretation = False
+    for line in text.replace("---", "").split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+        if "What Happened in the Image" in line and not line.endswith(":"):
+            line = "What Happened in the Image:"
+        elif "Interpretation" in line and not line.endswith(":"):
+            line = "Interpretation:"
+            in_interpretation = True
+        if in_interpretation and line.startswith("-"):
+            line = line.replace("- ", "• ")
+        append(line)
+    return "\n\n".join(formatted_lines)
+
+
+def clean_meal_plan(meal_plan: str) -> str:
+    if meal_plan == "Not available":
+        return meal_plan
+    cleaned = meal_plan.replace("#", "")
+    for heading in _MEAL_PLAN_HEADINGS:
+        if heading in cleaned:
+            cleaned = cleaned.replace(heading, "")
+    # Filter the stripped lines first, then fix the nutrient labels once over what is kept
+    kept = "\n".join([line for line in map(str.strip, cleaned.split("\n")) if line.startswith(_MEAL_PLAN_LINE_PREFIXES)])
+    for label, replacement in _NUTRIENT_LABELS:
+        if label in kept:
+            kept = kept.replace(label, replacement)
+    return kept
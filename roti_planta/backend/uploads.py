@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from lazy_imports import LazyModule
+
+p = LazyModule("jamaibase.protocol")
+
+
+# Uploads in-memory bytes through the SDK's public upload_file, which only takes a path.
+# Each upload gets its own private temp directory, so concurrent uploads of the same filename
+# never overwrite each other, and the SDK keeps its own route, MIME detection and upload timeout.
+
+
+def _write_temp_file(tmp_dir: str, data: bytes, filename: str) -> str:
+    # Only the base name is kept, the client-supplied name never chooses the directory
+    path = os.path.join(tmp_dir, os.path.basename(filename) or "upload")
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def upload_file_bytes(client, data: bytes, filename: str) -> p.FileUploadResponse:
+    with tempfile.TemporaryDirectory(prefix="vcare-upload-") as tmp_dir:
+        return client.file.upload_file(_write_temp_file(tmp_dir, data, filename))
+
+
+async def upload_file_bytes_async(client, data: bytes, filename: str) -> p.FileUploadResponse:
+    with tempfile.TemporaryDirectory(prefix="vcare-upload-") as tmp_dir:
+        return await client.file.upload_file(_write_temp_file(tmp_dir, data, filename))
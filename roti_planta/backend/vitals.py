@@ -0,0 +1,260 @@
+import hashlib
+import math
+import threading
+import time
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import metrics
+
+# Metrics a sample may carry; a missing value is stored as NaN in memory and null in Firestore
+VITAL_METRICS = ("heartRate", "steps", "spo2")
+
+# Firestore allows at most 500 writes per batch
+BATCH_WRITE_LIMIT = 500
+
+
+class VitalsBufferFullError(Exception):
+    pass
+
+
+def parse_sample(sample):
+    timestamp = parse_timestamp(sample["timestamp"])
+    values = tuple(math.nan if sample.get(metric) is None else float(sample[metric]) for metric in VITAL_METRICS)
+    if all(math.isnan(value) for value in values):
+        raise ValueError("no vitals in sample")
+    return timestamp, values
+
+
+def parse_timestamp(value) -> float:
+    if isinstance(value, bool):
+        raise ValueError("invalid timestamp")
+    if isinstance(value, (int, float)):
+        # Epoch milliseconds from watches that report them
+        return value / 1000.0 if value > 1e12 else float(value)
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    raise ValueError("invalid timestamp")
+
+
+# Buffered samples of one user as parallel typed arrays: 8 bytes per timestamp and 4 per metric value,
+# instead of a dict per sample
+class VitalsColumns:
+    __slots__ = ("timestamps", "values")
+
+    def __init__(self):
+        self.timestamps = array("d")
+        self.values = {metric: array("f") for metric in VITAL_METRICS}
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    # values in VITAL_METRICS order
+    def append(self, timestamp: float, values):
+        self.timestamps.append(timestamp)
+        for column, value in zip(self.values.values(), values):
+            column.append(value)
+
+    def extend(self, other: "VitalsColumns"):
+        self.timestamps.extend(other.timestamps)
+        for metric, column in self.values.items():
+            column.extend(other.values[metric])
+
+    def drop_oldest(self, count: int):
+        del self.timestamps[:count]
+        for column in self.values.values():
+            del column[:count]
+
+    def slice(self, start: int, end: int) -> "VitalsColumns":
+        part = VitalsColumns()
+        part.timestamps = self.timestamps[start:end]
+        part.values = {metric: column[start:end] for metric, column in self.values.items()}
+        return part
+
+    # Consecutive slices of at most max_samples samples, one per Firestore document
+    def chunks(self, max_samples: int) -> List["VitalsColumns"]:
+        return [self.slice(start, start + max_samples) for start in range(0, len(self), max_samples)]
+
+    def document(self, email: str) -> Dict:
+        timestamps = self.timestamps.tolist()
+        document = {
+            "email": email,
+            "start": min(timestamps),
+            "end": max(timestamps),
+            "count": len(timestamps),
+            "timestamps": timestamps,
+        }
+        for metric, column in self.values.items():
+            document[metric] = [None if math.isnan(value) else value for value in column.tolist()]
+        return document
+
+
+# Derived from the chunk's contents, so a document retried after a commit that did land overwrites
+# itself instead of duplicating, and chunks that only share a first timestamp never collide.
+# Emails may contain '/', so they are hashed.
+def document_id(email: str, chunk: VitalsColumns) -> str:
+    email_digest = hashlib.sha256(email.encode("utf-8")).hexdigest()[:16]
+    content = hashlib.sha256(chunk.timestamps.tobytes())
+    for column in chunk.values.values():
+        content.update(column.tobytes())
+    return f"{email_digest}_{int(chunk.timestamps[0] * 1000)}_{content.hexdigest()[:16]}"
+
+
+# Write-behind buffer for wearable vitals: ingest() appends to per-user columns in memory and a
+# background thread flushes everything every flush_interval seconds as batched Firestore writes,
+# one document per user per flush (split at max_samples_per_document).
+# Documents a failed flush did not write are kept whole, with their ids, and retried on the next one,
+# so a commit that landed before raising is overwritten rather than written again under a new id.
+class VitalsBuffer:
+    def __init__(self, client_factory, collection: str = "vitals", flush_interval: float = 5.0,
+                 max_buffered: int = 1_000_000, max_samples_per_document: int = 5000):
+        self.client_factory = client_factory
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.max_samples_per_document = max_samples_per_document
+        self._columns: Dict[str, VitalsColumns] = {}
+        # (email, document id, samples) of documents a failed flush still has to write, oldest first
+        self._pending: List[tuple] = []
+        self._buffered = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.accepted = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.documents_written = 0
+        self.last_flush_ms = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="vitals-flush", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    # Validates and buffers one user's samples, returns (accepted, rejected)
+    def ingest(self, email: str, samples) -> tuple:
+        return self.ingest_many([(email, samples)])
+
+    # Buffers [(email, samples), ...] all or nothing: a full buffer rejects every batch,
+    # so a client retrying the request never re-sends samples that were already accepted
+    def ingest_many(self, batches) -> tuple:
+        parsed = []
+        rejected = 0
+        for email, samples in batches:
+            for sample in samples:
+                try:
+                    parsed.append((email, *parse_sample(sample)))
+                except (KeyError, TypeError, ValueError, AttributeError):
+                    rejected += 1
+        with self._lock:
+            if self._buffered + len(parsed) > self.max_buffered:
+                self.rejected += len(parsed) + rejected
+                raise VitalsBufferFullError("Vitals buffer is full, retry shortly")
+            for email, timestamp, values in parsed:
+                columns = self._columns.get(email)
+                if columns is None:
+                    columns = self._columns[email] = VitalsColumns()
+                columns.append(timestamp, values)
+            self._buffered += len(parsed)
+            self.accepted += len(parsed)
+            self.rejected += rejected
+        self.start()
+        return len(parsed), rejected
+
+    def _take(self) -> List[tuple]:
+        with self._lock:
+            columns, self._columns = self._columns, {}
+            pending, self._pending = self._pending, []
+            self._buffered = 0
+        # (email, document id, samples) per document
+        return pending + [
+            (email, document_id(email, chunk), chunk)
+            for email, user_columns in columns.items()
+            for chunk in user_columns.chunks(self.max_samples_per_document)
+        ]
+
+    def _requeue(self, documents: List[tuple]):
+        with self._lock:
+            self._pending = documents + self._pending
+            self._buffered += sum(len(chunk) for _, _, chunk in documents)
+            # Over the cap, the oldest unwritten documents go first, then the oldest samples of the largest buffers
+            while self._buffered > self.max_buffered and self._pending:
+                _, _, chunk = self._pending.pop(0)
+                self._buffered -= len(chunk)
+                self.dropped += len(chunk)
+            while self._buffered > self.max_buffered:
+                largest = max(self._columns.values(), key=len)
+                excess = min(len(largest), self._buffered - self.max_buffered)
+                largest.drop_oldest(excess)
+                self._buffered -= excess
+                self.dropped += excess
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            documents = self._take()
+            if not documents:
+                return 0
+            started = time.perf_counter()
+            written = 0
+            try:
+                db = self.client_factory()
+                if db is None:
+                    raise RuntimeError("Firestore client not available")
+                collection = db.collection(self.collection)
+                for start in range(0, len(documents), BATCH_WRITE_LIMIT):
+                    batch = db.batch()
+                    for email, doc_id, chunk in documents[start:start + BATCH_WRITE_LIMIT]:
+                        batch.set(collection.document(doc_id), chunk.document(email))
+                    with metrics.stage("firestore_vitals_flush"):
+                        batch.commit()
+                    written = min(start + BATCH_WRITE_LIMIT, len(documents))
+            except Exception as e:
+                print(f"Error flushing vitals: {str(e)}")
+                with self._lock:
+                    self.flush_errors += 1
+                    self.flushed += sum(len(chunk) for _, _, chunk in documents[:written])
+                    self.documents_written += written
+                # Batches commit independently, only the documents that were not written go back
+                self._requeue(documents[written:])
+                return 0
+            samples = sum(len(chunk) for _, _, chunk in documents)
+            with self._lock:
+                self.flushed += samples
+                self.flushes += 1
+                self.documents_written += len(documents)
+                self.last_flush_ms = (time.perf_counter() - started) * 1000
+            return samples
+
+    def stats(self):
+        with self._lock:
+            return {
+                "collection": self.collection,
+                "flush_interval_seconds": self.flush_interval,
+                "buffered_samples": self._buffered,
+                "buffered_users": len(self._columns),
+                "pending_documents": len(self._pending),
+                "max_buffered": self.max_buffered,
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "dropped": self.dropped,
+                "flushed": self.flushed,
+                "flushes": self.flushes,
+                "flush_errors": self.flush_errors,
+                "documents_written": self.documents_written,
+                "last_flush_ms": self.last_flush_ms,
+            }
@@ -1,4 +1,5 @@
 import 'package:flutter/material.dart';
+import 'package:firebase_auth/firebase_auth.dart';
 import 'dart:convert';
 import 'package:http/http.dart' as http;
 import 'package:flutter_gen/gen_l10n/app_localizations.dart';
@@ -26,10 +27,19 @@ class _AiSymptomsPageState extends State<AiSymptomsPage> {
 
   Future<String> sendMessage(String message) async {
     try {
+      // The ID token proves who is signed in, so the backend keeps this user's conversation in its own table
+      final user = FirebaseAuth.instance.currentUser;
+      final idToken = await user?.getIdToken();
       final response = await http.post(
         Uri.parse('${AppConfig.baseUrl}/api/check-symptoms'),
-        headers: {'Content-Type': 'application/json'},
-        body: jsonEncode({'message': message}),
+        headers: {
+          'Content-Type': 'application/json',
+          if (idToken != null) 'Authorization': 'Bearer $idToken',
+        },
+        body: jsonEncode({
+          'message': message,
+          if (user?.email != null) 'email': user!.email,
+        }),
       );
 
       if (response.statusCode == 200) {
@@ -1,6 +1,7 @@
 import 'dart:convert';
 import 'dart:io';
 import 'package:flutter/material.dart';
+import 'package:firebase_auth/firebase_auth.dart';
 import 'package:http/http.dart' as http;
 import 'package:file_picker/file_picker.dart';
 import 'package:flutter_gen/gen_l10n/app_localizations.dart';
@@ -68,6 +69,12 @@ class _ImageDiagPageState extends State<ImageDiagPage> {
         Uri.parse('${AppConfig.baseUrl}/api/process-photo'), // Updated to match the REST API endpoint
       );
 
+      // Identifies the user so the backend only reuses this user's stored analyses
+      final email = FirebaseAuth.instance.currentUser?.email;
+      if (email != null) {
+        request.fields['email'] = email;
+      }
+
       // Attach the image to the request
       request.files.add(
         await http.MultipartFile.fromPath(
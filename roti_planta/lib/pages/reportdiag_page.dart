@@ -1,6 +1,7 @@
 import 'dart:convert';
 import 'dart:io';
 import 'package:flutter/material.dart';
+import 'package:firebase_auth/firebase_auth.dart';
 import 'package:http/http.dart' as http;
 import 'package:file_picker/file_picker.dart';
 import 'package:flutter_gen/gen_l10n/app_localizations.dart';
@@ -67,6 +68,12 @@ class _ReportDiagPageState extends State<ReportDiagPage> {
       final url = Uri.parse('${AppConfig.baseUrl}/api/process-document');
       var request = http.MultipartRequest('POST', url);
 
+      // Identifies the user so the backend only reuses this user's stored analyses
+      final email = FirebaseAuth.instance.currentUser?.email;
+      if (email != null) {
+        request.fields['email'] = email;
+      }
+
       // Attach the PDF file to the request
       request.files.add(
         await http.MultipartFile.fromPath(